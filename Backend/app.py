@@ -1,29 +1,236 @@
-from flask import Flask, jsonify, request, send_from_directory, send_file
-import requests
+from flask import Flask, g, jsonify, redirect, request, send_from_directory, stream_with_context
 from flask_cors import CORS
-import pandas as pd
-import numpy as np
+import gc
+import hmac
 import json
+import math
 import os
+import threading
+import time
+from urllib.parse import urlencode
+from result_cache import ResultCache
+from player_registry import get_registry
+from upstream import UpstreamRefresher
+from points_table import EMPTY_TABLE, PROXY_URL as POINTS_TABLE_PROXY_URL, PointsTableFeed
+from live_updates import (LONG_POLL_TIMEOUT, STREAM_KEEPALIVE, STREAM_MAX_DURATION, MatchUpdates, make_live_matches_feed,
+                          sse_event, updates_payload)
+from assets import BASE_DIR, IMMUTABLE_MAX_AGE, MANIFEST_FILE, AssetManifest
+from optimizer import TEAM_SIZE
+import metrics
+import profiler
 
 app = Flask(__name__, static_folder='Static')
 CORS(app, resources={r"/*": {"origins": "*"}})
 
+REQUEST_SECONDS = metrics.histogram('http_request_duration_seconds', 'Time to produce each response, by route template',
+                                    ['route', 'method', 'status'])
+
+if metrics.ENABLED:
+    @app.before_request
+    def start_request_timer():
+        g.request_start = time.perf_counter()
+        metrics.start_request()
+
+    @app.after_request
+    def record_request_time(response):
+        start = g.pop('request_start', None)
+        if start is not None:
+            elapsed = time.perf_counter() - start
+            # The route template, not the path, so the label stays bounded
+            route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            REQUEST_SECONDS.observe(elapsed, route, request.method, response.status_code)
+            timing = metrics.server_timing(elapsed)
+            if timing:
+                response.headers['Server-Timing'] = timing
+        return response
+
+@app.route('/metrics')
+def serve_metrics():
+    return app.response_class(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.before_request
+def start_profiled_request():
+    profiler.request_started(request.url_rule.rule if request.url_rule is not None else None)
+
+@app.teardown_request
+def finish_profiled_request(exc):
+    profiler.request_finished()
+
+# Set ADMIN_TOKEN to enable the /admin endpoints; requests send it as "Authorization: Bearer <token>"
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+def admin_authorized():
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    return scheme == 'Bearer' and hmac.compare_digest(token.encode('utf-8'), ADMIN_TOKEN.encode('utf-8'))
+
+@app.route('/admin/profile', methods=['GET', 'POST'])
+def admin_profile():
+    """Profile this worker for ?seconds= or the next ?requests= requests (to ?route= if given) as collapsed stacks"""
+    if not ADMIN_TOKEN:
+        return jsonify({'error': 'Not found'}), 404
+    if not admin_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    seconds = request.args.get('seconds', type=float)
+    max_requests = request.args.get('requests', type=int)
+    route = request.args.get('route')
+    interval_ms = request.args.get('interval_ms', default=profiler.DEFAULT_INTERVAL * 1000, type=float)
+    if route is not None and route not in {rule.rule for rule in app.url_map.iter_rules()}:
+        return jsonify({'error': f'Unknown route {route}'}), 400
+    if (seconds is not None and seconds <= 0) or (max_requests is not None and max_requests <= 0):
+        return jsonify({'error': 'seconds and requests must be positive'}), 400
+    if (seconds is not None and not math.isfinite(seconds)) or not math.isfinite(interval_ms):
+        return jsonify({'error': 'seconds and interval_ms must be finite numbers'}), 400
+    if seconds is None:
+        # A request-bounded profile still stops after MAX_SECONDS if the route goes quiet
+        seconds = profiler.MAX_SECONDS if max_requests else 10
+
+    try:
+        profile = profiler.run(seconds, interval_ms / 1000, route, max_requests,
+                               all_threads=request.args.get('threads') == 'all')
+    except profiler.ProfilerBusy as e:
+        return jsonify({'error': str(e)}), 409
+    summary = profile.summary()
+    if request.args.get('format') == 'json':
+        return jsonify({**summary, 'stacks': dict(profile.counts)})
+    response = app.response_class(profile.collapsed(), mimetype='text/plain')
+    for key, value in summary.items():
+        response.headers[f"X-Profile-{key.capitalize()}"] = str(value)
+    return response
+
+# Built by assets.py: content-hashed, precompressed and resized copies of the static files
+asset_manifest = AssetManifest()
+
+def asset_response(entry, filename, immutable):
+    """Serve a built asset file, negotiating its encoding or image variant; supports Range and conditional requests"""
+    content_type, encoding = entry['type'] if entry else None, None
+    if entry is not None:
+        accept_webp = any(value == 'image/webp' for value in request.accept_mimetypes.values())
+        width = request.args.get('w', type=int) if not immutable else None
+        filename, content_type, encoding, negotiated = asset_manifest.select(
+            entry, request.accept_encodings, accept_webp and not immutable, width)
+    response = send_from_directory(asset_manifest.build_dir, filename, mimetype=content_type,
+                                   etag=filename, conditional=True)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if entry is not None and negotiated:
+        response.vary.add('Accept' if entry.get('variants') and not immutable else 'Accept-Encoding')
+    # Hashed names never change content; other URLs revalidate against the ETag
+    response.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable' if immutable else 'no-cache'
+    return response
+
+def static_response(directory, filename):
+    """Serve a static file from its built variants while they match the source, else the file itself"""
+    path = os.path.normpath(os.path.join(os.path.abspath(directory), filename))
+    url_path = os.path.relpath(path, BASE_DIR).replace(os.sep, '/')
+    entry = asset_manifest.entry(url_path) if not url_path.startswith('..') else None
+    if entry is None:
+        return send_from_directory(directory, filename)
+    return asset_response(entry, entry['file'], immutable=False)
+
+@app.route('/assets/<path:filename>')
+def serve_asset(filename):
+    if filename == MANIFEST_FILE:
+        # Files changed since the build drop out, so clients fall back to their original URLs
+        response = jsonify(asset_manifest.current())
+        response.add_etag()
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
+    return asset_response(asset_manifest.built_entry(filename), filename, immutable=True)
+
+# Flask's own /Static/<path> route, which the frontend uses for Static/public
+app.view_functions['static'] = lambda filename: static_response(app.static_folder, filename)
+
 # Route to serve static files from the public folder
 @app.route('/static/<path:filename>')
 def serve_static(filename):
-    return send_from_directory('Static/public', filename)
+    return static_response('Static/public', filename)
 
-# Serve any JSON or CSV file from the root directory
-@app.route('/api/fantasy_team')
+def playing11_param(data, name):
+    """Read a playing XI from JSON (list) or query args (repeated or comma-separated)"""
+    if data is not request.args:
+        players = data.get(name) or []
+    else:
+        players = request.args.getlist(name)
+        if len(players) == 1:
+            players = players[0].split(',')
+    return [p.strip() for p in players if isinstance(p, str) and p.strip()]
+
+MAX_SIMULATIONS = 50000
+
+@app.route('/api/fantasy_team', methods=['GET', 'POST'])
 def fansty_team():
-    from team import main  # Import the main function from team.py
-    result = main()        # Call the main function
-    return jsonify(result) # Return the result as JSON
+    from team import predict_fantasy_team  # The predictor is built once per worker and shared
+    from simulation import CAPTAIN_STRATEGIES, DEFAULT_SIMULATIONS
+    data = request.args if request.method == 'GET' else (request.json or {})
+    team1 = data.get('team1')
+    team2 = data.get('team2')
+    venue = data.get('venue')
+    team1_playing11 = playing11_param(data, 'team1_playing11')
+    team2_playing11 = playing11_param(data, 'team2_playing11')
+
+    if not team1 or not team2 or not venue or not team1_playing11 or not team2_playing11:
+        return jsonify({'error': 'team1, team2, venue, team1_playing11 and team2_playing11 are required'}), 400
+    # 'mean' or 'upside' picks the captain and vice-captain from simulated point distributions
+    captain_strategy = data.get('captain_strategy')
+    if captain_strategy is not None and captain_strategy not in CAPTAIN_STRATEGIES:
+        return jsonify({'error': f"captain_strategy must be one of {', '.join(CAPTAIN_STRATEGIES)}"}), 400
+    try:
+        simulations = min(int(data.get('simulations', DEFAULT_SIMULATIONS)), MAX_SIMULATIONS)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'simulations must be an integer'}), 400
+    if simulations <= 0:
+        return jsonify({'error': 'simulations must be positive'}), 400
+
+    try:
+        result = predict_fantasy_team(team1, team2, venue, team1_playing11, team2_playing11,
+                                      captain_strategy, simulations)
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+MAX_LINEUPS = 100
+# Search nodes one /api/fantasy_lineups request may visit (under a second on the request thread);
+# season.py precomputes deeper searches offline
+LINEUP_SEARCH_NODES = int(os.environ.get('LINEUP_SEARCH_NODES', 200000))
+
+@app.route('/api/fantasy_lineups', methods=['GET', 'POST'])
+def fantasy_lineups():
+    from team import predict_fantasy_lineups
+    data = request.args if request.method == 'GET' else (request.json or {})
+    team1 = data.get('team1')
+    team2 = data.get('team2')
+    venue = data.get('venue')
+    team1_playing11 = playing11_param(data, 'team1_playing11')
+    team2_playing11 = playing11_param(data, 'team2_playing11')
+
+    if not team1 or not team2 or not venue or not team1_playing11 or not team2_playing11:
+        return jsonify({'error': 'team1, team2, venue, team1_playing11 and team2_playing11 are required'}), 400
+    try:
+        count = min(int(data.get('count', 20)), MAX_LINEUPS)
+        # Any two lineups share at most this many players
+        max_overlap = int(data.get('max_overlap', TEAM_SIZE - 1))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'count and max_overlap must be integers'}), 400
+    if count <= 0:
+        return jsonify({'error': 'count must be positive'}), 400
+    if not 0 <= max_overlap <= TEAM_SIZE - 1:
+        return jsonify({'error': f'max_overlap must be between 0 and {TEAM_SIZE - 1}'}), 400
+
+    try:
+        result = predict_fantasy_lineups(team1, team2, venue, team1_playing11, team2_playing11, count, max_overlap,
+                                         LINEUP_SEARCH_NODES)
+        if not result['lineups']:
+            return jsonify({**result, 'error': 'No lineup satisfies the selection rules'}), 422
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Serve any JSON or CSV file from the root directory
 
 @app.route('/<path:filename>')
 def serve_static_file(filename):
-    return send_from_directory(os.getcwd(), filename)
+    return static_response(os.getcwd(), filename)
 
 @app.route('/api/test')
 def serve():
@@ -35,98 +242,290 @@ def serve_match():
         data = json.load(f)
     return jsonify(data)
 
-API_URL = 'https://livescoreapi.thehindu.com/api/cricket/grouped/fixtures/3634'
+# Fetched through a CORS proxy
+POINTS_TABLE_URL = os.environ.get('POINTS_TABLE_URL', POINTS_TABLE_PROXY_URL)
+
+# Upstream feeds are polled by one background thread per worker and served from memory,
+# so viewers polling these routes never wait on (or multiply calls to) the upstream
+upstream = UpstreamRefresher()
+live_matches_feed = upstream.add(make_live_matches_feed())
+points_table_feed = upstream.add(PointsTableFeed(
+    [POINTS_TABLE_URL], interval=int(os.environ.get('POINTS_TABLE_REFRESH', 300)),
+))
+
+def feed_response(feed, data):
+    return feed_headers(feed, jsonify(data))
+
+def feed_headers(feed, response):
+    response.headers['X-Data-Source'] = 'upstream' if feed.source not in (None, 'fallback') else 'fallback'
+    if feed.age is not None:
+        response.headers['X-Data-Age'] = str(int(feed.age))
+    return response
 
 @app.route('/api/live-matches')
 def live_matches():
+    data = live_matches_feed.get()
+    if data is None:
+        return jsonify({'error': live_matches_feed.last_error, 'message': 'Unable to load match data'}), 500
+    return feed_response(live_matches_feed, data)
+
+
+# Live-match diffs are computed once per upstream snapshot and shared by every subscriber
+match_updates = MatchUpdates()
+live_matches_feed.subscribe(match_updates.publish)
+# Set to the public URL of live_stream.py to hold subscribers there, as coroutines of one
+# process with one version history, instead of in this worker's threads
+LIVE_STREAM_URL = os.environ.get('LIVE_STREAM_URL')
+# Subscribers this worker holds at once (streams and waiting long-polls, a thread each), so
+# they can never take every thread from the other routes; the rest get a 503
+LIVE_SUBSCRIBER_SLOTS = int(os.environ.get('LIVE_SUBSCRIBER_SLOTS', 16))
+LIVE_RETRY_AFTER = 30
+live_subscriber_slots = threading.BoundedSemaphore(LIVE_SUBSCRIBER_SLOTS)
+
+def live_slots_full():
+    response = jsonify({'error': 'Too many live-match subscribers on this worker; poll /api/live-matches/updates?timeout=0'})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(LIVE_RETRY_AFTER)
+    return response
+
+def live_stream_redirect():
+    """Send the request, with its resume token, to the live_stream.py process"""
+    args = request.args.to_dict(flat=False)
+    if 'since' not in args and request.headers.get('Last-Event-ID'):
+        args['since'] = [request.headers['Last-Event-ID']]
+    query = urlencode(args, doseq=True)
+    return redirect(f"{LIVE_STREAM_URL.rstrip('/')}{request.path}{'?' + query if query else ''}", code=307)
+
+@app.route('/api/live-matches/updates')
+def live_match_updates():
+    """Long-poll for live-match diffs after the version token in ?since="""
+    if LIVE_STREAM_URL:
+        return live_stream_redirect()
+    live_matches_feed.get()
     try:
-        # First try to fetch from external API
-        try:
-            resp = requests.get(API_URL, timeout=5)  # Add timeout
-            if resp.status_code == 200:
-                return jsonify(resp.json())
-            else:
-                raise Exception(f"API returned status code {resp.status_code}")
-        except Exception as e:
-            print(f"External API error: {str(e)}")
+        timeout = min(float(request.args.get('timeout', LONG_POLL_TIMEOUT)), LONG_POLL_TIMEOUT)
+    except ValueError:
+        return jsonify({'error': 'timeout must be a number'}), 400
+    if not math.isfinite(timeout):
+        return jsonify({'error': 'timeout must be a number'}), 400
+    if timeout <= 0:
+        return jsonify(updates_payload(*match_updates.since(request.args.get('since'))))
+    if not live_subscriber_slots.acquire(blocking=False):
+        return live_slots_full()
+    try:
+        return jsonify(updates_payload(*match_updates.wait(request.args.get('since'), timeout)))
+    finally:
+        live_subscriber_slots.release()
 
-        # Fallback to local JSON file if external API fails
-        with open('Static/public/ipl_matches_2025.json', 'r') as f:
-            data = json.load(f)
-        return jsonify(data)
+@app.route('/api/live-matches/stream')
+def live_match_stream():
+    """Server-sent events: a snapshot (or the diffs after Last-Event-ID), then one event per change"""
+    if LIVE_STREAM_URL:
+        return live_stream_redirect()
+    live_matches_feed.get()
+    since = request.headers.get('Last-Event-ID') or request.args.get('since')
+    # Held until the response is closed, whether the stream ends or the client goes away
+    if not live_subscriber_slots.acquire(blocking=False):
+        return live_slots_full()
 
-    except Exception as e:
-        return jsonify({'error': str(e), 'message': 'Unable to load match data'}), 500
+    def events():
+        token, reset, payload = match_updates.since(since)
+        yield sse_event(token, reset, payload)
+        deadline = time.time() + STREAM_MAX_DURATION
+        while time.time() < deadline:
+            new_token, reset, payload = match_updates.wait(token, STREAM_KEEPALIVE)
+            if new_token == token:
+                yield ": keepalive\n\n"
+                continue
+            token = new_token
+            yield sse_event(token, reset, payload)
+
+    response = app.response_class(stream_with_context(events()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.call_on_close(live_subscriber_slots.release)
+    return response
 
 
 @app.route('/points_table')
 def points_table():
-    api_url = 'https://cf-gotham.sportskeeda.com/cricket/ipl/points-table'
-    # Use a CORS proxy
-    proxy_url = f'https://corsproxy.io/?{api_url}'
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'application/json',
-            'Referer': 'https://www.sportskeeda.com/'
-        }
-        response = requests.get(proxy_url, headers=headers)
-        response.raise_for_status()
-        data = response.json()
-        # Flatten the group if needed
-        points = []
-        if 'table' in data and data['table'] and 'table' in data['table'][0]:
-            for team in data['table'][0]['table']:
-                if 'group' in team:
-                    points.extend(team['group'])
-                else:
-                    points.append(team)
-        print("API data fetched successfully:", len(points), "teams")
-    except Exception as e:
-        points = []
-        print(f"Error fetching points table: {e}")
+    """The normalized standings and their version, which is also the ETag"""
+    return feed_headers(points_table_feed, cached_result_response(points_table_feed.get() or EMPTY_TABLE))
 
-    return jsonify({'points': points})
+@app.route('/api/upstream_status')
+def upstream_status():
+    return jsonify({feed.name: feed.status() for feed in upstream.feeds})
 
-# Create a directory to store JSON results if it doesn't exist
-RESULTS_DIR = "results"
-os.makedirs(RESULTS_DIR, exist_ok=True)
-# Add this dictionary at the top (or near your imports)
-PLAYER_NAME_MAP = {'Sanju Samson': 'SV Samson', 'Shubham Dubey': 'SB Dubey', 'Vaibhav Suryavanshi': 'V Suryavanshi', 'Kunal Rathore': 'KS Rathore', 'Shimron Hetmyer': 'SO Hetmyer', 'Yashasvi Jaiswal': 'YBK Jaiswal', 'Dhruv Jurel': 'Dhruv Jurel', 'Riyan Parag': 'R Parag', 'Nitish Rana': 'N Rana', 'Yudhvir Singh Charak': 'Yudhvir Singh', 'Jofra Archer': 'JC Archer', 'Maheesh Theekshana': 'M Theekshana', 'Wanindu Hasaranga': 'PWH de Silva', 'Akash Madhwal': 'A Madhwal', 'Kumar Kartikeya Singh': 'K Kartikeya', 'Tushar Deshpande': 'TU Deshpande', 'Fazalhaq Farooqi': 'Fazalhaq Farooqi', 'Kwena Maphaka': 'K Maphaka', 'Ashok Sharma': 'A Sharma', 'Sandeep Sharma': 'Sandeep Sharma', 'Ishan Kishan': 'Ishan Kishan', 'Atharva Taide': 'Atharva Taide', 'Abhinav Manohar': 'A Manohar', 'Aniket Verma': 'Aniket Verma', 'Heinrich Klaasen': 'H Klaasen', 'Travis Head': 'TM Head', 'Harshal Patel': 'HV Patel', 'Kamindu Mendis': 'PHKD Mendis', 'Wiaan Mulder': 'PWA Mulder', 'Abhishek Sharma': 'Abhishek Sharma', 'Nitish Kumar Reddy': 'Nithish Kumar Reddy', 'Pat Cummins': 'Pat Cummins', 'Mohammad Shami': 'Mohammad Shami', 'Rahul Chahar': 'RD Chahar', 'Simarjeet Singh': 'Simarjeet Singh', 'Zeeshan Ansari': 'Zeeshan Ansari', 'Jaydev Unadkat': 'JD Unadkat', 'Eshan Malinga': 'E Malinga', 'Ajinkya Rahane': 'AM Rahane', 'Rinku Singh': 'RK Singh', 'Quinton de Kock': 'Q de Kock', 'Rahmanullah Gurbaz': 'Rahmanullah Gurbaz', 'Angkrish Raghuvanshi': 'A Raghuvanshi', 'Rovman Powell': 'R Powell', 'Manish Pandey': 'MK Pandey', 'Venkatesh Iyer': 'VR Iyer', 'Anukul Roy': 'AS Roy', 'Moeen Ali': 'MM Ali', 'Ramandeep Singh': 'Ramandeep Singh', 'Andre Russell': 'AD Russell', 'Anrich Nortje': 'A Nortje', 'Vaibhav Arora': 'VG Arora', 'Mayank Markande': 'M Markande', 'Spencer Johnson': 'SH Johnson', 'Harshit Rana': 'Harshit Rana', 'Sunil Narine': 'SP Narine', 'Varun Chakaravarthy': 'CV Varun', 'Chetan Sakariya': 'C Sakariya', 'MS Dhoni': 'MS Dhoni', 'Dewald Brevis': 'D Brevis', 'Devon Conway': 'DP Conway', 'Rahul Tripathi': 'R Tripathi', 'Shaik Rasheed': 'SK Rasheed', 'Ayush Mhatre': 'A Mhatre ', 'Rachin Ravindra': 'R Ravindra', 'Ravichandran Ashwin': 'R Ashwin', 'Vijay Shankar': 'V Shankar', 'Sam Curran': 'SM Curran', 'Anshul Kamboj': 'A Kamboj', 'Deepak Hooda': 'DJ Hooda', 'Jamie Overton': 'J Overton', 'Ravindra Jadeja': 'RA Jadeja', 'Shivam Dube': 'S Dube', 'Khaleel Ahmed': 'KK Ahmed', 'Noor Ahmad': 'Noor Ahmad', 'Mukesh Choudhary': 'Mukesh Choudhary', 'Nathan Ellis': 'NT Ellis', 'Shreyas Gopal': 'S Gopal', 'Matheesha Pathirana': 'M Pathirana', 'Shubman Gill': 'Shubman Gill', 'Jos Buttler': 'JC Buttler', 'Kumar Kushagra': 'Kumar Kushagra', 'Anuj Rawat': 'Anuj Rawat', 'Sherfane Rutherford': 'SE Rutherford', 'Mahipal Lomror': 'MK Lomror', 'Washington Sundar': 'Washington Sunder', 'Mohd. Arshad Khan': 'Arshad Khan', 'Sai Kishore': 'R Sai Kishore', 'Jayant Yadav': 'J Yadav', 'Sai Sudharsan': 'B Sai Sudharsan', 'Dasun shanaka': 'MD Shanaka', 'Shahrukh Khan': 'M Shahrukh Khan', 'Kagiso Rabada': 'K Rabada', 'Mohammed Siraj': 'Mohammed Siraj', 'Prasidh Krishna': 'M Prasidh Krishna', 'Gerald Coetzee': 'G Coetzee', 'Ishant Sharma': 'I Sharma', 'Kulwant Khejroliya': 'K Khejroliya', 'Rahul Tewatia': 'R Tewatia', 'Rashid Khan': 'Rashid Khan', 'Rajat Patidar': ' RM Patidar', 'Virat Kohli': 'V Kohli', 'Phil Salt': 'PD Salt', 'Jitesh Sharma': 'JM Sharma', 'Devdutt Padikkal': 'D Padikkal', 'Swastik Chhikara': 'SS Chhikara', 'Liam Livingstone': 'LS Livingstone', 'Krunal Pandya': 'KH Pandya', 'Swapnil Singh': 'S Singh', 'Tim David': 'TH David', 'Romario Shepherd': 'R Shepherd', 'Manoj Bhandage': 'MS Bhandage', 'Jacob Bethell': 'JG Bethell', 'Josh Hazlewood': 'JR Hazlewood', 'Rasikh Dar': 'Rasikh Salam', 'Suyash Sharma': 'Suyash Sharma', 'Bhuvneshwar Kumar': 'B Kumar', 'Nuwan Thushara': 'N Thushara', 'Lungisani Ngidi': 'L Ngidi', 'Abhinandan Singh': 'A Singh', 'Mohit Rathee': 'M Rathee', 'Yash Dayal': 'Y Dayal', 'Rishabh Pant': 'RR Pant', 'David Miller': 'DA Miller', 'Aiden Markram': 'AK Markram', 'Nicholas Pooran': 'N Pooran', 'Mitchell Marsh': 'MR Marsh', 'Abdul Samad': 'Abdul Samad ', 'Shahbaz Ahamad': 'Shahbaz Ahmed', 'Rajvardhan Hangargekar': 'RS Hangargekar', 'Ayush Badoni': 'A Badoni', 'Shardul Thakur': 'SN Thakur', 'Avesh Khan': 'Avesh Khan', 'Akash Deep': 'Akash Deep', 'M. Siddharth': 'M Siddharth', 'Digvesh Singh': 'DS Rathi', 'Akash Singh': 'Akash Singh', 'Prince Yadav': 'Prince Yadav', 'Mayank Yadav': 'MP Yadav', 'Ravi Bishnoi': 'Ravi Bishnoi', 'Shreyas Iyer': 'SS Iyer', 'Nehal Wadhera': 'N Wadhera', 'Vishnu Vinod': 'Vishnu Vinod', 'Josh Inglis': 'JP Inglis', 'Prabhsimran Singh': 'P Simran Singh', 'Shashank Singh': 'Shashank Singh', 'Marcus Stoinis': 'MP Stoinis', 'Glenn Maxwell': 'GJ Maxwell', 'Harpreet Brar': 'Harpreet Brar', 'Marco Jansen': 'M Jansen', 'Azmatullah Omarzai': 'Azmatullah Omarzai', 'Priyansh Arya': 'Priyansh Arya', 'Suryansh Shedge': 'Suryansh Shedge', 'Arshdeep Singh': 'Arshdeep Singh', 'Yuzvendra Chahal': 'YS Chahal', 'Vyshak Vijaykumar': 'Vijaykumar Vyshak', 'Yash Thakur': 'Yash Thakur', 'Lockie Ferguson': 'LH Ferguson', 'Kuldeep Sen': 'KR Sen', 'Xavier Bartlett': 'XC Bartlett', 'Pravin Dubey': 'P Dubey', 'KL Rahul': 'KL Rahul', 'Jake Fraser-McGurk': 'J Fraser-McGurk', 'Karun Nair': 'KK Nair', 'Faf du Plessis': 'F du Plessis', 'Donovan Ferreira': 'D Ferreira', 'Abishek Porel': 'Abhishek Porel', 'Tristan Stubbs': 'T Stubbs', 'Axar Patel': 'AR Patel', 'Sameer Rizvi': 'Sameer Rizvi', 'Ashutosh Sharma': 'Ashutosh Sharma', 'Vipraj Nigam': 'V Nigam', 'Mitchell Starc': 'MA Starc', 'T. Natarajan': 'T Natarajan', 'Mohit Sharma': 'MM Sharma', 'Mukesh Kumar': 'Mukesh Kumar', 'Dushmantha Chameera': 'PVD Chameera', 'Kuldeep Yadav': 'Kuldeep Yadav', 'Rohit Sharma': 'RG Sharma', 'Surya Kumar Yadav': 'SA Yadav', 'Robin Minz': 'R Minz', 'Ryan Rickelton': 'RD Rickelton', 'Shrijith Krishnan': 'K Shrijith', 'Bevon Jacobs': 'B Jacobs', 'N. Tilak Varma': 'Tilak Varma', 'Hardik Pandya': 'HH Pandya', 'Naman Dhir': 'Naman Dhir', 'Will Jacks': 'WG Jacks', 'Mitchell Santner': 'MJ Santner', 'Raj Angad Bawa': 'RA Bawa', 'Vignesh Puthur': 'V Puthur', 'Trent Boult': 'TA Boult', 'Karn Sharma': 'KV Sharma', 'Deepak Chahar': 'DL Chahar', 'Ashwani Kumar': 'Ashwani Kumar', 'Reece Topley': 'R Topley', 'V.Satyanarayana Penmetsa': 'PVSN Raju', 'Arjun Tendulkar': 'A Tendulkar', 'Mujeeb-ur-Rahman': 'Mujeeb ur Rahman', 'Jasprit Bumrah': 'JJ Bumrah'}
+# deliveries.csv, or a Parquet dataset directory written by deliveries_parquet.py
+DELIVERIES_FILE = os.environ.get('DELIVERIES_FILE', "deliveries.csv")
+# Read instead of a Parquet DELIVERIES_FILE when pyarrow is not installed
+DELIVERIES_CSV = os.environ.get('DELIVERIES_CSV', "deliveries.csv")
+# Head-to-head summaries live in a bounded in-memory LRU; set RESULTS_SPILL_DIR to spill evictions to disk
+RESULTS_DIR = os.environ.get('RESULTS_SPILL_DIR')
+result_cache = ResultCache(max_entries=int(os.environ.get('RESULT_CACHE_SIZE', 4096)), spill_dir=RESULTS_DIR,
+                           name='analyze_results')
+
+def deliveries_store(path=DELIVERIES_FILE):
+    """The shared deliveries store; pandas is only imported once a route needs it"""
+    from deliveries import get_deliveries
+    return get_deliveries(path, fallback=DELIVERIES_CSV)
+
+def deliveries_name(store, column, name):
+    """Name of a player in deliveries.csv, mapping squad-sheet names through the player registry"""
+    if store.has_player(column, name):
+        return name
+    return get_registry().cricsheet_name(name)
+
+def cached_result_response(entry):
+    """Serve a cached summary with a strong ETag, answering If-None-Match with 304"""
+    if request.if_none_match.contains(entry.etag):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(entry.body, mimetype='application/json')
+    response.set_etag(entry.etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
-@app.route('/analyze', methods=['POST'])
+# Pairs in one batch /analyze request, and how many NDJSON lines are sent per write
+MAX_ANALYZE_PAIRS = 5000
+ANALYZE_STREAM_BATCH = 100
+
+def bowls(record):
+    return 'Bowler' in record.role or 'All' in record.role
+
+def squad_pairs(team1, team2):
+    """Every batter of each squad against every bowler and all-rounder of the other, by squad-sheet name"""
+    registry = get_registry()
+    squads = []
+    for team in (team1, team2):
+        # Teams/<team>_squad.csv file names work as well as team names
+        squad = registry.team_players(str(team).replace('-', ' '))
+        if not squad:
+            raise ValueError(f"Unknown team: {team}")
+        squads.append(squad)
+    return [(batter.name, bowler.name)
+            for batting, bowling in ((squads[0], squads[1]), (squads[1], squads[0]))
+            for batter in batting for bowler in bowling if bowls(bowler)]
+
+def batch_pairs(data):
+    """(batter, bowler) names asked for by a batch /analyze request, or None for a single pair"""
+    if data.get('pairs') is not None:
+        pairs = data.get('pairs')
+        if not isinstance(pairs, list):
+            raise ValueError('pairs must be a list of [batter, bowler] or {"batter": ..., "bowler": ...}')
+        names = []
+        for pair in pairs:
+            if isinstance(pair, dict):
+                pair = (pair.get('batter'), pair.get('bowler'))
+            if not isinstance(pair, (list, tuple)) or len(pair) != 2 or not all(isinstance(n, str) and n for n in pair):
+                raise ValueError('pairs must be a list of [batter, bowler] or {"batter": ..., "bowler": ...}')
+            names.append(tuple(pair))
+        return names
+    if data.get('team1') or data.get('team2'):
+        if not data.get('team1') or not data.get('team2'):
+            raise ValueError('Both team1 and team2 are required')
+        return squad_pairs(data.get('team1'), data.get('team2'))
+    return None
+
+def analyze_stream(pairs):
+    """NDJSON of {"batter", "bowler", "summary"} per pair as requested, summary null where they never met
+
+    Lines of pairs with a player missing from the deliveries also carry an "error".
+    """
+    store = deliveries_store()
+    resolved = [(deliveries_name(store, 'batter', batter), deliveries_name(store, 'bowler', bowler))
+                for batter, bowler in pairs]
+
+    def lines():
+        batch = []
+        for (batter, bowler), names, summary in zip(pairs, resolved, store.summaries(resolved)):
+            line = {'batter': batter, 'bowler': bowler, 'summary': summary}
+            # A pair with an unknown player gets its own error line; the rest of the batch is unaffected
+            unknown = [name for column, name in zip(('batter', 'bowler'), names) if not store.has_player(column, name)]
+            if summary is None and unknown:
+                line['error'] = f"No deliveries found for {' or '.join(unknown)}"
+            batch.append(json.dumps(line, separators=(',', ':')))
+            if len(batch) >= ANALYZE_STREAM_BATCH:
+                yield '\n'.join(batch) + '\n'
+                batch = []
+        if batch:
+            yield '\n'.join(batch) + '\n'
+
+    response = app.response_class(stream_with_context(lines()), mimetype='application/x-ndjson')
+    response.headers['X-Data-Version'] = store.version
+    response.headers['X-Pair-Count'] = str(len(pairs))
+    return response
+
+@app.route('/analyze', methods=['GET', 'POST'])
 def analyze():
-    data = request.json
+    data = request.args if request.method == 'GET' else (request.json or {})
+    try:
+        pairs = batch_pairs(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if pairs is not None:
+        if len(pairs) > MAX_ANALYZE_PAIRS:
+            return jsonify({'error': f'At most {MAX_ANALYZE_PAIRS} pairs can be analyzed per request'}), 400
+        try:
+            return analyze_stream(pairs)
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
     batter_name = data.get('batter')
     bowler_name = data.get('bowler')
+    # GET always returns the summary itself; POST keeps returning the filename unless asked to inline it
+    inline = request.method == 'GET' or data.get('inline') in (True, 'true', '1') or request.args.get('inline') in ('true', '1')
 
     if not batter_name or not bowler_name:
         return jsonify({'error': 'Both batsman and bowler names are required'}), 400
 
     try:
-        result = analyze_batter_vs_bowler("deliveries.csv", batter_name, bowler_name)
-        if result is None:
+        store = deliveries_store()
+        version = store.version
+        batter_name = deliveries_name(store, 'batter', batter_name)
+        bowler_name = deliveries_name(store, 'bowler', bowler_name)
+        entry = result_cache.get_or_compute(
+            batter_name, bowler_name, version,
+            lambda: analyze_batter_vs_bowler(DELIVERIES_FILE, batter_name, bowler_name)
+        )
+        if entry is None:
             return jsonify({'error': f'No head-to-head data found between {batter_name} and {bowler_name}.'}), 404
 
-        # Save the result to a JSON file
-        filename = f"{batter_name.replace(' ', '')}_vs_{bowler_name.replace(' ', '')}.json"
-        filepath = os.path.join(RESULTS_DIR, filename)
+        if inline:
+            return cached_result_response(entry)
+        # Return the filename so the frontend knows which result to request
+        return jsonify({'filename': entry.filename, 'etag': entry.etag})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-        with open(filepath, 'w') as f:
-            json.dump(result, f)
+@app.route('/analyze/bulk', methods=['POST'])
+def analyze_bulk():
+    data = request.json or {}
+    batters = data.get('batters') or []
+    bowlers = data.get('bowlers') or []
 
-        # Return the filename so the frontend knows which file to request
-        return jsonify({'filename': filename})
+    if not isinstance(batters, list) or not isinstance(bowlers, list) or not batters or not bowlers:
+        return jsonify({'error': 'Non-empty lists of batters and bowlers are required'}), 400
+
+    try:
+        store = deliveries_store()
+        batter_names = [deliveries_name(store, 'batter', b) for b in batters]
+        bowler_names = [deliveries_name(store, 'bowler', b) for b in bowlers]
+        # Every cell is a dictionary lookup into the precomputed all-pairs summaries
+        grid = store.grid(batter_names, bowler_names)
+        # Keyed by the names as requested, which may be squad names rather than cricsheet ones
+        grid = {batter: {bowler: grid[batter_name][bowler_name] for bowler, bowler_name in zip(bowlers, bowler_names)}
+                for batter, batter_name in zip(batters, batter_names)}
+        return jsonify({'version': store.version, 'grid': grid})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/results/<filename>', methods=['GET'])
 def get_result(filename):
-    filepath = os.path.join(RESULTS_DIR, filename)
-    if os.path.exists(filepath):
-        return send_file(filepath, mimetype='application/json')
-    else:
+    entry = result_cache.get_by_filename(filename, deliveries_store().version)
+    if entry is None:
         return jsonify({'error': 'File not found'}), 404
+    return cached_result_response(entry)
 
 @app.route('/head_to_head', methods=['GET', 'POST'])
 def head_to_head():
@@ -140,45 +539,28 @@ def head_to_head():
     return jsonify({'h2h': h2h})
 
 def analyze_batter_vs_bowler(file, batter_name, bowler_name):
-    df = pd.read_csv(file)
-    # Filter only the relevant head-to-head deliveries
-    head_to_head = df[(df['batter'] == batter_name) & (df['bowler'] == bowler_name)].copy()
-
-    # Exclude extras that don't count as legal deliveries faced
-    head_to_head = head_to_head[~head_to_head['extras_type'].isin(['wides', 'legbyes', 'byes']) | head_to_head['extras_type'].isna()]
-
-    if head_to_head.empty:
-        return None
-
-    total_balls = len(head_to_head)
-    dot_balls = len(head_to_head[head_to_head['batsman_runs'] == 0])
-    runs = head_to_head['batsman_runs'].sum()
-    run_breakdown = head_to_head['batsman_runs'].value_counts().to_dict()
-    dismissals = head_to_head['player_dismissed'].eq(batter_name).sum()
-
-    strike_rate = (runs / total_balls) * 100 if total_balls else 0
-    average = (runs / dismissals) if dismissals else runs
-    boundary_pct = (run_breakdown.get(4, 0) + run_breakdown.get(6, 0)) / total_balls * 100 if total_balls else 0
-
-    summary = {
-        'Batter': batter_name,
-        'Bowler': bowler_name,
-        'Balls Faced': total_balls,
-        'Dot Balls': dot_balls,
-        'Total Runs': runs,
-        '1s': run_breakdown.get(1, 0),
-        '2s': run_breakdown.get(2, 0),
-        '3s': run_breakdown.get(3, 0),
-        '4s': run_breakdown.get(4, 0),
-        '6s': run_breakdown.get(6, 0),
-        'Dismissals': dismissals,
-        'Strike Rate': round(strike_rate, 2),
-        'Average': round(average, 2),
-        'Boundary %': round(boundary_pct, 2)
-    }
-    # Convert all values to native Python types
-    summary = {k: (int(v) if isinstance(v, (np.integer, int)) else float(v) if isinstance(v, (np.floating, float)) else v) for k, v in summary.items()}
-    return summary
+    # Summaries for every pair are precomputed in one pass when the deliveries are loaded
+    return deliveries_store(file).summary(batter_name, bowler_name)
+
+def preload():
+    """Load every dataset up front; gunicorn runs this in the master so forked workers share it copy-on-write"""
+    start = time.perf_counter()
+    from team import get_predictor
+    from scoring import get_engine
+    from simulation import get_model
+    predictor = get_predictor()
+    get_engine(predictor.stats)
+    get_model(predictor.stats)
+    if os.path.exists(DELIVERIES_FILE):
+        deliveries_store()
+    for feed in upstream.feeds:
+        feed.load()
+    asset_manifest.load()
+    # Move everything loaded so far out of the collector's reach: collections in the workers
+    # would otherwise write to (and so copy) the shared pages
+    gc.collect()
+    gc.freeze()
+    print(f"Preloaded datasets in {time.perf_counter() - start:.2f}s")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,278 @@
+"""Build step for the static files: content-hashed copies, precompressed variants and a manifest.
+
+    python assets.py
+
+Every file under Static/public, flags/ and team_logos/ is copied to Static/build as
+name.<hash>.ext (identical files, like the duplicated flags, are stored once). Text and JSON
+files also get .gz and, when the brotli package is installed, .br variants; images get
+resized and WebP variants when Pillow is installed. manifest.json maps each URL path to its
+built files; app.py serves hashed files under /assets/ with immutable caching and answers the
+original URLs from the same variants while they match their source. The frontend (config.js)
+loads /assets/manifest.json and requests the hashed URLs of files that have one.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import sys
+import threading
+import time
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BUILD_DIR = os.path.join(BASE_DIR, 'Static', 'build')
+MANIFEST_FILE = 'manifest.json'
+# Source directories and the URL prefix their files are requested under
+SOURCE_DIRS = [
+    (os.path.join(BASE_DIR, 'Static', 'public'), 'Static/public'),
+    (os.path.join(BASE_DIR, 'flags'), 'flags'),
+    (os.path.join(BASE_DIR, 'team_logos'), 'team_logos'),
+]
+# Generated at deploy time or by the server itself; not static assets
+SKIP_FILES = {'player_stats.bin', 'season_lineups.jsonl', 'player_aggregates.json'}
+
+COMPRESSIBLE_EXTENSIONS = {'.json', '.jsonl', '.csv', '.js', '.css', '.html', '.svg', '.txt'}
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg'}
+# Widths of the resized image variants; the frontend shows logos and flags at most this large
+IMAGE_WIDTHS = [64, 128, 256, 512]
+WEBP_QUALITY = 85
+# Encoded variants are kept only if they save at least this fraction of the size
+MIN_SAVING = 0.1
+HASH_LENGTH = 12
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+def hashed_name(filename, digest, suffix=''):
+    stem, ext = os.path.splitext(os.path.basename(filename))
+    return f"{stem}.{digest}{suffix}{ext}"
+
+
+def source_files():
+    """(path, URL path) of every static source file"""
+    for directory, prefix in SOURCE_DIRS:
+        for root, dirs, files in os.walk(directory):
+            dirs.sort()
+            for filename in sorted(files):
+                if filename in SKIP_FILES or filename.startswith('.') or filename.endswith('.tmp'):
+                    continue
+                path = os.path.join(root, filename)
+                rel = os.path.relpath(path, directory).replace(os.sep, '/')
+                yield path, f"{prefix}/{rel}"
+
+
+def _write(path, data):
+    """Write a build file unless it already exists; names are content hashes, so it can't be stale"""
+    if os.path.exists(path):
+        return
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def encode_variants(data, name, build_dir):
+    """{encoding: file} of the compressed variants worth keeping"""
+    encoders = [('gzip', '.gz', lambda d: gzip.compress(d, 9, mtime=0))]
+    if brotli is not None:
+        encoders.insert(0, ('br', '.br', lambda d: brotli.compress(d, quality=11)))
+    encodings = {}
+    for encoding, suffix, encode in encoders:
+        target = os.path.join(build_dir, name + suffix)
+        if not os.path.exists(target):
+            encoded = encode(data)
+            if len(encoded) > len(data) * (1 - MIN_SAVING):
+                continue
+            _write(target, encoded)
+        encodings[encoding] = name + suffix
+    return encodings
+
+
+def image_variants(path, digest, build_dir):
+    """Resized and WebP variants of an image as [{file, width, format, size}]; [] without Pillow"""
+    if Image is None:
+        return []
+    variants = []
+    with Image.open(path) as image:
+        image.load()
+        width, height = image.size
+        original_format = (image.format or 'PNG').lower()
+        sizes = [w for w in IMAGE_WIDTHS if w < width] + [width]
+        for target_width in sizes:
+            resized = image if target_width == width else image.resize(
+                (target_width, max(1, round(height * target_width / width))), Image.LANCZOS)
+            formats = [('webp', '.webp')] + ([] if target_width == width else [(original_format, os.path.splitext(path)[1])])
+            for fmt, ext in formats:
+                name = f"{os.path.splitext(os.path.basename(path))[0]}.{digest}.w{target_width}{ext}"
+                target = os.path.join(build_dir, name)
+                if not os.path.exists(target):
+                    tmp_path = f"{target}.{os.getpid()}.tmp"
+                    if fmt == 'webp':
+                        resized.save(tmp_path, 'WEBP', quality=WEBP_QUALITY, method=6)
+                    else:
+                        resized.save(tmp_path, image.format or 'PNG', optimize=True)
+                    os.replace(tmp_path, target)
+                variants.append({'file': name, 'width': target_width, 'format': fmt, 'size': os.path.getsize(target)})
+    return variants
+
+
+def build(build_dir=BUILD_DIR, prune=True):
+    """Build every asset and write the manifest; returns the manifest"""
+    os.makedirs(build_dir, exist_ok=True)
+    assets = {}
+    for path, url_path in source_files():
+        with open(path, 'rb') as f:
+            data = f.read()
+        digest = content_hash(data)
+        name = hashed_name(path, digest)
+        _write(os.path.join(build_dir, name), data)
+        stat = os.stat(path)
+        ext = os.path.splitext(path)[1].lower()
+        entry = {
+            'file': name,
+            'hash': digest,
+            'size': len(data),
+            'type': mimetypes.guess_type(path)[0] or 'application/octet-stream',
+            # The original URL is only answered from the build while its source is unchanged
+            'source_size': stat.st_size,
+            'source_mtime_ns': stat.st_mtime_ns,
+            'encodings': encode_variants(data, name, build_dir) if ext in COMPRESSIBLE_EXTENSIONS else {},
+        }
+        if ext in IMAGE_EXTENSIONS:
+            try:
+                entry['variants'] = image_variants(path, digest, build_dir)
+            except Exception as e:
+                print(f"Error building image variants of {url_path}: {e}")
+        assets[url_path] = entry
+
+    manifest = {'built_at': int(time.time()), 'assets': assets}
+    manifest_path = os.path.join(build_dir, MANIFEST_FILE)
+    tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+    if prune:
+        referenced = {MANIFEST_FILE}
+        for entry in assets.values():
+            referenced.add(entry['file'])
+            referenced.update(entry['encodings'].values())
+            referenced.update(v['file'] for v in entry.get('variants', []))
+        for filename in os.listdir(build_dir):
+            if filename not in referenced:
+                os.remove(os.path.join(build_dir, filename))
+    return manifest
+
+
+class AssetManifest:
+    """The build manifest, reloaded when manifest.json changes, with variant selection for requests"""
+
+    def __init__(self, build_dir=BUILD_DIR):
+        self.build_dir = build_dir
+        self.path = os.path.join(build_dir, MANIFEST_FILE)
+        self._assets = {}
+        self._by_file = {}
+        self._stamp = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            self._assets, self._by_file, self._stamp = {}, {}, None
+            return self._assets
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp != self._stamp:
+            with self._lock:
+                if stamp != self._stamp:
+                    try:
+                        with open(self.path, 'r', encoding='utf-8') as f:
+                            assets = json.load(f).get('assets', {})
+                    except (OSError, ValueError) as e:
+                        print(f"Error loading asset manifest: {e}")
+                        assets = {}
+                    self._by_file = {entry['file']: entry for entry in assets.values()}
+                    self._assets = assets
+                    self._stamp = stamp
+        return self._assets
+
+    def entry(self, url_path):
+        """Manifest entry of a source URL path, or None if it is missing or its source has changed"""
+        entry = self.load().get(url_path)
+        if entry is None:
+            return None
+        try:
+            stat = os.stat(os.path.join(BASE_DIR, *url_path.split('/')))
+        except OSError:
+            return None
+        if stat.st_size != entry['source_size'] or stat.st_mtime_ns != entry['source_mtime_ns']:
+            return None
+        return entry
+
+    def current(self):
+        """The manifest as served to clients: only the entries whose source is unchanged since the build"""
+        entries = {url_path: self.entry(url_path) for url_path in list(self.load())}
+        return {'assets': {url_path: entry for url_path, entry in entries.items() if entry is not None}}
+
+    def built_entry(self, filename):
+        """Manifest entry of a hashed build file name, or None"""
+        self.load()
+        return self._by_file.get(filename)
+
+    def select(self, entry, accept_encodings, accept_webp=False, width=None):
+        """(file, content type, encoding or None, negotiated) of the best variant for a request
+
+        Images pick the smallest variant at least width wide (the original size without a width),
+        WebP only if the client accepts it. Other files pick the first accepted encoding.
+        """
+        variants = entry.get('variants')
+        if variants:
+            full_width = max(v['width'] for v in variants)
+            wanted = min(width or full_width, full_width)
+            candidates = [{'file': entry['file'], 'format': None, 'size': entry['size']}]
+            candidates += [v for v in variants if v['width'] >= wanted and (accept_webp or v['format'] != 'webp')]
+            best = min(candidates, key=lambda v: v['size'])
+            content_type = 'image/webp' if best['format'] == 'webp' else entry['type']
+            return best['file'], content_type, None, True
+        for encoding, filename in entry['encodings'].items():
+            if accept_encodings[encoding]:
+                return filename, entry['type'], encoding, True
+        return entry['file'], entry['type'], None, bool(entry['encodings'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--build-dir', default=BUILD_DIR)
+    parser.add_argument('--no-prune', action='store_true', help="keep build files no longer in the manifest")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    manifest = build(args.build_dir, prune=not args.no_prune)
+    assets = manifest['assets']
+    source_bytes = sum(entry['size'] for entry in assets.values())
+    unique_bytes = sum({entry['file']: entry['size'] for entry in assets.values()}.values())
+    encoded = sum(1 for entry in assets.values() if entry['encodings'])
+    print(f"Built {len(assets)} assets ({source_bytes / 1e6:.1f} MB, {unique_bytes / 1e6:.1f} MB after de-duplication) "
+          f"in {time.perf_counter() - start:.2f}s; {encoded} precompressed"
+          f"{'' if brotli else ' (gzip only: brotli not installed)'}"
+          f"{'' if Image else '; image variants skipped: Pillow not installed'}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1 @@
+"""Benchmarks for the backend hot paths; run modules with `python -m benchmarks.<name>` from Backend/"""
@@ -0,0 +1,107 @@
+"""Compare reading the deliveries from deliveries.csv and from the Parquet dataset: time and bytes
+read to load every head-to-head summary, and to summarize one batter/bowler pair
+
+Run from the Backend directory (needs pyarrow); the dataset is converted into a temporary
+directory unless --dataset names one:
+    python -m benchmarks.bench_deliveries_format --deliveries deliveries.csv --matches matches.csv
+"""
+import argparse
+import itertools
+import os
+import random
+import shutil
+import sys
+import tempfile
+import deliveries_parquet
+from benchmarks.timing import format_summary, measure, save_results
+from deliveries import DeliveriesStore, PairSummaries, read_chunks
+
+
+def bytes_read():
+    """Bytes this process has read through system calls so far, or None without /proc"""
+    try:
+        with open('/proc/self/io') as f:
+            for line in f:
+                if line.startswith('rchar:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def measure_reads(fn, repeat, warmup):
+    """measure() plus the mean bytes read per call"""
+    before = bytes_read()
+    summary = measure(fn, repeat, warmup)
+    after = bytes_read()
+    if before is not None and after is not None:
+        summary['bytes_read'] = (after - before) // (repeat + warmup)
+    return summary
+
+
+def csv_pair_summary(path, batter_name, bowler_name):
+    """One pair from the CSV: every row of the summary columns is parsed to find the pair's"""
+    summaries = PairSummaries()
+    for chunk in read_chunks(path):
+        rows = chunk[(chunk['batter'] == batter_name) & (chunk['bowler'] == bowler_name)]
+        summaries = summaries.merge(PairSummaries(rows))
+    return summaries.summary(batter_name, bowler_name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--deliveries', default='deliveries.csv')
+    parser.add_argument('--matches', default='matches.csv')
+    parser.add_argument('--dataset', help="existing Parquet dataset of --deliveries (default: convert one)")
+    parser.add_argument('--repeat', type=int, default=3, help="full loads timed per format")
+    parser.add_argument('--pairs', type=int, default=20, help="single-pair reads timed per format")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="results file (default: benchmarks/results/deliveries_format-<commit>-<time>.json; '-' to skip)")
+    args = parser.parse_args()
+    deliveries_parquet.require_pyarrow()
+
+    results = {}
+    tmp_dir = None
+    dataset = args.dataset
+    if dataset is None:
+        tmp_dir = tempfile.mkdtemp()
+        dataset = os.path.join(tmp_dir, 'deliveries_parquet')
+        results['convert'] = measure(lambda: deliveries_parquet.convert(args.deliveries, args.matches, dataset),
+                                     repeat=1, warmup=0)
+    try:
+        results['load_csv'] = measure_reads(lambda: DeliveriesStore(args.deliveries).refresh(), args.repeat, 1)
+        results['load_parquet'] = measure_reads(lambda: DeliveriesStore(dataset).refresh(), args.repeat, 1)
+        results['load_csv']['file_bytes'] = os.path.getsize(args.deliveries)
+        results['load_parquet']['file_bytes'] = deliveries_parquet.dataset_bytes(dataset)
+
+        store = DeliveriesStore(args.deliveries).refresh()
+        met = sorted(store.pairs())
+        pairs = random.Random(args.seed).sample(met, min(args.pairs, len(met)))
+        mismatched = [pair for pair in pairs if deliveries_parquet.pair_summary(dataset, *pair) != store.summary(*pair)]
+        if mismatched or DeliveriesStore(dataset).refresh().summary(*pairs[0]) != store.summary(*pairs[0]):
+            print(f"Parquet summaries differ from the CSV for {len(mismatched)} of {len(pairs)} pairs", file=sys.stderr)
+            return 1
+
+        csv_pairs = itertools.cycle(pairs)
+        parquet_pairs = itertools.cycle(pairs)
+        results['pair_csv'] = measure_reads(lambda: csv_pair_summary(args.deliveries, *next(csv_pairs)),
+                                            len(pairs), 1)
+        results['pair_parquet'] = measure_reads(lambda: deliveries_parquet.pair_summary(dataset, *next(parquet_pairs)),
+                                                len(pairs), 1)
+    finally:
+        if tmp_dir:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    for name, summary in results.items():
+        line = format_summary(name, summary)
+        if 'bytes_read' in summary:
+            line += f"  read {summary['bytes_read'] / 1e6:.2f} MB"
+        print(line)
+    path = save_results(args.json, 'deliveries_format', results, vars(args))
+    if path:
+        print(f"Results written to {path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
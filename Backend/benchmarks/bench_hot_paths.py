@@ -0,0 +1,131 @@
+"""Time the backend's hot paths in isolation: head-to-head lookups, predictor construction,
+each phase of predict_dream11 and JSON serialization of the results
+
+Run from the Backend directory: python -m benchmarks.bench_hot_paths --repeat 200
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+from benchmarks.timing import format_summary, measure, save_results
+from team import (BATTER_DATA_PATH, BOWLER_DATA_PATH, TEAMS_FOLDER_PATH, Dream11Predictor, build_fantasy_team,
+                  get_predictor)
+
+
+def squad_matches(registry, venues):
+    """(team1, team2, venue, team1 XI, team2 XI) for every pair of squads, XIs as "Name(Role)" """
+    teams = sorted({record.team for record in registry.records})
+    squads = {team: [f"{p.name}({p.role})" for p in registry.team_players(team)] for team in teams}
+    return [(team1, team2, venues[i % len(venues)], squads[team1], squads[team2])
+            for i, (team1, team2) in enumerate(itertools.combinations(teams, 2))]
+
+
+def analyze_pairs(store, rng, count):
+    """Random (batter, bowler) pairs from the deliveries, most of which have met"""
+    met = store.pairs()
+    pairs = [rng.choice(met) for _ in range(count)] if met else []
+    # Some pairs that never met, like mistyped requests
+    batters, bowlers = store.names('batter'), store.names('bowler')
+    pairs += [(rng.choice(batters), rng.choice(bowlers)) for _ in range(count // 10)]
+    rng.shuffle(pairs)
+    return pairs
+
+
+def bench_analyze(args, rng):
+    from app import DELIVERIES_FILE, analyze_batter_vs_bowler, deliveries_store
+    if not os.path.exists(DELIVERIES_FILE):
+        print(f"{DELIVERIES_FILE} not found; skipping analyze_batter_vs_bowler")
+        return {}
+    pairs = itertools.cycle(analyze_pairs(deliveries_store(), rng, max(args.repeat, 100)))
+    summaries = []
+
+    def analyze():
+        batter, bowler = next(pairs)
+        summaries.append(analyze_batter_vs_bowler(DELIVERIES_FILE, batter, bowler))
+
+    results = {'analyze_batter_vs_bowler': measure(analyze, args.repeat, args.warmup)}
+    found = [s for s in summaries if s is not None] or [{}]
+    summaries = itertools.cycle(found)
+    results['serialize_analyze'] = measure(lambda: json.dumps(next(summaries)), args.repeat, args.warmup)
+    return results
+
+
+def bench_predictor(args):
+    results = {}
+    results['predictor_init'] = measure(
+        lambda: Dream11Predictor(BATTER_DATA_PATH, BOWLER_DATA_PATH, TEAMS_FOLDER_PATH),
+        repeat=max(args.repeat // 10, 5), warmup=1)
+
+    predictor = get_predictor().session()
+    stats = predictor.stats
+    venues = [stats.string(i) for i in sorted(stats.venues.values())] or ['Wankhede Stadium']
+    matches = itertools.cycle(squad_matches(predictor.registry, venues))
+    current = {}
+
+    def next_match():
+        current['match'] = team1, team2, venue, xi1, xi2 = next(matches)
+        current['players1'] = [p.split('(')[0].strip() for p in xi1]
+        current['players2'] = [p.split('(')[0].strip() for p in xi2]
+        predictor.reset_match_state()
+        predictor.set_player_roles(xi1 + xi2)
+
+    def scored_match():
+        next_match()
+        _, _, venue, xi1, xi2 = current['match']
+        predictor.score_players(venue, xi1, xi2)
+
+    def head_to_head():
+        predictor.analyze_head_to_head(current['players1'], current['players2'])
+        predictor.analyze_head_to_head(current['players2'], current['players1'])
+
+    def predict():
+        team1, team2, venue, xi1, xi2 = current['match']
+        current['prediction'] = predictor.predict_dream11(team1, team2, venue, xi1, xi2)
+
+    phases = {
+        'set_player_roles': (lambda: predictor.set_player_roles(current['match'][3] + current['match'][4]), next_match),
+        'head_to_head': (head_to_head, next_match),
+        'venue': (lambda: predictor.analyze_venue_performance(current['match'][2], current['players1'] + current['players2']),
+                  next_match),
+        'form': (lambda: predictor.analyze_recent_form(current['players1'] + current['players2']), next_match),
+        'score_players_vectorized': (lambda: predictor.score_players(*current['match'][2:]), next_match),
+        'selection': (predictor.select_dream11_team, scored_match),
+        'predict_dream11': (predict, next_match),
+    }
+    for name, (fn, setup) in phases.items():
+        results[name] = measure(fn, args.repeat, args.warmup, setup)
+
+    def serialize():
+        team, captain, vice_captain, team1, team2, venue, total_credits, _ = current['prediction']
+        _, _, _, xi1, xi2 = current['match']
+        json.dumps(build_fantasy_team(predictor, team, captain, vice_captain, team1, team2, venue,
+                                      total_credits, xi1, xi2))
+
+    results['serialize_fantasy_team'] = measure(serialize, args.repeat, args.warmup, lambda: (next_match(), predict()))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="results file (default: benchmarks/results/hot_paths-<commit>-<time>.json; '-' to skip)")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    results = {}
+    results.update(bench_analyze(args, rng))
+    results.update(bench_predictor(args))
+    for name, summary in results.items():
+        print(format_summary(name, summary))
+    path = save_results(args.json, 'hot_paths', results, vars(args))
+    if path:
+        print(f"Results written to {path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
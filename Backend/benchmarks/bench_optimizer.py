@@ -0,0 +1,65 @@
+"""Compare the exact team optimizer with the greedy selection on random candidate pools"""
+import argparse
+import random
+import time
+from team import get_predictor
+
+ROLES = ['WK-Batter', 'Batter', 'All-Rounder', 'Bowler']
+
+
+def random_pool(rng, size):
+    """Scores, roles, credits and foreign flags for a random match-sized candidate pool"""
+    pool = []
+    for i in range(size):
+        pool.append({
+            'name': f"Player {i}",
+            'score': rng.uniform(0, 60),
+            'role': ROLES[0] if i < 2 else rng.choice(ROLES),
+            'credits': rng.choice([6.0, 6.5, 7.0, 7.5, 8.0, 8.5, 9.0, 9.5, 10.0, 10.5, 11.0]),
+            'foreign': rng.random() < 0.3,
+        })
+    return pool
+
+
+def load_pool(predictor, pool):
+    predictor.reset_match_state()
+    for player in pool:
+        predictor.player_scores[player['name']] = player['score']
+        predictor.player_roles[player['name']] = player['role']
+        predictor.player_credits[player['name']] = player['credits']
+        predictor.player_is_foreign[player['name']] = player['foreign']
+
+
+def run(select, predictor, pools):
+    objectives = []
+    start = time.perf_counter()
+    for pool in pools:
+        load_pool(predictor, pool)
+        team = select(predictor)[0]
+        objectives.append(sum(score for _, score in team) if len(team) == 11 else None)
+    return (time.perf_counter() - start) / len(pools), objectives
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--pools', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    predictor = get_predictor().session()
+    for size in (22, 26, 30):
+        rng = random.Random(args.seed + size)
+        pools = [random_pool(rng, size) for _ in range(args.pools)]
+        greedy_time, greedy = run(lambda p: p.select_dream11_team_greedy(), predictor, pools)
+        exact_time, exact = run(lambda p: p.select_dream11_team(), predictor, pools)
+
+        improved = sum(1 for g, e in zip(greedy, exact) if e is not None and (g is None or e > g + 1e-9))
+        gains = [e - g for g, e in zip(greedy, exact) if g is not None and e is not None]
+        print(f"{size} candidates: greedy {greedy_time * 1000:.2f} ms, exact {exact_time * 1000:.2f} ms per team; "
+              f"exact better on {improved}/{len(pools)} pools, "
+              f"mean objective gain {sum(gains) / max(len(gains), 1):.2f}, "
+              f"greedy short of 11 on {sum(1 for g in greedy if g is None)}")
+
+
+if __name__ == "__main__":
+    main()
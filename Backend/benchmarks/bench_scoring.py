@@ -0,0 +1,86 @@
+"""Check the vectorized scoring engine against the per-player analysis and time both"""
+import argparse
+import random
+import sys
+import time
+from scoring import get_engine
+from team import get_predictor
+
+
+def usable(predictor, player):
+    """Whether the squad CSVs give the player a parseable credit value"""
+    try:
+        predictor.get_player_info_from_csv(player)
+    except ValueError:
+        return False
+    return True
+
+
+def random_matches(rng, predictor, count):
+    """Random playing XIs drawn from the players and venues in the compiled stats"""
+    stats = predictor.stats
+    players = [p for p in sorted(set(stats.batters) | set(stats.bowlers)) if usable(predictor, p)]
+    # A few names without stats, as in real squads
+    players += [f"Unknown Player {i}" for i in range(10)]
+    venues = [stats.string(i) for i in sorted(stats.venues.values())] or ['Wankhede Stadium']
+    matches = []
+    for _ in range(count):
+        xi = rng.sample(players, min(22, len(players)))
+        venue = rng.choice(venues)
+        # Venue lookups match substrings, so also try a shortened name
+        if rng.random() < 0.5:
+            venue = venue.split(',')[0][:12]
+        matches.append((venue, [f"{p} (Batter)" for p in xi[:11]], [f"{p} (Bowler)" for p in xi[11:]]))
+    return matches
+
+
+def run(predictor, matches, vectorized):
+    """Scores for every match, and the mean time spent scoring (role lookups excluded)"""
+    scores = []
+    elapsed = 0.0
+    for venue, team1_playing11, team2_playing11 in matches:
+        predictor.set_player_roles(team1_playing11 + team2_playing11)
+        team1_players = [p.split('(')[0].strip() for p in team1_playing11]
+        team2_players = [p.split('(')[0].strip() for p in team2_playing11]
+        start = time.perf_counter()
+        if vectorized:
+            predictor.player_scores = get_engine(predictor.stats).score_match(venue, team1_players, team2_players)
+        else:
+            predictor.player_scores = {}
+            predictor.analyze_head_to_head(team1_players, team2_players)
+            predictor.analyze_head_to_head(team2_players, team1_players)
+            predictor.analyze_venue_performance(venue, team1_players + team2_players)
+            predictor.analyze_recent_form(team1_players + team2_players)
+        elapsed += time.perf_counter() - start
+        scores.append(predictor.player_scores)
+    return elapsed / len(matches), scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--matches', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    predictor = get_predictor().session()
+    matches = random_matches(random.Random(args.seed), predictor, args.matches)
+    reference_time, reference = run(predictor, matches, vectorized=False)
+    vectorized_time, vectorized = run(predictor, matches, vectorized=True)
+
+    mismatches = 0
+    for (venue, _, _), expected, actual in zip(matches, reference, vectorized):
+        # Same players, same order and bit-identical scores
+        if list(expected.items()) != list(actual.items()):
+            mismatches += 1
+            if mismatches <= 5:
+                diff = {p: (expected.get(p), actual.get(p)) for p in expected if expected.get(p) != actual.get(p)}
+                print(f"mismatch at {venue!r}: {diff}")
+
+    print(f"{len(matches)} matches: per-player {reference_time * 1000:.2f} ms, "
+          f"vectorized {vectorized_time * 1000:.2f} ms per match "
+          f"({reference_time / vectorized_time:.1f}x); {mismatches} mismatches")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""Time app import and first response, and measure per-worker memory under gunicorn with and without preload
+
+Run from the Backend directory: python -m benchmarks.bench_startup --workers 2
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter: import the app, optionally preload, then serve one prediction
+FIRST_RESPONSE = """
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+heavy = [m for m in ('pandas', 'numpy', 'requests') if m in sys.modules]
+if {preload}:
+    app.preload()
+preloaded = time.perf_counter()
+response = app.app.test_client().post('/api/fantasy_team', json=json.loads(sys.stdin.read()))
+done = time.perf_counter()
+print(json.dumps({{'import': imported - start, 'preload': preloaded - imported, 'first_response': done - preloaded,
+                  'total': done - start, 'status': response.status_code, 'heavy_modules': heavy}}))
+"""
+
+
+def sample_request():
+    """A fantasy_team request for two full squads"""
+    from player_registry import get_registry
+    registry = get_registry()
+    teams = sorted({record.team for record in registry.records})[:2]
+    squads = [[f"{p.name}({p.role})" for p in registry.team_players(team)] for team in teams]
+    return {'team1': teams[0], 'team2': teams[1], 'venue': 'Wankhede Stadium, Mumbai',
+            'team1_playing11': squads[0], 'team2_playing11': squads[1]}
+
+
+def first_response(payload, preload, runs):
+    """Median timings of runs fresh interpreters"""
+    results = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-W', 'ignore', '-c', FIRST_RESPONSE.format(preload=preload)],
+                                input=json.dumps(payload), capture_output=True, text=True, cwd=BACKEND_DIR, check=True)
+        results.append(json.loads(output.stdout.strip().splitlines()[-1]))
+    results.sort(key=lambda r: r['total'])
+    return results[len(results) // 2]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def memory_kb(pid):
+    """Rss and Pss of a process in kB; Pss splits shared pages between the processes sharing them"""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            key, _, rest = line.partition(':')
+            if key in ('Rss', 'Pss'):
+                values[key] = int(rest.split()[0])
+    return values
+
+
+def children(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        return [int(p) for p in f.read().split()]
+
+
+def gunicorn_memory(payload, workers, preload, requests_per_worker=4):
+    """Per-worker Rss/Pss after every worker has served predictions"""
+    port = free_port()
+    command = [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}', '--workers', str(workers),
+               '--log-level', 'warning']
+    if preload:
+        command += ['-c', 'gunicorn.conf.py']
+    else:
+        command += ['-c', '/dev/null', '--worker-class', 'gthread', '--threads', '8']
+    command.append('app:app')
+    start = time.perf_counter()
+    master = subprocess.Popen(command, cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        url = f'http://127.0.0.1:{port}'
+        while True:
+            try:
+                urllib.request.urlopen(f'{url}/api/test', timeout=1).read()
+                break
+            except OSError:
+                if master.poll() is not None or time.perf_counter() - start > 60:
+                    raise RuntimeError('gunicorn did not start')
+                time.sleep(0.05)
+        ready = time.perf_counter() - start
+
+        body = json.dumps(payload).encode()
+        latencies = []
+
+        def post():
+            request = urllib.request.Request(f'{url}/api/fantasy_team', data=body,
+                                             headers={'Content-Type': 'application/json'})
+            t = time.perf_counter()
+            urllib.request.urlopen(request, timeout=60).read()
+            latencies.append(time.perf_counter() - t)
+
+        # Concurrent requests so the kernel spreads them over every worker
+        threads = [threading.Thread(target=post) for _ in range(workers * requests_per_worker)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        worker_memory = [memory_kb(pid) for pid in children(master.pid)]
+        return {
+            'ready': ready,
+            'slowest_first_wave': max(latencies),
+            'master': memory_kb(master.pid),
+            'workers': worker_memory,
+        }
+    finally:
+        master.send_signal(signal.SIGTERM)
+        master.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--runs', type=int, default=3, help="fresh interpreters per first-response measurement")
+    parser.add_argument('--json', help="also write the results to this file")
+    args = parser.parse_args()
+
+    payload = sample_request()
+    results = {'first_response': {}, 'gunicorn': {}}
+    for preload in (False, True):
+        mode = 'preload' if preload else 'lazy'
+        r = results['first_response'][mode] = first_response(payload, preload, args.runs)
+        print(f"{mode:8} import {r['import'] * 1000:6.0f} ms, preload {r['preload'] * 1000:6.0f} ms, "
+              f"first response {r['first_response'] * 1000:6.0f} ms (status {r['status']}); "
+              f"loaded at import: {', '.join(r['heavy_modules']) or 'none'}")
+
+    if sys.platform.startswith('linux'):
+        for preload in (False, True):
+            mode = 'preload' if preload else 'lazy'
+            r = results['gunicorn'][mode] = gunicorn_memory(payload, args.workers, preload)
+            rss = sum(w['Rss'] for w in r['workers']) / len(r['workers']) / 1024
+            pss = sum(w['Pss'] for w in r['workers']) / len(r['workers']) / 1024
+            print(f"gunicorn {mode:8} ready {r['ready']:.2f}s, slowest first request {r['slowest_first_wave'] * 1000:.0f} ms; "
+                  f"per worker RSS {rss:.0f} MB, PSS {pss:.0f} MB; master RSS {r['master']['Rss'] / 1024:.0f} MB")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,51 @@
+"""Compare two benchmark result files (e.g. from two commits) and flag regressions
+
+    python -m benchmarks.compare benchmarks/results/hot_paths-abc1234-....json benchmarks/results/hot_paths-def5678-....json
+"""
+import argparse
+import json
+import sys
+
+# Metrics compared, and whether a larger value is better
+METRICS = [('p50_ms', False), ('p99_ms', False), ('throughput_rps', True), ('bytes_read', False)]
+
+
+def compare(old, new, threshold):
+    """Rows of (name, metric, old, new, change %, regressed) for every metric both runs have"""
+    rows = []
+    for name, new_summary in new['results'].items():
+        old_summary = old['results'].get(name)
+        if not old_summary:
+            continue
+        for metric, higher_is_better in METRICS:
+            if not old_summary.get(metric) or new_summary.get(metric) is None:
+                continue
+            change = (new_summary[metric] - old_summary[metric]) / old_summary[metric] * 100
+            regressed = -change > threshold if higher_is_better else change > threshold
+            rows.append((name, metric, old_summary[metric], new_summary[metric], change, regressed))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('old')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=10, help="percent change counted as a regression")
+    args = parser.parse_args()
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    if old.get('benchmark') != new.get('benchmark'):
+        print(f"Comparing different benchmarks: {old.get('benchmark')} and {new.get('benchmark')}", file=sys.stderr)
+
+    print(f"{old['environment'].get('commit')} -> {new['environment'].get('commit')}")
+    rows = compare(old, new, args.threshold)
+    for name, metric, old_value, new_value, change, regressed in rows:
+        print(f"{name:28} {metric:15} {old_value:12.3f} {new_value:12.3f} {change:+8.1f}%{'  REGRESSION' if regressed else ''}")
+    return 1 if any(row[-1] for row in rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,203 @@
+"""Drive /analyze, /api/fantasy_team, /api/ipl_matches and /api/live-matches with concurrent clients
+and report throughput and latency percentiles per endpoint
+
+Run from the Backend directory: python -m benchmarks.load_test --concurrency 8 --duration 10
+
+By default the app is served in-process (threaded werkzeug server, preloaded as under gunicorn)
+with its upstream feeds pointed at a local stub, so no request leaves the machine. --url targets
+a server that is already running instead, e.g. gunicorn started with LIVE_MATCHES_URL and
+POINTS_TABLE_URL set to the stub this script prints with --stub-only.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from benchmarks.timing import BACKEND_DIR, save_results, summarize
+
+ENDPOINTS = ['analyze', 'fantasy_team', 'ipl_matches', 'live_matches']
+
+
+class StubUpstream(BaseHTTPRequestHandler):
+    """Serves the bundled live-matches and points-table JSON with an ETag, as the real feeds do"""
+    protocol_version = 'HTTP/1.1'
+    bodies = {}
+    hits = 0
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        StubUpstream.hits += 1
+        body, etag = self.bodies.get(self.path.split('?')[0], (None, None))
+        if body is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_stub():
+    """Start the stub upstream on a free port; returns (server, base URL)"""
+    for path, filename in (('/live', 'ipl_matches_2025.json'), ('/points', 'points_table.json')):
+        with open(os.path.join(BACKEND_DIR, 'Static', 'public', filename), 'rb') as f:
+            body = f.read()
+        StubUpstream.bodies[path] = (body, f'"{len(body):x}"')
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubUpstream)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def start_app(stub_url):
+    """Serve the app in this process with its feeds on the stub; returns the base URL"""
+    os.environ['LIVE_MATCHES_URL'] = f'{stub_url}/live'
+    os.environ['POINTS_TABLE_URL'] = f'{stub_url}/points'
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    import app
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    app.preload()
+    server = make_server('127.0.0.1', 0, app.app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}'
+
+
+def request_factories(rng):
+    """{endpoint: function returning (method, path, body)} with realistic, varied payloads"""
+    from player_registry import get_registry
+    registry = get_registry()
+    teams = sorted({record.team for record in registry.records})
+    squads = {team: [f"{p.name}({p.role})" for p in registry.team_players(team)] for team in teams}
+    batters = bowlers = [record.name for record in registry.records]
+    from app import DELIVERIES_FILE, deliveries_store
+    if os.path.exists(os.path.join(BACKEND_DIR, DELIVERIES_FILE)):
+        # Names that occur in the deliveries, so most requests hit a real pair
+        store = deliveries_store(os.path.join(BACKEND_DIR, DELIVERIES_FILE))
+        batters, bowlers = store.names('batter'), store.names('bowler')
+    venues = ['Wankhede Stadium, Mumbai', 'Eden Gardens, Kolkata', 'M Chinnaswamy Stadium, Bengaluru',
+              'Narendra Modi Stadium, Ahmedabad', 'MA Chidambaram Stadium, Chennai']
+
+    def analyze():
+        query = urllib.parse.urlencode({'batter': rng.choice(batters), 'bowler': rng.choice(bowlers)})
+        return 'GET', f'/analyze?{query}', None
+
+    def fantasy_team():
+        team1, team2 = rng.sample(teams, 2)
+        body = {'team1': team1, 'team2': team2, 'venue': rng.choice(venues),
+                'team1_playing11': squads[team1], 'team2_playing11': squads[team2]}
+        return 'POST', '/api/fantasy_team', json.dumps(body)
+
+    return {
+        'analyze': analyze,
+        'fantasy_team': fantasy_team,
+        'ipl_matches': lambda: ('GET', '/api/ipl_matches', None),
+        'live_matches': lambda: ('GET', '/api/live-matches', None),
+    }
+
+
+def client(base_url, make_request, deadline, latencies, errors):
+    """One client: sends requests back to back until deadline, reusing its connection while it can"""
+    parsed = urllib.parse.urlsplit(base_url)
+    connection = None
+    while time.perf_counter() < deadline:
+        method, path, body = make_request()
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        start = time.perf_counter()
+        try:
+            if connection is None:
+                connection = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=60)
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            elapsed = time.perf_counter() - start
+            # 404 is a valid /analyze answer for players who never met
+            if response.status >= 500 or response.status in (400, 401, 403):
+                errors.append(response.status)
+            else:
+                latencies.append(elapsed)
+            if response.will_close:
+                connection.close()
+                connection = None
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(type(e).__name__)
+            if connection is not None:
+                connection.close()
+            connection = None
+    if connection is not None:
+        connection.close()
+
+
+def run_endpoint(base_url, make_request, concurrency, duration):
+    latencies, errors = [], []
+    start = time.perf_counter()
+    deadline = start + duration
+    threads = [threading.Thread(target=client, args=(base_url, make_request, deadline, latencies, errors))
+               for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    summary = summarize(latencies)
+    summary['throughput_rps'] = round(len(latencies) / elapsed, 2)
+    summary['errors'] = len(errors)
+    if errors:
+        summary['error_kinds'] = sorted({str(e) for e in errors})
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help="base URL of an already running server (default: serve the app in-process)")
+    parser.add_argument('--endpoints', default=','.join(ENDPOINTS), help=f"comma-separated subset of {ENDPOINTS}")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10, help="seconds per endpoint")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--stub-only', action='store_true', help="only run the stub upstream and print its URLs")
+    parser.add_argument('--json', help="results file (default: benchmarks/results/load_test-<commit>-<time>.json; '-' to skip)")
+    args = parser.parse_args()
+
+    stub, stub_url = start_stub()
+    if args.stub_only:
+        print(f"LIVE_MATCHES_URL={stub_url}/live POINTS_TABLE_URL={stub_url}/points")
+        threading.Event().wait()
+    base_url = args.url or start_app(stub_url)
+
+    factories = request_factories(random.Random(args.seed))
+    results = {}
+    for endpoint in args.endpoints.split(','):
+        hits = StubUpstream.hits
+        summary = results[endpoint] = run_endpoint(base_url, factories[endpoint], args.concurrency, args.duration)
+        if not args.url:
+            summary['upstream_requests'] = StubUpstream.hits - hits
+        print(f"{endpoint:14} {summary['throughput_rps']:9.1f} req/s  p50 {summary.get('p50_ms', 0):8.2f} ms  "
+              f"p99 {summary.get('p99_ms', 0):8.2f} ms  errors {summary['errors']}")
+    stub.shutdown()
+
+    path = save_results(args.json, 'load_test', results, vars(args))
+    if path:
+        print(f"Results written to {path}")
+    return 1 if any(r['errors'] for r in results.values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
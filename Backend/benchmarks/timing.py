@@ -0,0 +1,102 @@
+"""Timing, percentile and result-file helpers shared by the benchmarks"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, 'benchmarks', 'results')
+
+
+def percentile(sorted_values, q):
+    """q-th percentile (0-100) of already sorted values, interpolating between ranks"""
+    if not sorted_values:
+        return None
+    rank = (len(sorted_values) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def summarize(seconds):
+    """Count, mean and percentiles in milliseconds of a list of durations in seconds"""
+    values = sorted(s * 1000 for s in seconds)
+    if not values:
+        return {'n': 0}
+    return {
+        'n': len(values),
+        'mean_ms': round(sum(values) / len(values), 4),
+        'min_ms': round(values[0], 4),
+        'p50_ms': round(percentile(values, 50), 4),
+        'p90_ms': round(percentile(values, 90), 4),
+        'p99_ms': round(percentile(values, 99), 4),
+        'max_ms': round(values[-1], 4),
+    }
+
+
+def measure(fn, repeat=100, warmup=5, setup=None):
+    """Time fn() repeat times after warmup untimed calls; setup() runs untimed before every call
+
+    The first warm-up call is reported separately as first_ms: it pays for lazy loading.
+    """
+    first = None
+    for i in range(warmup):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        if i == 0:
+            first = time.perf_counter() - start
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    summary = summarize(samples)
+    if first is not None:
+        summary['first_ms'] = round(first * 1000, 4)
+    return summary
+
+
+def format_summary(label, summary, width=28):
+    if not summary.get('n'):
+        return f"{label:{width}} no samples"
+    line = (f"{label:{width}} p50 {summary['p50_ms']:9.3f} ms  p90 {summary['p90_ms']:9.3f} ms  "
+            f"p99 {summary['p99_ms']:9.3f} ms  mean {summary['mean_ms']:9.3f} ms  (n={summary['n']})")
+    if 'first_ms' in summary:
+        line += f"  first {summary['first_ms']:.3f} ms"
+    return line
+
+
+def environment():
+    """Where and on what the results were measured, so runs of different commits can be compared"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=BACKEND_DIR, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'commit': commit,
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def save_results(path, benchmark, results, parameters=None):
+    """Write results as JSON; a path of '-' skips saving. Returns the path written"""
+    if path == '-':
+        return None
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        commit = environment()['commit'] or 'local'
+        path = os.path.join(RESULTS_DIR, f"{benchmark}-{commit}-{time.strftime('%Y%m%d%H%M%S')}.json")
+    with open(path, 'w') as f:
+        json.dump({'benchmark': benchmark, 'environment': environment(), 'parameters': parameters or {},
+                   'results': results}, f, indent=2)
+    return path
@@ -0,0 +1,496 @@
+"""Rebuild batter_data_cache.json and bowler_data_cache.json from deliveries.csv.
+
+deliveries.csv is streamed in chunks of whole matches; each chunk is reduced with vectorized
+groupbys to per-innings rows and per-over and per-pair totals, so memory is bounded by the
+number of innings played rather than by deliveries. Per-player sections are then rendered
+across a process pool sharded by player.
+
+    python cache_builder.py --deliveries deliveries.csv --matches matches.csv [--out-dir cache_build]
+
+Writes the two JSON caches in the layout Dream11Predictor reads (text tables included, bowlers'
+position as both over-wise and phase-wise tables) and player_stats_numeric.json with the same
+sections as numeric records. matches.csv supplies each match's date and venue; a missing file is
+an error unless --no-matches is given, which leaves the venue and recent_form sections out. The files go to cache_build/ by default; compare them
+with the bundled ones before passing --out-dir Static/public to replace those.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+import numpy as np
+import pandas as pd
+from deliveries import CHUNK_ROWS, NON_LEGAL_EXTRAS, SUMMARY_COUNTS, match_chunks, pair_counts
+from ingest import BYE_EXTRAS, NON_BALL_EXTRAS, NON_BOWLER_DISMISSALS, RECENT_MATCHES
+from player_registry import get_registry
+
+BATTER_CACHE_FILE = 'batter_data_cache.json'
+BOWLER_CACHE_FILE = 'bowler_data_cache.json'
+NUMERIC_FILE = 'player_stats_numeric.json'
+# Builds land here unless --out-dir says otherwise, never over the bundled caches in Static/public
+OUT_DIR = 'cache_build'
+
+BUILD_COLUMNS = ['match_id', 'inning', 'batting_team', 'bowling_team', 'over', 'ball', 'batter', 'bowler',
+                 'non_striker', 'batsman_runs', 'extra_runs', 'total_runs', 'extras_type', 'is_wicket',
+                 'player_dismissed', 'dismissal_kind']
+BUILD_DTYPES = {
+    'match_id': 'int64',
+    'inning': 'int8',
+    'batting_team': 'category',
+    'bowling_team': 'category',
+    'over': 'int16',
+    'ball': 'int16',
+    'batter': 'category',
+    'bowler': 'category',
+    'non_striker': 'category',
+    'batsman_runs': 'int8',
+    'extra_runs': 'int8',
+    'total_runs': 'int8',
+    'extras_type': 'category',
+    'is_wicket': 'int8',
+    'player_dismissed': 'category',
+    'dismissal_kind': 'category',
+}
+
+INNINGS_KEYS = ['match_id', 'inning', 'player']
+BATTING_SUMS = {'Runs': 'sum', 'Balls': 'sum', 'Fours': 'sum', 'Sixes': 'sum', 'first': 'min', 'Dismissed': 'sum'}
+BOWLING_SUMS = {'Balls': 'sum', 'Runs': 'sum', 'Wickets': 'sum'}
+OVER_SUMS = {'Matches_Bowled': 'sum', 'Balls': 'sum', 'Runs': 'sum', 'Wickets': 'sum'}
+# Phases of an innings by their first (0-based) over; later overs belong to the last phase
+PHASE_STARTS = [0, 6, 15]
+PHASE_NAMES = ['Powerplay', 'Middle Overs', 'Death Overs']
+
+
+def _grouped(frame, keys, aggregations):
+    """groupby on chunk-local categoricals, re-keyed by plain strings so partials from any chunk merge"""
+    grouped = frame.groupby(keys, observed=True, sort=False).agg(aggregations).reset_index()
+    for key in keys:
+        if isinstance(grouped[key].dtype, pd.CategoricalDtype):
+            grouped[key] = grouped[key].astype(str)
+    return grouped.set_index(keys)
+
+
+def _merge(accumulated, partial, keys, aggregations):
+    if accumulated is None:
+        return partial
+    return pd.concat([accumulated, partial]).groupby(keys, sort=False).agg(aggregations)
+
+
+class Partials:
+    """Mergeable partial totals of a deliveries stream
+
+    add() must be given whole matches: per-innings rows are final as soon as they are computed
+    and are only appended, while per-over and per-pair totals are merged across chunks.
+    """
+
+    def __init__(self):
+        self.batting = []
+        self.bowling = []
+        self.teams = []
+        self.overs = None
+        self.phases = None
+        self.batter_pairs = None
+        self.bowler_pairs = None
+        self.rows = 0
+
+    def add(self, df):
+        if df.empty:
+            return
+        self.rows += len(df)
+        extras = df['extras_type']
+        faced = (~extras.isin(NON_LEGAL_EXTRAS)).astype(np.int64)
+        bowled = (~extras.isin(NON_BALL_EXTRAS)).astype(np.int64)
+        runs = df['batsman_runs'].astype(np.int64)
+        conceded = df['total_runs'].astype(np.int64) - np.where(extras.isin(BYE_EXTRAS), df['extra_runs'], 0)
+        wicket = ((df['is_wicket'] == 1) & ~df['dismissal_kind'].isin(NON_BOWLER_DISMISSALS)).astype(np.int64)
+        # Order of arrival at the crease: striker before non-striker on the same ball
+        order = (df['over'].astype(np.int64) * 1000 + df['ball'].astype(np.int64)) * 2
+
+        striker = pd.DataFrame({
+            'match_id': df['match_id'], 'inning': df['inning'], 'player': df['batter'],
+            'Runs': runs, 'Balls': faced, 'Fours': (runs == 4).astype(np.int64), 'Sixes': (runs == 6).astype(np.int64),
+            'first': order, 'Dismissed': 0,
+        })
+        non_striker = pd.DataFrame({
+            'match_id': df['match_id'], 'inning': df['inning'], 'player': df['non_striker'],
+            'Runs': 0, 'Balls': 0, 'Fours': 0, 'Sixes': 0, 'first': order + 1, 'Dismissed': 0,
+        })
+        out = df[df['player_dismissed'].notna()]
+        dismissed = pd.DataFrame({
+            'match_id': out['match_id'], 'inning': out['inning'], 'player': out['player_dismissed'],
+            'Runs': 0, 'Balls': 0, 'Fours': 0, 'Sixes': 0, 'first': np.iinfo(np.int64).max, 'Dismissed': 1,
+        })
+        batting = pd.concat([_grouped(part, INNINGS_KEYS, BATTING_SUMS) for part in (striker, non_striker, dismissed)])
+        self.batting.append(batting.groupby(INNINGS_KEYS, sort=False).agg(BATTING_SUMS))
+
+        phase = np.searchsorted(PHASE_STARTS, df['over'].to_numpy(), side='right') - 1
+        bowling = pd.DataFrame({
+            'match_id': df['match_id'], 'inning': df['inning'], 'player': df['bowler'],
+            'over': df['over'], 'phase': np.asarray(PHASE_NAMES)[phase], 'Balls': bowled, 'Runs': conceded,
+            'Wickets': wicket,
+        })
+        self.bowling.append(_grouped(bowling, INNINGS_KEYS, BOWLING_SUMS))
+        overs = _grouped(bowling, ['match_id', 'player', 'over'], BOWLING_SUMS).assign(Matches_Bowled=1)
+        overs = overs.groupby(['player', 'over'], sort=False).agg(OVER_SUMS)
+        self.overs = _merge(self.overs, overs, ['player', 'over'], OVER_SUMS)
+        # Matches are whole within a chunk, so each (match, phase) counts once towards Matches_Bowled
+        phases = _grouped(bowling, ['match_id', 'player', 'phase'], BOWLING_SUMS).assign(Matches_Bowled=1)
+        phases = phases.groupby(['player', 'phase'], sort=False).agg(OVER_SUMS)
+        self.phases = _merge(self.phases, phases, ['player', 'phase'], OVER_SUMS)
+
+        pairs, counts = pair_counts(df)
+        index = pd.MultiIndex.from_tuples(pairs, names=['batter', 'bowler']) if pairs else \
+            pd.MultiIndex.from_arrays([[], []], names=['batter', 'bowler'])
+        self.batter_pairs = _merge(self.batter_pairs, pd.DataFrame(counts, columns=SUMMARY_COUNTS, index=index),
+                                   ['batter', 'bowler'], 'sum')
+
+        # Compare the dismissed player and the batter as strings: their categories differ
+        credited = wicket.astype(bool) & (df['player_dismissed'].astype(object) == df['batter'].astype(object))
+        bowler_pairs = pd.DataFrame({
+            'bowler': df['bowler'], 'batter': df['batter'],
+            'Balls': bowled, 'Runs': conceded, 'Dismissals': credited.astype(np.int64),
+        })
+        self.bowler_pairs = _merge(self.bowler_pairs, _grouped(bowler_pairs, ['bowler', 'batter'], 'sum'),
+                                   ['bowler', 'batter'], 'sum')
+
+        teams = df[['match_id', 'inning', 'batting_team', 'bowling_team']].drop_duplicates(['match_id', 'inning'])
+        self.teams.append(teams.astype({'batting_team': str, 'bowling_team': str}))
+
+
+def stream_partials(deliveries_path, chunk_rows=CHUNK_ROWS):
+    """Partials of deliveries.csv read chunk_rows at a time, each match whole"""
+    partials = Partials()
+    for chunk in match_chunks(deliveries_path, BUILD_COLUMNS, BUILD_DTYPES, chunk_rows):
+        partials.add(chunk)
+    return partials
+
+
+def read_match_meta(matches_path):
+    """DataFrame of match_id, Date and venue, or None if matches_path is None"""
+    if matches_path is None:
+        return None
+    if not os.path.exists(matches_path):
+        raise FileNotFoundError(f"{matches_path} not found: the venue and recent_form sections need each match's date and venue")
+    matches = pd.read_csv(matches_path, usecols=['id', 'date', 'venue'])
+    return matches.rename(columns={'id': 'match_id', 'date': 'Date'})
+
+
+def innings_tables(partials, match_meta):
+    """Per-innings batting and bowling rows with teams, position, date and venue attached, and the per-over
+    and per-phase bowling totals"""
+    teams = pd.concat(partials.teams)
+    batting = pd.concat(partials.batting).reset_index()
+    batting['Position'] = batting.groupby(['match_id', 'inning'])['first'].rank(method='first').astype(np.int64)
+    batting['Dismissed'] = batting['Dismissed'] > 0
+    batting = batting.merge(teams, on=['match_id', 'inning'], how='left')
+
+    bowling = pd.concat(partials.bowling).reset_index().merge(teams, on=['match_id', 'inning'], how='left')
+    overs = partials.overs.reset_index()
+    phases = partials.phases.reset_index()
+    if match_meta is not None:
+        batting = batting.merge(match_meta, on='match_id', how='left')
+        bowling = bowling.merge(match_meta, on='match_id', how='left')
+    else:
+        batting['Date'] = batting['venue'] = None
+        bowling['Date'] = bowling['venue'] = None
+    return batting, bowling, overs, phases
+
+
+def _ratio(numerator, denominator, scale=1.0):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator > 0, numerator / denominator * scale, 0.0)
+
+
+def _batting_totals(innings, by):
+    grouped = innings.groupby(by, sort=False).agg(
+        Innings=('Runs', 'size'), Runs=('Runs', 'sum'), Balls=('Balls', 'sum'), Dismissals=('Dismissed', 'sum'),
+        Fifties=('Runs', lambda r: int(((r >= 50) & (r < 100)).sum())), Hundreds=('Runs', lambda r: int((r >= 100).sum())),
+        Boundaries=('Fours', 'sum'), Sixes=('Sixes', 'sum'),
+    ).reset_index()
+    grouped['Boundaries'] += grouped.pop('Sixes')
+    grouped['Dismissals'] = grouped['Dismissals'].astype(np.int64)
+    # Without a dismissal the average is the run total, as in the head-to-head summaries
+    grouped['Average'] = np.where(grouped['Dismissals'] > 0, _ratio(grouped['Runs'], grouped['Dismissals']), grouped['Runs'])
+    grouped['Strike Rate'] = _ratio(grouped['Runs'], grouped['Balls'], 100)
+    grouped['Boundary %'] = _ratio(grouped['Boundaries'], grouped['Balls'], 100)
+    return grouped
+
+
+def _bowling_totals(innings, by):
+    grouped = innings.groupby(by, sort=False).agg(
+        Innings=('Balls', 'size'), Balls_Bowled=('Balls', 'sum'), Runs_Conceded=('Runs', 'sum'), Wickets=('Wickets', 'sum'),
+        Three_Wicket_Hauls=('Wickets', lambda w: int(((w >= 3) & (w < 5)).sum())),
+        Five_Wicket_Hauls=('Wickets', lambda w: int((w >= 5).sum())),
+    ).reset_index()
+    grouped['Economy'] = _ratio(grouped['Runs_Conceded'], grouped['Balls_Bowled'], 6)
+    return grouped
+
+
+def batter_sections(innings):
+    """vs_team, position, venue and recent_form tables of one batter's innings"""
+    vs_team = _batting_totals(innings, 'bowling_team').sort_values('Runs', ascending=False)
+    vs_team = vs_team[['bowling_team', 'Innings', 'Runs', 'Balls', 'Dismissals', 'Fifties', 'Hundreds', 'Boundaries',
+                       'Average', 'Strike Rate', 'Boundary %']].round(2)
+
+    position = _batting_totals(innings, 'Position').sort_values('Position').reset_index(drop=True)
+    position = position[['Position', 'Innings', 'Runs', 'Balls', 'Dismissals', 'Fifties', 'Hundreds', 'Average', 'Strike Rate']].round(2)
+
+    dated = innings[innings['Date'].notna()]
+    venue = _batting_totals(dated, 'venue').sort_values('Runs', ascending=False) if len(dated) else _batting_totals(innings.iloc[0:0], 'venue')
+    venue = venue.rename(columns={'Balls': 'Balls_Faced'})[
+        ['venue', 'Innings', 'Runs', 'Balls_Faced', 'Dismissals', 'Fifties', 'Hundreds', 'Average', 'Strike Rate']]
+
+    recent = dated.sort_values(['Date', 'match_id']).tail(RECENT_MATCHES).reset_index(drop=True)
+    match_wise = pd.DataFrame({
+        'Date': recent['Date'], 'Runs': recent['Runs'], 'Balls': recent['Balls'], 'Dismissed': recent['Dismissed'],
+        'Strike Rate': np.round(_ratio(recent['Runs'], recent['Balls'], 100), 2),
+    })
+    runs, balls, dismissals = int(recent['Runs'].sum()), int(recent['Balls'].sum()), int(recent['Dismissed'].sum())
+    summary = pd.DataFrame([{
+        'Type': 'Batter', 'Runs (Last 5 matches)': runs, 'Dismissals': dismissals,
+        'Average': round(runs / dismissals, 2) if dismissals else float(runs),
+        'Strike Rate': round(runs / balls * 100, 2) if balls else 0.0,
+    }])
+    return {'vs_team': vs_team, 'position': position, 'venue': venue, 'summary': summary, 'match_wise': match_wise}
+
+
+def bowler_sections(innings, overs, phases):
+    """vs_team, over-wise and phase-wise position, venue and recent_form tables of one bowler's innings"""
+    vs_team = _bowling_totals(innings, 'batting_team').sort_values(['Wickets', 'Economy'], ascending=[False, True])
+    vs_team = vs_team.round(2)
+
+    by_over = overs.sort_values('over').reset_index(drop=True).rename(
+        columns={'over': 'Over', 'Balls': 'Balls_Bowled', 'Runs': 'Runs_Conceded'},
+    )[['Over', 'Matches_Bowled', 'Balls_Bowled', 'Runs_Conceded', 'Wickets']]
+    by_over['Economy'] = np.round(_ratio(by_over['Runs_Conceded'], by_over['Balls_Bowled'], 6), 2)
+    # Overs_Bowled counts balls, as in the original caches
+    by_phase = phases.sort_values('phase').reset_index(drop=True).rename(
+        columns={'phase': 'Phase', 'Balls': 'Overs_Bowled', 'Runs': 'Runs_Conceded'},
+    )[['Phase', 'Matches_Bowled', 'Overs_Bowled', 'Runs_Conceded', 'Wickets']]
+    by_phase['Economy'] = np.round(_ratio(by_phase['Runs_Conceded'], by_phase['Overs_Bowled'], 6), 2)
+
+    dated = innings[innings['Date'].notna()]
+    venue = _bowling_totals(dated, 'venue').sort_values('Wickets', ascending=False) if len(dated) else _bowling_totals(innings.iloc[0:0], 'venue')
+
+    recent = dated.sort_values(['Date', 'match_id']).tail(RECENT_MATCHES).reset_index(drop=True)
+    match_wise = pd.DataFrame({
+        'Date': recent['Date'], 'Balls': recent['Balls'], 'Runs Conceded': recent['Runs'], 'Wickets': recent['Wickets'],
+        'Economy': np.round(_ratio(recent['Runs'], recent['Balls'], 6), 2),
+    })
+    summary = pd.DataFrame([{
+        'Type': 'Bowler', 'Wickets (Last 5 matches)': int(recent['Wickets'].sum()),
+        'Average Economy': round(float(match_wise['Economy'].mean()), 2) if len(match_wise) else 0.0,
+    }])
+    return {'vs_team': vs_team, 'position': by_over, 'phases': by_phase, 'venue': venue, 'summary': summary,
+            'match_wise': match_wise}
+
+
+def _records(frame):
+    return json.loads(frame.to_json(orient='records'))
+
+
+def batter_h2h(batter, pairs, opponent_key):
+    """head_to_head entries of one batter, in the layout of the existing cache"""
+    entries = {}
+    for bowler, row in pairs.iterrows():
+        counts = [int(v) for v in row[SUMMARY_COUNTS]]
+        summary = {'Batter': batter, 'Bowler': bowler}
+        summary.update(zip(SUMMARY_COUNTS, counts))
+        balls, runs, dismissals = counts[0], counts[2], counts[8]
+        summary['Strike Rate'] = round(runs / balls * 100, 2) if balls else 0.0
+        summary['Average'] = round(runs / dismissals, 2) if dismissals else runs
+        summary['Boundary %'] = round((counts[6] + counts[7]) / balls * 100, 2) if balls else 0.0
+        entries[opponent_key(bowler)] = [summary]
+    return entries
+
+
+def bowler_h2h(pairs, opponent_key):
+    entries = {}
+    for batter, row in pairs.iterrows():
+        balls, runs, dismissals = int(row['Balls']), int(row['Runs']), int(row['Dismissals'])
+        entries[opponent_key(batter)] = {
+            'Balls': balls, 'Runs': runs, 'Dismissals': dismissals,
+            'Avg': round(runs / dismissals, 2) if dismissals else runs,
+            'Econ': round(runs / balls * 6, 2) if balls else 0.0,
+        }
+    return entries
+
+
+# Tables of the whole build, inherited by forked workers instead of being pickled per task
+_BUILD = {}
+
+
+def build_player(task):
+    """(key, batter entry or None, bowler entry or None, numeric record) for one player"""
+    key, name = task
+    tables = _BUILD
+    opponent_key = lambda n: tables['display'].get(n, n)
+    batter_entry = bowler_entry = None
+    numeric = {}
+    # Without match dates and venues these sections would only hold empty tables
+    undated = () if tables['dated'] else ('venue', 'recent_form', 'match_wise')
+
+    innings = tables['batting'].get(name)
+    if innings is not None:
+        sections = batter_sections(innings)
+        pairs = tables['batter_pairs'].get(name)
+        h2h = batter_h2h(name, pairs, opponent_key) if pairs is not None else {}
+        batter_entry = {
+            'head_to_head': h2h,
+            'vs_team': {'Batting': sections['vs_team'].to_string()},
+            'position': {'Batting': sections['position'].to_string()},
+            'recent_form': [['Batting Summary', sections['summary'].to_string()],
+                            ['Batting Match-wise', sections['match_wise'].to_string()]],
+            'venue': {'Batting': sections['venue'].to_string()},
+        }
+        numeric['batting'] = {
+            'head_to_head': {opponent: entry[0] for opponent, entry in h2h.items()},
+            **{section: _records(sections[section]) for section in ('vs_team', 'position', 'venue', 'match_wise')},
+        }
+        for section in undated:
+            batter_entry.pop(section, None)
+            numeric['batting'].pop(section, None)
+
+    innings = tables['bowling'].get(name)
+    if innings is not None:
+        sections = bowler_sections(innings, tables['overs'][name], tables['phases'][name])
+        pairs = tables['bowler_pairs'].get(name)
+        h2h = bowler_h2h(pairs, opponent_key) if pairs is not None else {}
+        bowler_entry = {
+            'head_to_head': h2h,
+            'vs_team': {'Bowling': sections['vs_team'].to_string()},
+            'position': {'Bowling_Overwise': sections['position'].to_string(),
+                         'Bowling_Phasewise': sections['phases'].to_string()},
+            'recent_form': [['Bowling Summary', sections['summary'].to_string()],
+                            ['Bowling Match-wise', sections['match_wise'].to_string()]],
+            'venue': {'Bowling': sections['venue'].to_string()},
+        }
+        numeric['bowling'] = {
+            'head_to_head': h2h,
+            **{section: _records(sections[section]) for section in ('vs_team', 'position', 'phases', 'venue', 'match_wise')},
+        }
+        for section in undated:
+            bowler_entry.pop(section, None)
+            numeric['bowling'].pop(section, None)
+    return key, batter_entry, bowler_entry, numeric
+
+
+def _by_player(frame, column='player'):
+    return {name: group for name, group in frame.groupby(column, sort=False)}
+
+
+def _by_first_level(frame):
+    return {name: group.droplevel(0) for name, group in frame.groupby(level=0, sort=False)}
+
+
+def build_caches(deliveries_path, matches_path, out_dir, all_players=False, workers=None, chunk_rows=CHUNK_ROWS):
+    """Rebuild every cache file into out_dir; returns a dict of timings and counts
+
+    matches_path None builds without the venue and recent_form sections.
+    """
+    timings = {}
+    start = time.perf_counter()
+    match_meta = read_match_meta(matches_path)
+    partials = stream_partials(deliveries_path, chunk_rows)
+    timings['stream'] = time.perf_counter() - start
+
+    batting, bowling, overs, phases = innings_tables(partials, match_meta)
+    _BUILD.clear()
+    _BUILD.update({
+        'dated': match_meta is not None,
+        'batting': _by_player(batting),
+        'bowling': _by_player(bowling),
+        'overs': _by_player(overs),
+        'phases': _by_player(phases),
+        'batter_pairs': _by_first_level(partials.batter_pairs),
+        'bowler_pairs': _by_first_level(partials.bowler_pairs),
+        'display': {},
+    })
+
+    if all_players:
+        tasks = [(name, name) for name in sorted(set(_BUILD['batting']) | set(_BUILD['bowling']))]
+    else:
+        # Squad players keyed by their sheet names, looked up under their cricsheet names
+        tasks = []
+        for record in get_registry().records:
+            name = record.cricsheet_name or record.name
+            _BUILD['display'].setdefault(name, record.name)
+            if name in _BUILD['batting'] or name in _BUILD['bowling']:
+                tasks.append((record.name, name))
+        tasks = list(dict(tasks).items())
+    timings['reduce'] = time.perf_counter() - start - timings['stream']
+
+    workers = workers or os.cpu_count() or 1
+    batter_cache, bowler_cache, numeric = {}, {}, {}
+    if workers == 1:
+        results = map(build_player, tasks)
+        pool = None
+    else:
+        context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+        pool = context.Pool(workers)
+        # Contiguous shards of players per task keep the per-task overhead small
+        results = pool.imap(build_player, tasks, chunksize=max(1, len(tasks) // (workers * 4)))
+    try:
+        for key, batter_entry, bowler_entry, record in results:
+            if batter_entry is not None:
+                batter_cache[key] = batter_entry
+            if bowler_entry is not None:
+                bowler_cache[key] = bowler_entry
+            numeric[key] = record
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    timings['render'] = time.perf_counter() - start - timings['stream'] - timings['reduce']
+
+    os.makedirs(out_dir, exist_ok=True)
+    for filename, payload in ((BATTER_CACHE_FILE, batter_cache), (BOWLER_CACHE_FILE, bowler_cache), (NUMERIC_FILE, numeric)):
+        path = os.path.join(out_dir, filename)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, indent=None if filename == NUMERIC_FILE else 4)
+        os.replace(tmp_path, path)
+    timings['total'] = time.perf_counter() - start
+    return {'rows': partials.rows, 'batters': len(batter_cache), 'bowlers': len(bowler_cache), 'timings': timings}
+
+
+def peak_memory_mb():
+    """Peak resident set size of this process and of its (finished) workers, in MB"""
+    scale = 1 / 1024 if sys.platform != 'darwin' else 1 / (1024 * 1024)
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--deliveries', default='deliveries.csv')
+    parser.add_argument('--matches', default='matches.csv', help="matches.csv with id, date and venue")
+    parser.add_argument('--no-matches', action='store_true',
+                        help="build without matches.csv, leaving out the venue and recent_form sections")
+    parser.add_argument('--out-dir', default=OUT_DIR, help="Static/public replaces the caches the server reads")
+    parser.add_argument('--all-players', action='store_true',
+                        help="build every player under their cricsheet name instead of the squad players")
+    parser.add_argument('--workers', type=int, default=None, help="defaults to the number of CPUs")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+    if args.no_matches:
+        matches_path = None
+        print("Building without matches.csv: the venue and recent_form sections are left out")
+    elif os.path.exists(args.matches):
+        matches_path = args.matches
+    else:
+        parser.error(f"{args.matches} not found; the venue and recent_form sections need it (or pass --no-matches)")
+
+    result = build_caches(args.deliveries, matches_path, args.out_dir, args.all_players, args.workers, args.chunk_rows)
+    timings = result['timings']
+    parent_mb, workers_mb = peak_memory_mb()
+    print(f"Built {result['batters']} batters and {result['bowlers']} bowlers from {result['rows']} deliveries "
+          f"in {timings['total']:.2f}s (stream {timings['stream']:.2f}s, reduce {timings['reduce']:.2f}s, "
+          f"render {timings['render']:.2f}s); peak RSS {parent_mb:.0f} MB, workers {workers_mb:.0f} MB")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
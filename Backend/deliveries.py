@@ -0,0 +1,340 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# Only the columns the head-to-head summaries need are kept in memory
+DELIVERIES_COLUMNS = ['batter', 'bowler', 'batsman_runs', 'extras_type', 'player_dismissed']
+DELIVERIES_DTYPES = {
+    'batter': 'category',
+    'bowler': 'category',
+    'batsman_runs': 'int8',
+    'extras_type': 'category',
+    'player_dismissed': 'category',
+}
+
+# Extras that don't count as legal deliveries faced
+NON_LEGAL_EXTRAS = ['wides', 'legbyes', 'byes']
+SUMMARY_COUNTS = ['Balls Faced', 'Dot Balls', 'Total Runs', '1s', '2s', '3s', '4s', '6s', 'Dismissals']
+
+# Bytes at the end of the loaded data re-read to confirm a larger file was only appended to
+APPEND_CHECK_BYTES = 4096
+# Rows parsed at a time; memory use while loading depends on this, not on the file size
+CHUNK_ROWS = 200000
+
+
+class _Section:
+    """File-like view of bytes start..stop of an open file, optionally preceded by prefix"""
+
+    def __init__(self, f, start, stop, prefix=b''):
+        self._f = f
+        self._prefix = prefix
+        self._remaining = stop - start
+        f.seek(start)
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = len(self._prefix) + self._remaining
+        data = self._prefix[:size]
+        self._prefix = self._prefix[len(data):]
+        if len(data) < size and self._remaining > 0:
+            block = self._f.read(min(size - len(data), self._remaining))
+            self._remaining -= len(block)
+            data += block
+        return data
+
+    def __iter__(self):
+        return iter(lambda: self.read(1 << 16), b'')
+
+
+def read_chunks(path_or_buffer, columns=DELIVERIES_COLUMNS, dtypes=DELIVERIES_DTYPES, chunk_rows=CHUNK_ROWS):
+    """Deliveries chunk_rows at a time, parsing only columns, with narrow dtypes"""
+    return pd.read_csv(path_or_buffer, usecols=columns, dtype={c: dtypes[c] for c in columns if c in dtypes},
+                       chunksize=chunk_rows)
+
+
+def match_chunks(path_or_buffer, columns, dtypes, chunk_rows=CHUNK_ROWS):
+    """Like read_chunks, but every match's rows arrive in the same chunk
+
+    The rows of each chunk's last match are held back and prepended to the next chunk.
+    The file must keep each match's rows together.
+    """
+    seen = set()
+    carry = None
+    for chunk in read_chunks(path_or_buffer, columns, dtypes, chunk_rows):
+        match_ids = set(pd.unique(chunk['match_id']).tolist())
+        if carry is not None:
+            match_ids.discard(int(carry['match_id'].iloc[0]))
+            chunk = concat_frames([carry, chunk])
+        if seen & match_ids:
+            raise ValueError(f"Deliveries split matches {sorted(seen & match_ids)[:10]}; keep each match's rows together")
+        seen.update(match_ids)
+        last = chunk['match_id'].to_numpy() == chunk['match_id'].iloc[-1]
+        carry = chunk[last]
+        if not last.all():
+            yield chunk[~last]
+    if carry is not None:
+        yield carry
+
+
+def pair_counts(frame):
+    """Per-(batter, bowler) SUMMARY_COUNTS of a deliveries frame: (list of name pairs, int64 counts)"""
+    legal = frame[~frame['extras_type'].isin(NON_LEGAL_EXTRAS) | frame['extras_type'].isna()]
+    batter_codes = legal['batter'].cat.codes.to_numpy()
+    bowler_codes = legal['bowler'].cat.codes.to_numpy()
+    runs = legal['batsman_runs'].to_numpy().astype(np.int64)
+    # Re-code the dismissed player against the batter categories so both compare as integers
+    dismissed_codes = pd.Categorical(legal['player_dismissed'], categories=legal['batter'].cat.categories).codes
+
+    per_ball = pd.DataFrame({
+        'batter': batter_codes,
+        'bowler': bowler_codes,
+        'Balls Faced': np.ones(len(legal), dtype=np.int64),
+        'Dot Balls': runs == 0,
+        'Total Runs': runs,
+        '1s': runs == 1,
+        '2s': runs == 2,
+        '3s': runs == 3,
+        '4s': runs == 4,
+        '6s': runs == 6,
+        'Dismissals': (dismissed_codes == batter_codes) & (batter_codes >= 0),
+    })
+    per_ball = per_ball[(batter_codes >= 0) & (bowler_codes >= 0)]
+    grouped = per_ball.groupby(['batter', 'bowler'], sort=False)[SUMMARY_COUNTS].sum()
+
+    batters = legal['batter'].cat.categories
+    bowlers = legal['bowler'].cat.categories
+    pairs = [(batters[batter_code], bowlers[bowler_code]) for batter_code, bowler_code in grouped.index.tolist()]
+    return pairs, grouped.to_numpy(dtype=np.int64).reshape(len(pairs), len(SUMMARY_COUNTS))
+
+
+class PairSummaries:
+    """Every (batter, bowler) head-to-head summary, built in one vectorized groupby pass
+
+    Summaries of separate chunks or files merge by adding their counts, so a history can be
+    summarized piece by piece and the pieces combined.
+    """
+
+    def __init__(self, frame=None):
+        pairs, counts = pair_counts(frame) if frame is not None else ([], np.zeros((0, len(SUMMARY_COUNTS)), dtype=np.int64))
+        self._rows = {pair: row for row, pair in enumerate(pairs)}
+        self._set_counts(counts)
+
+    def _set_counts(self, counts):
+        balls = counts[:, 0]
+        total_runs = counts[:, 2]
+        dismissals = counts[:, 8]
+        self._counts = counts
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self._strike_rate = np.round(total_runs / balls * 100, 2)
+            self._average = np.round(total_runs / np.maximum(dismissals, 1), 2)
+            self._boundary_pct = np.round((counts[:, 6] + counts[:, 7]) / balls * 100, 2)
+
+    def merge(self, other):
+        """A new PairSummaries with other's counts added to these; neither is changed"""
+        merged = PairSummaries.__new__(PairSummaries)
+        merged._rows = dict(self._rows)
+        if not len(other):
+            merged._set_counts(self._counts)
+            return merged
+        # Rows of other's pairs in the merged table, new pairs appended in other's order
+        rows = np.empty(len(other), dtype=np.int64)
+        for i, pair in enumerate(other._rows):
+            row = merged._rows.get(pair)
+            if row is None:
+                row = merged._rows[pair] = len(merged._rows)
+            rows[i] = row
+        total = np.zeros((len(merged._rows), len(SUMMARY_COUNTS)), dtype=np.int64)
+        total[:len(self._counts)] = self._counts
+        np.add.at(total, rows, other._counts)
+        merged._set_counts(total)
+        return merged
+
+    def pairs(self):
+        return list(self._rows)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def summary(self, batter_name, bowler_name):
+        """Return the summary dict for one pair, or None if they never met on a legal delivery"""
+        row = self._rows.get((batter_name, bowler_name))
+        if row is None:
+            return None
+        counts = self._counts[row].tolist()
+        summary = {'Batter': batter_name, 'Bowler': bowler_name}
+        summary.update(zip(SUMMARY_COUNTS, counts))
+        summary['Strike Rate'] = float(self._strike_rate[row])
+        # Without a dismissal the average is just the (integer) run total
+        summary['Average'] = float(self._average[row]) if counts[8] else counts[2]
+        summary['Boundary %'] = float(self._boundary_pct[row])
+        return summary
+
+
+def concat_frames(frames):
+    """Concatenate deliveries frames, keeping categorical columns categorical across differing categories"""
+    if len(frames) == 1:
+        return frames[0]
+    columns = {}
+    for column in frames[0].columns:
+        if isinstance(frames[0][column].dtype, pd.CategoricalDtype):
+            columns[column] = union_categoricals([df[column] for df in frames])
+        else:
+            columns[column] = np.concatenate([df[column].to_numpy() for df in frames])
+    return pd.DataFrame(columns)
+
+
+class DeliveriesStore:
+    """Head-to-head summaries of deliveries.csv, reloaded when the file changes
+
+    The file is streamed CHUNK_ROWS at a time into the summaries and never held in memory,
+    so loading takes the same memory however long the history is. Rows appended to the file
+    (see ingest.py) are parsed on their own and merged in; any other change reloads the file.
+    path may also be a Parquet dataset directory written by deliveries_parquet.py, which is
+    reloaded whenever it is replaced.
+    """
+
+    def __init__(self, path, chunk_rows=CHUNK_ROWS):
+        self.path = path
+        self.chunk_rows = chunk_rows
+        self.version = None
+        # (summaries, {column: names seen}) is swapped as one tuple so readers never mix generations
+        self._snapshot = (PairSummaries(), {'batter': frozenset(), 'bowler': frozenset()})
+        self._loaded_size = 0
+        self._tail = b''
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Reload the deliveries if their mtime or size changed since the last load"""
+        stat = os.stat(self.path)
+        # A dataset directory is only ever replaced whole, so its own mtime changes with every conversion
+        version = f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+        if version == self.version:
+            return self
+        with self._lock:
+            if version != self.version:
+                if self.is_dataset():
+                    self._load_dataset()
+                elif not (stat.st_size > self._loaded_size and self._append()):
+                    self._load()
+                self.version = version
+        return self
+
+    def is_dataset(self):
+        return os.path.isdir(self.path)
+
+    @staticmethod
+    def _fold(chunks, summaries, names):
+        """Add every chunk of deliveries to summaries and names"""
+        for chunk in chunks:
+            summaries = summaries.merge(PairSummaries(chunk))
+            names = {column: seen | frozenset(chunk[column].cat.categories) for column, seen in names.items()}
+        return summaries, names
+
+    def _load(self):
+        with open(self.path, 'rb') as f:
+            # Only the bytes present now are read, even if a writer appends meanwhile
+            size = os.fstat(f.fileno()).st_size
+            chunks = read_chunks(_Section(f, 0, size), chunk_rows=self.chunk_rows)
+            self._snapshot = self._fold(chunks, PairSummaries(), {'batter': frozenset(), 'bowler': frozenset()})
+            self._mark_loaded(f, size)
+
+    def _load_dataset(self):
+        import deliveries_parquet
+        # Only the summary columns are decoded, straight into categoricals and int8
+        chunks = deliveries_parquet.iter_frames(self.path, DELIVERIES_COLUMNS, chunk_rows=self.chunk_rows)
+        self._snapshot = self._fold(chunks, PairSummaries(), {'batter': frozenset(), 'bowler': frozenset()})
+        self._tail = b''
+        self._loaded_size = 0
+
+    def _mark_loaded(self, f, size):
+        f.seek(max(size - APPEND_CHECK_BYTES, 0))
+        self._tail = f.read(size - f.tell())
+        self._loaded_size = size
+
+    def _append(self):
+        """Merge rows appended since the last load; False if the file changed in any other way"""
+        if not self._tail:
+            return False
+        with open(self.path, 'rb') as f:
+            header = f.readline()
+            # The bytes we already loaded must still be there, ending in a complete line
+            f.seek(self._loaded_size - len(self._tail))
+            if f.read(len(self._tail)) != self._tail or not self._tail.endswith(b'\n'):
+                return False
+            # A writer may still be mid-line; the rest is picked up on the next refresh
+            end = _last_line_end(f, self._loaded_size, os.fstat(f.fileno()).st_size)
+            if end > self._loaded_size:
+                appended = _Section(f, self._loaded_size, end, prefix=header)
+                self._snapshot = self._fold(read_chunks(appended, chunk_rows=self.chunk_rows), *self._snapshot)
+                self._mark_loaded(f, end)
+        return True
+
+    def has_player(self, column, name):
+        """Whether name appears in the batter or bowler column"""
+        return name in self._snapshot[1][column]
+
+    def names(self, column):
+        """Every name in the batter or bowler column, sorted"""
+        return sorted(self._snapshot[1][column])
+
+    def pairs(self):
+        """Every (batter, bowler) pair that met on a legal delivery"""
+        return self._snapshot[0].pairs()
+
+    def summary(self, batter_name, bowler_name):
+        """Return the precomputed head-to-head summary for one pair, or None"""
+        return self._snapshot[0].summary(batter_name, bowler_name)
+
+    def summaries(self, pairs):
+        """Yield the summary (or None) of each (batter, bowler) pair, all from the same load"""
+        summaries = self._snapshot[0]
+        for batter, bowler in pairs:
+            yield summaries.summary(batter, bowler)
+
+    def grid(self, batters, bowlers):
+        """Return {batter: {bowler: summary or None}} for every batter/bowler combination"""
+        summaries = self._snapshot[0]
+        return {batter: {bowler: summaries.summary(batter, bowler) for bowler in bowlers} for batter in batters}
+
+
+def _last_line_end(f, start, stop):
+    """Offset just past the last newline between start and stop, or start if there is none"""
+    position = stop
+    while position > start:
+        block_start = max(position - APPEND_CHECK_BYTES, start)
+        f.seek(block_start)
+        block = f.read(position - block_start)
+        newline = block.rfind(b'\n')
+        if newline >= 0:
+            return block_start + newline + 1
+        position = block_start
+    return start
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def parquet_available():
+    import deliveries_parquet
+    return deliveries_parquet.pa is not None
+
+
+def get_deliveries(path, fallback=None):
+    """Return the shared store for path, reloading it if the file changed on disk
+
+    A Parquet dataset path is read from fallback, a CSV of the same deliveries, when pyarrow
+    is not installed.
+    """
+    if fallback and os.path.isdir(path) and not parquet_available():
+        path = fallback
+        if os.path.abspath(path) not in _stores:
+            print(f"pyarrow is not installed; reading deliveries from {path} instead of the Parquet dataset")
+    key = os.path.abspath(path)
+    store = _stores.get(key)
+    if store is None:
+        with _stores_lock:
+            store = _stores.setdefault(key, DeliveriesStore(key))
+    return store.refresh()
@@ -0,0 +1,213 @@
+"""Convert deliveries.csv to a Parquet dataset, and read it back by column and player.
+
+    python deliveries_parquet.py --deliveries deliveries.csv --matches matches.csv --out deliveries_parquet
+
+The dataset is partitioned by season (<out>/season=2023/part-0.parquet). Each season's rows
+are sorted by batter then bowler and written in row groups of ROW_GROUP_ROWS with min/max
+statistics, so a read filtered to some batters skips the row groups that cannot hold them,
+and every read decodes only the columns it asks for. Names are stored as plain strings
+(dictionary-encoded within each column chunk), since pyarrow does not prune row groups on
+dictionary-typed columns, and come back as categoricals; counts stay int8.
+
+Setting DELIVERIES_FILE to the dataset directory makes the server load its head-to-head
+summaries from it. A conversion replaces the whole directory, and ingest.py keeps appending
+to the CSV, so convert again after ingesting. pyarrow is optional; without it only the CSV
+can be read.
+"""
+import argparse
+import functools
+import operator
+import os
+import shutil
+import sys
+import time
+import pandas as pd
+from deliveries import CHUNK_ROWS, DELIVERIES_COLUMNS, PairSummaries, concat_frames, read_chunks
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+DATASET_DIR = 'deliveries_parquet'
+# Rows per row group, the unit a player filter skips
+ROW_GROUP_ROWS = 16384
+SORT_COLUMNS = ['batter', 'bowler']
+# dtypes of the deliveries.csv columns; any other column keeps the type pandas infers
+CONVERT_DTYPES = {
+    'match_id': 'int64',
+    'inning': 'int8',
+    'batting_team': 'category',
+    'bowling_team': 'category',
+    'over': 'int16',
+    'ball': 'int16',
+    'batter': 'category',
+    'bowler': 'category',
+    'non_striker': 'category',
+    'batsman_runs': 'int8',
+    'extra_runs': 'int8',
+    'total_runs': 'int8',
+    'extras_type': 'category',
+    'is_wicket': 'int8',
+    'player_dismissed': 'category',
+    'dismissal_kind': 'category',
+    'fielder': 'category',
+}
+NAME_COLUMNS = [column for column, dtype in CONVERT_DTYPES.items() if dtype == 'category']
+
+
+def require_pyarrow():
+    if pa is None:
+        raise RuntimeError("Parquet deliveries need pyarrow (pip install pyarrow)")
+
+
+def read_seasons(matches_path):
+    """{match_id: season} from matches.csv, seasons made safe for directory names"""
+    matches = pd.read_csv(matches_path, usecols=['id', 'season'])
+    # Seasons such as '2007/08' cannot be partition directory names
+    return {int(row.id): str(row.season).replace('/', '-') for row in matches.itertuples(index=False)}
+
+
+def sort_by_players(frame):
+    """Rows ordered by batter then bowler, ball order kept within a pair
+
+    Name categories are put in lexicographic order first, so each row group's min/max
+    statistics cover a narrow range of names.
+    """
+    frame = frame.assign(**{column: frame[column].cat.reorder_categories(sorted(frame[column].cat.categories))
+                            for column in SORT_COLUMNS})
+    return frame.sort_values(SORT_COLUMNS, kind='stable')
+
+
+def convert(deliveries_path, matches_path, out_dir=DATASET_DIR, chunk_rows=CHUNK_ROWS, row_group_rows=ROW_GROUP_ROWS):
+    """Write deliveries_path as a season-partitioned dataset at out_dir, replacing any dataset there
+
+    Returns {season: rows written}.
+    """
+    require_pyarrow()
+    seasons = read_seasons(matches_path)
+    columns = list(pd.read_csv(deliveries_path, nrows=0).columns)
+    by_season = {}
+    for chunk in read_chunks(deliveries_path, columns, CONVERT_DTYPES, chunk_rows):
+        chunk_seasons = chunk['match_id'].map(seasons)
+        missing = pd.unique(chunk.loc[chunk_seasons.isna(), 'match_id'])
+        if len(missing):
+            raise ValueError(f"Matches {sorted(missing.tolist())[:10]} are not in {matches_path}")
+        for season, rows in chunk.groupby(chunk_seasons, sort=False):
+            by_season.setdefault(season, []).append(rows)
+
+    tmp_dir = f"{out_dir}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    written = {}
+    for season in sorted(by_season):
+        frame = sort_by_players(concat_frames(by_season.pop(season)))
+        partition = os.path.join(tmp_dir, f"season={season}")
+        os.makedirs(partition)
+        pq.write_table(plain_strings(pa.Table.from_pandas(frame, preserve_index=False)),
+                       os.path.join(partition, 'part-0.parquet'), row_group_size=row_group_rows)
+        written[season] = len(frame)
+    replace_dir(tmp_dir, out_dir)
+    return written
+
+
+def plain_strings(table):
+    """table with its dictionary columns cast to their value type and no pandas metadata"""
+    schema = pa.schema([pa.field(field.name, field.type.value_type if pa.types.is_dictionary(field.type) else field.type)
+                        for field in table.schema])
+    return table.cast(schema).replace_schema_metadata(None)
+
+
+def replace_dir(tmp_dir, out_dir):
+    """Move tmp_dir to out_dir, which is missing only between two renames"""
+    old_dir = f"{out_dir}.{os.getpid()}.old"
+    if os.path.exists(out_dir):
+        os.rename(out_dir, old_dir)
+    os.rename(tmp_dir, out_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def open_dataset(path=DATASET_DIR, dictionary_names=False):
+    """The dataset at path; dictionary_names decodes names straight to dictionaries, twice as fast,
+    but filters on them then no longer skip row groups"""
+    require_pyarrow()
+    read_options = ds.ParquetReadOptions(dictionary_columns=NAME_COLUMNS if dictionary_names else [])
+    partitioning = ds.partitioning(pa.schema([('season', pa.string())]), flavor='hive')
+    return ds.dataset(path, format=ds.ParquetFileFormat(read_options=read_options), partitioning=partitioning)
+
+
+def scan(path, columns, batters, bowlers, seasons):
+    dataset = open_dataset(path, dictionary_names=batters is None and bowlers is None)
+    return dataset.scanner(columns=columns, filter=player_filter(batters, bowlers, seasons))
+
+
+def player_filter(batters=None, bowlers=None, seasons=None):
+    """Dataset filter keeping only rows of the given batters, bowlers and seasons (None keeps all)"""
+    expression = None
+    for column, values in (('batter', batters), ('bowler', bowlers), ('season', seasons)):
+        if values is None:
+            continue
+        # Equalities rather than isin(), which row-group statistics are not checked against
+        terms = [ds.field(column) == str(value) for value in values]
+        term = functools.reduce(operator.or_, terms) if terms else ds.scalar(False)
+        expression = term if expression is None else expression & term
+    return expression
+
+
+def to_frame(table):
+    return table.to_pandas(strings_to_categorical=True)
+
+
+def iter_frames(path=DATASET_DIR, columns=DELIVERIES_COLUMNS, batters=None, bowlers=None, seasons=None,
+                chunk_rows=CHUNK_ROWS):
+    """Deliveries about chunk_rows at a time, decoding only columns of the row groups that can match"""
+    batches = []
+    rows = 0
+    for batch in scan(path, columns, batters, bowlers, seasons).to_batches():
+        if not batch.num_rows:
+            continue
+        batches.append(batch)
+        rows += batch.num_rows
+        if rows >= chunk_rows:
+            yield to_frame(pa.Table.from_batches(batches))
+            batches = []
+            rows = 0
+    if batches:
+        yield to_frame(pa.Table.from_batches(batches))
+
+
+def read_frame(path=DATASET_DIR, columns=DELIVERIES_COLUMNS, batters=None, bowlers=None, seasons=None):
+    """The filtered deliveries as one frame"""
+    return to_frame(scan(path, columns, batters, bowlers, seasons).to_table())
+
+
+def pair_summary(path, batter_name, bowler_name):
+    """One head-to-head summary read from the dataset, without summarizing every other pair"""
+    frame = read_frame(path, DELIVERIES_COLUMNS, [batter_name], [bowler_name])
+    return PairSummaries(frame).summary(batter_name, bowler_name)
+
+
+def dataset_bytes(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--deliveries', default='deliveries.csv')
+    parser.add_argument('--matches', default='matches.csv', help="matches.csv with id and season")
+    parser.add_argument('--out', default=DATASET_DIR)
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--row-group-rows', type=int, default=ROW_GROUP_ROWS)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    written = convert(args.deliveries, args.matches, args.out, args.chunk_rows, args.row_group_rows)
+    print(f"Wrote {sum(written.values())} deliveries in {len(written)} seasons to {args.out} "
+          f"in {time.perf_counter() - start:.2f}s ({dataset_bytes(args.out) / 1e6:.1f} MB, "
+          f"CSV {os.path.getsize(args.deliveries) / 1e6:.1f} MB)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
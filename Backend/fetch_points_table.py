@@ -1,79 +1,45 @@
-import json
-import requests
-import os
-from datetime import datetime
+"""Fetch the IPL points table into points_table.json, rewriting it only when the standings change.
+
+    python fetch_points_table.py [--output points_table.json]
+
+The file holds the normalized standings (see points_table.py) with the ETag / Last-Modified
+of the response they came from, so the next run asks the upstream conditionally. A 304, or
+a response with the same standings, leaves the file untouched.
+"""
+import argparse
+import sys
+from points_table import API_URL, PointsTableFeed, load, save
+from upstream import make_session
 
-# API URL for IPL points table
-API_URL = 'https://cf-gotham.sportskeeda.com/cricket/ipl/points-table'
 OUTPUT_FILE = 'points_table.json'
 
-def fetch_points_table():
+
+def fetch_points_table(output_file=OUTPUT_FILE):
+    """Returns True if the upstream answered (whether or not the standings changed)"""
     print(f"Fetching points table data from {API_URL}")
-    try:
-        # Add headers to mimic a browser request
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'application/json',
-            'Referer': 'https://www.sportskeeda.com/'
-        }
-        
-        # Try direct API access first
-        try:
-            response = requests.get(API_URL, headers=headers, timeout=10)
-            response.raise_for_status()
-        except:
-            print("Direct API access failed, trying with CORS proxy...")
-            proxy_url = f'https://corsproxy.io/?{API_URL}'
-            response = requests.get(proxy_url, headers=headers, timeout=10)
-            response.raise_for_status()
-            
-        data = response.json()
-        
-        # Transform data to match expected format if needed
-        formatted_data = format_data(data)
-        
-        # Save to JSON file
-        with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-            json.dump(formatted_data, f, ensure_ascii=False, indent=2)
-            
-        print(f"Points table data saved to {OUTPUT_FILE}")
-        return True
-        
-    except Exception as e:
-        print(f"Error fetching points table data: {e}")
+    # The direct API first, then the CORS proxy
+    feed = PointsTableFeed(fallback_path=output_file)
+    saved, source, validators = load(output_file)
+    if saved is not None:
+        feed.restore(saved, source, validators)
+
+    if not feed.refresh(make_session(pool_size=1)):
         print("Unable to update points table data. The table may show outdated information.")
         return False
+    if saved is not None and feed.data.etag == saved.etag:
+        print(f"Points table unchanged (version {saved.etag}); {output_file} not rewritten")
+        return True
+    save(output_file, feed.data, feed.source, feed.validators())
+    print(f"Points table version {feed.data.etag} ({len(feed.data.points)} teams) saved to {output_file}")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', default=OUTPUT_FILE)
+    args = parser.parse_args()
+    return 0 if fetch_points_table(args.output) else 1
 
-def format_data(data):
-    # Check if data is already in the expected format
-    if 'table' in data and isinstance(data['table'], list):
-        return data
-    
-    # If data is in a different format, transform it to match expected structure
-    # This depends on the actual API response format
-    formatted_data = {
-        "table": [
-            {
-                "table": [
-                    {
-                        "group": []
-                    }
-                ]
-            }
-        ]
-    }
-    
-    # Extract teams from the API response and add to the formatted structure
-    # This is a placeholder - adjust based on actual API response structure
-    if 'teams' in data:
-        for team in data['teams']:
-            formatted_data['table'][0]['table'][0]['group'].append(team)
-    elif 'standings' in data:
-        for team in data['standings']:
-            formatted_data['table'][0]['table'][0]['group'].append(team)
-    
-    return formatted_data
 
 if __name__ == "__main__":
-    fetch_points_table()
-    print(f"Points table data processing complete.")
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,19 @@
+"""gunicorn settings; the Procfile runs `gunicorn -c gunicorn.conf.py app:app`.
+
+The app is imported and its datasets loaded once in the master, before the workers are
+forked, so every worker starts warm and shares the loaded data copy-on-write.
+"""
+import os
+
+preload_app = True
+worker_class = 'gthread'
+# Live-match subscribers each hold a thread while they wait, at most LIVE_SUBSCRIBER_SLOTS (16)
+# per worker, unless LIVE_STREAM_URL sends them to live_stream.py (see the README)
+threads = int(os.environ.get('GUNICORN_THREADS', 64))
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+
+
+def when_ready(server):
+    """Runs in the master after the app is imported and before any worker is forked"""
+    from app import preload
+    preload()
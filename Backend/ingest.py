@@ -0,0 +1,320 @@
+"""Incremental ingestion of new matches into deliveries.csv and the per-player aggregates.
+
+Appending a match to deliveries.csv is enough for the head-to-head summaries: running servers
+parse only the appended rows (see DeliveriesStore). The per-venue and recent-form aggregates
+need each match's venue and date, so they are kept in a state file updated here:
+
+    python ingest.py build --matches matches.csv
+    python ingest.py add new_match.csv --venue "Wankhede Stadium, Mumbai" --date 2025-05-10
+    python ingest.py merge ipl_aggregates.json other_league_aggregates.json --state player_aggregates.json
+
+Every ingested match bumps the aggregates' version and rewrites the state file, which makes the
+server recompile its player stats (player_store.py) with the new venue and recent-form records.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+from deliveries import CHUNK_ROWS, NON_LEGAL_EXTRAS, match_chunks, read_chunks
+
+DELIVERIES_FILE = 'deliveries.csv'
+MATCHES_FILE = 'matches.csv'
+# Next to this module whatever the working directory, where team.py's predictor reads it
+STATE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'player_aggregates.json')
+
+# Columns of deliveries.csv the aggregates read
+INGEST_COLUMNS = ['match_id', 'batter', 'bowler', 'batsman_runs', 'extra_runs', 'total_runs',
+                  'extras_type', 'is_wicket', 'player_dismissed', 'dismissal_kind']
+INGEST_DTYPES = {
+    'match_id': 'int64',
+    'batter': 'category',
+    'bowler': 'category',
+    'batsman_runs': 'int8',
+    'extra_runs': 'int8',
+    'total_runs': 'int8',
+    'extras_type': 'category',
+    'is_wicket': 'int8',
+    'player_dismissed': 'category',
+    'dismissal_kind': 'category',
+}
+# Deliveries that are not legal balls for the bowler
+NON_BALL_EXTRAS = ['wides', 'noballs']
+# Extras not charged to the bowler
+BYE_EXTRAS = ['byes', 'legbyes']
+# Dismissals not credited to the bowler
+NON_BOWLER_DISMISSALS = ['run out', 'retired hurt', 'retired out', 'obstructing the field']
+# Matches kept in each player's recent-form window
+RECENT_MATCHES = 5
+
+BATTING_VENUE_FIELDS = ['Innings', 'Runs', 'Balls_Faced', 'Dismissals', 'Fifties', 'Hundreds']
+BOWLING_VENUE_FIELDS = ['Innings', 'Balls_Bowled', 'Runs_Conceded', 'Wickets', 'Three_Wicket_Hauls', 'Five_Wicket_Hauls']
+BATTING_FORM_FIELDS = ['Date', 'match_id', 'Runs', 'Balls', 'Dismissed']
+BOWLING_FORM_FIELDS = ['Date', 'match_id', 'Balls', 'Runs Conceded', 'Wickets']
+
+
+def batting_by_match(frame):
+    """One row per (match_id, batter): Runs, Balls, Dismissed"""
+    legal = ~frame['extras_type'].isin(NON_LEGAL_EXTRAS)
+    batting = pd.DataFrame({
+        'match_id': frame['match_id'],
+        'player': frame['batter'],
+        'Runs': frame['batsman_runs'],
+        'Balls': legal.astype(np.int64),
+    }).groupby(['match_id', 'player'], sort=False, observed=True).sum()
+
+    # A batter can be dismissed (e.g. run out at the non-striker's end) without facing a ball
+    dismissed = frame.loc[frame['player_dismissed'].notna(), ['match_id', 'player_dismissed']].drop_duplicates()
+    dismissed = pd.MultiIndex.from_arrays([dismissed['match_id'], dismissed['player_dismissed']], names=['match_id', 'player'])
+    batting = batting.reindex(batting.index.union(dismissed), fill_value=0)
+    batting['Dismissed'] = batting.index.isin(dismissed)
+    return batting.reset_index()
+
+
+def bowling_by_match(frame):
+    """One row per (match_id, bowler): Balls, Runs (conceded), Wickets"""
+    byes = frame['extras_type'].isin(BYE_EXTRAS)
+    wicket = (frame['is_wicket'] == 1) & ~frame['dismissal_kind'].isin(NON_BOWLER_DISMISSALS)
+    return pd.DataFrame({
+        'match_id': frame['match_id'],
+        'player': frame['bowler'],
+        'Balls': (~frame['extras_type'].isin(NON_BALL_EXTRAS)).astype(np.int64),
+        'Runs': frame['total_runs'] - np.where(byes, frame['extra_runs'], 0),
+        'Wickets': wicket.astype(np.int64),
+    }).groupby(['match_id', 'player'], sort=False, observed=True).sum().reset_index()
+
+
+class PlayerAggregates:
+    """Running per-venue totals and last-RECENT_MATCHES form of every batter and bowler
+
+    All state is plain JSON-ready dicts:
+    venues[kind][player][venue] is a list of BATTING/BOWLING_VENUE_FIELDS totals and
+    form[kind][player] the player's most recent match rows, oldest first.
+    """
+
+    def __init__(self, state=None):
+        state = state or {}
+        self.version = state.get('version', 0)
+        self.matches = set(state.get('matches', []))
+        self.venues = state.get('venues', {'batter': {}, 'bowler': {}})
+        self.form = state.get('form', {'batter': {}, 'bowler': {}})
+
+    def to_state(self):
+        return {
+            'version': self.version,
+            'matches': sorted(self.matches),
+            'venues': self.venues,
+            'form': self.form,
+        }
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return cls(json.load(f))
+        except FileNotFoundError:
+            return cls()
+
+    def save(self, path):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_state(), f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    def add_matches(self, frame, match_info):
+        """Fold the deliveries of matches not yet ingested into the aggregates
+
+        match_info maps match_id to (date, venue). Returns the ids of the matches added.
+        """
+        frame = frame[~frame['match_id'].isin(self.matches)]
+        match_ids = [int(m) for m in pd.unique(frame['match_id'])]
+        missing = [m for m in match_ids if m not in match_info]
+        if missing:
+            raise ValueError(f"No venue/date for matches {missing[:10]}")
+        if not match_ids:
+            return []
+
+        for row in batting_by_match(frame).itertuples(index=False):
+            date, venue = match_info[int(row.match_id)]
+            totals = self.venues['batter'].setdefault(row.player, {}).setdefault(venue, [0] * len(BATTING_VENUE_FIELDS))
+            runs = int(row.Runs)
+            for i, value in enumerate((1, runs, int(row.Balls), int(row.Dismissed), int(50 <= runs < 100), int(runs >= 100))):
+                totals[i] += value
+            self._add_form('batter', row.player, [date, int(row.match_id), runs, int(row.Balls), bool(row.Dismissed)])
+
+        for row in bowling_by_match(frame).itertuples(index=False):
+            date, venue = match_info[int(row.match_id)]
+            totals = self.venues['bowler'].setdefault(row.player, {}).setdefault(venue, [0] * len(BOWLING_VENUE_FIELDS))
+            wickets = int(row.Wickets)
+            for i, value in enumerate((1, int(row.Balls), int(row.Runs), wickets, int(3 <= wickets < 5), int(wickets >= 5))):
+                totals[i] += value
+            self._add_form('bowler', row.player, [date, int(row.match_id), int(row.Balls), int(row.Runs), wickets])
+
+        self.matches.update(match_ids)
+        self.version += 1
+        return match_ids
+
+    def merge(self, other):
+        """New aggregates of the matches in both, e.g. of two leagues built separately; neither is changed"""
+        overlap = self.matches & other.matches
+        if overlap:
+            raise ValueError(f"Matches {sorted(overlap)[:10]} are in both aggregates")
+        merged = PlayerAggregates(json.loads(json.dumps(self.to_state())))
+        merged.version = self.version + other.version
+        merged.matches |= other.matches
+        for kind, players in other.venues.items():
+            for player, venues in players.items():
+                for venue, totals in venues.items():
+                    merged_totals = merged.venues[kind].setdefault(player, {}).setdefault(venue, [0] * len(totals))
+                    for i, value in enumerate(totals):
+                        merged_totals[i] += value
+        for kind, players in other.form.items():
+            for player, window in players.items():
+                for match_row in window:
+                    merged._add_form(kind, player, list(match_row))
+        return merged
+
+    def _add_form(self, kind, player, match_row):
+        """Insert a match into the player's window, keeping only the most recent by (date, match_id)"""
+        window = self.form[kind].setdefault(player, [])
+        window.append(match_row)
+        window.sort(key=lambda r: (r[0], r[1]))
+        del window[:-RECENT_MATCHES]
+
+    def venue_stats(self, kind, player, venue):
+        """Totals and derived averages of a player at one venue, or None
+
+        Named like the columns of cache_builder's venue tables, so the compiled player stats
+        score a venue the same whichever of the two it came from.
+        """
+        totals = self.venues[kind].get(player, {}).get(venue)
+        if totals is None:
+            return None
+        if kind == 'batter':
+            stats = dict(zip(BATTING_VENUE_FIELDS, totals))
+            # Without a dismissal the average is just the run total, as in the head-to-head summaries
+            stats['Average'] = round(stats['Runs'] / stats['Dismissals'], 2) if stats['Dismissals'] else stats['Runs']
+            stats['Strike Rate'] = round(stats['Runs'] / stats['Balls_Faced'] * 100, 2) if stats['Balls_Faced'] else 0.0
+        else:
+            stats = dict(zip(BOWLING_VENUE_FIELDS, totals))
+            stats['Economy'] = round(stats['Runs_Conceded'] / stats['Balls_Bowled'] * 6, 2) if stats['Balls_Bowled'] else 0.0
+        return stats
+
+    def recent_form(self, kind, player):
+        """The player's last RECENT_MATCHES match rows (oldest first) with per-match rates"""
+        rows = []
+        for match_row in self.form[kind].get(player, []):
+            if kind == 'batter':
+                row = dict(zip(BATTING_FORM_FIELDS, match_row))
+                row['Strike Rate'] = round(row['Runs'] / row['Balls'] * 100, 2) if row['Balls'] else 0.0
+            else:
+                row = dict(zip(BOWLING_FORM_FIELDS, match_row))
+                row['Economy'] = round(row['Runs Conceded'] / row['Balls'] * 6, 2) if row['Balls'] else 0.0
+            rows.append(row)
+        return rows
+
+
+def read_match_info(matches_path):
+    """{match_id: (date, venue)} from a matches.csv with id, date and venue columns"""
+    matches = pd.read_csv(matches_path, usecols=['id', 'date', 'venue'])
+    return {int(row.id): (str(row.date), str(row.venue)) for row in matches.itertuples(index=False)}
+
+
+def delivered_matches(deliveries_path, chunk_rows=CHUNK_ROWS):
+    """Ids of the matches deliveries.csv already has rows for"""
+    match_ids = set()
+    for chunk in read_chunks(deliveries_path, ['match_id'], INGEST_DTYPES, chunk_rows):
+        match_ids.update(pd.unique(chunk['match_id']).tolist())
+    return match_ids
+
+
+def append_deliveries(deliveries_path, match_frame):
+    """Append rows to deliveries.csv in its own column order; running servers merge just these rows"""
+    with open(deliveries_path, 'rb') as f:
+        header = f.readline().decode('utf-8').strip().split(',')
+        f.seek(0, os.SEEK_END)
+        needs_newline = False
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) != b'\n'
+    missing = [column for column in header if column not in match_frame.columns]
+    if missing:
+        raise ValueError(f"Match deliveries lack columns {missing}")
+    with open(deliveries_path, 'a', encoding='utf-8', newline='') as f:
+        if needs_newline:
+            f.write('\n')
+        match_frame[header].to_csv(f, header=False, index=False)
+
+
+def build(args):
+    start = time.perf_counter()
+    aggregates = PlayerAggregates()
+    match_info = read_match_info(args.matches)
+    # Streamed a few matches at a time, so memory does not grow with the length of the history
+    for chunk in match_chunks(args.deliveries, INGEST_COLUMNS, INGEST_DTYPES, args.chunk_rows):
+        aggregates.add_matches(chunk, match_info)
+    aggregates.save(args.state)
+    print(f"Aggregated {len(aggregates.matches)} matches in {time.perf_counter() - start:.2f}s -> {args.state}")
+    return 0
+
+
+def merge(args):
+    aggregates = PlayerAggregates()
+    for path in args.states:
+        aggregates = aggregates.merge(PlayerAggregates.load(path))
+    aggregates.save(args.state)
+    print(f"Merged {len(args.states)} aggregates ({len(aggregates.matches)} matches) -> {args.state}")
+    return 0
+
+
+def add(args):
+    start = time.perf_counter()
+    aggregates = PlayerAggregates.load(args.state)
+    match_frame = pd.read_csv(args.match_csv)
+    match_ids = [int(m) for m in pd.unique(match_frame['match_id'])]
+    # Each file says for itself what it already has, so a run interrupted between the two
+    # writes is completed by running it again rather than counting a match twice
+    new_ids = [m for m in match_ids if m not in aggregates.matches]
+    delivered = delivered_matches(args.deliveries)
+    unwritten = [m for m in match_ids if m not in delivered]
+    if not new_ids and not unwritten:
+        print(f"Matches {match_ids} were already ingested")
+        return 0
+
+    if new_ids:
+        if args.venue and args.date:
+            match_info = {m: (args.date, args.venue) for m in new_ids}
+        else:
+            match_info = read_match_info(args.matches)
+        # Aggregate first so a match with unknown venue/date is rejected before either file changes
+        aggregates.add_matches(match_frame[match_frame['match_id'].isin(new_ids)][INGEST_COLUMNS], match_info)
+        aggregates.save(args.state)
+    if unwritten:
+        append_deliveries(args.deliveries, match_frame[match_frame['match_id'].isin(unwritten)])
+    print(f"Ingested matches {sorted(set(new_ids) | set(unwritten))} (aggregated {new_ids}, appended {unwritten}) "
+          f"in {time.perf_counter() - start:.3f}s; aggregates version {aggregates.version}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--deliveries', default=DELIVERIES_FILE)
+    parser.add_argument('--matches', default=MATCHES_FILE, help="matches.csv with id, date and venue")
+    parser.add_argument('--state', default=STATE_FILE)
+    commands = parser.add_subparsers(dest='command', required=True)
+    build_parser = commands.add_parser('build', help="aggregate every match in deliveries.csv from scratch")
+    build_parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    merge_parser = commands.add_parser('merge', help="combine aggregates built separately (e.g. per league) into --state")
+    merge_parser.add_argument('states', nargs='+')
+    add_parser = commands.add_parser('add', help="append one match's deliveries and update the aggregates")
+    add_parser.add_argument('match_csv', help="CSV of the match's deliveries, in deliveries.csv columns")
+    add_parser.add_argument('--venue')
+    add_parser.add_argument('--date', help="match date, YYYY-MM-DD")
+    args = parser.parse_args()
+    return {'build': build, 'merge': merge, 'add': add}[args.command](args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
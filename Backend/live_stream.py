@@ -0,0 +1,238 @@
+"""Live-match updates for every viewer from one asyncio process.
+
+    python live_stream.py [--host 0.0.0.0] [--port 5001]
+
+Serves /api/live-matches/updates (long-poll) and /api/live-matches/stream (server-sent
+events) as app.py does, but a waiting viewer costs a coroutine and a socket rather than a
+worker thread, so one process holds thousands of them. It is also the only process that
+polls the live-matches upstream and numbers its versions, so a version token stays valid
+whichever connection it comes back on. Each version is encoded once per starting token and
+the same bytes are written to every viewer waiting on it.
+
+Set LIVE_STREAM_URL on the app to this server's public URL and the app redirects both
+routes here. Standard library only; it reads just the request head, bounded by MAX_HEAD_BYTES
+and MAX_HEADERS, and closes every connection after its response.
+"""
+import argparse
+import asyncio
+import json
+import math
+import sys
+from urllib.parse import parse_qs, urlsplit
+from live_updates import (LONG_POLL_TIMEOUT, STREAM_KEEPALIVE, STREAM_MAX_DURATION, MatchUpdates,
+                          make_live_matches_feed, sse_event, updates_payload)
+from upstream import make_session
+
+UPDATES_PATH = '/api/live-matches/updates'
+STREAM_PATH = '/api/live-matches/stream'
+STATUS_PATH = '/status'
+# Longest request head (request line and headers) and most header lines accepted
+MAX_HEAD_BYTES = 16384
+MAX_HEADERS = 64
+# Seconds a client may take to send its request, and a viewer to accept an event, before it is dropped
+READ_TIMEOUT = 10
+WRITE_TIMEOUT = 30
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'Last-Event-ID, Cache-Control, Accept',
+    'Access-Control-Allow-Methods': 'GET, OPTIONS',
+}
+REASONS = {200: 'OK', 204: 'No Content', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           431: 'Request Header Fields Too Large'}
+
+
+class BadRequest(Exception):
+    status = 400
+
+
+class HeadTooLarge(BadRequest):
+    status = 431
+
+
+def response_head(status, headers):
+    lines = [f"HTTP/1.1 {status} {REASONS[status]}"]
+    lines += [f"{name}: {value}" for name, value in {**CORS_HEADERS, **headers}.items()]
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+
+def json_response(status, data):
+    body = json.dumps(data, separators=(',', ':')).encode('utf-8')
+    head = response_head(status, {'Content-Type': 'application/json', 'Content-Length': len(body),
+                                  'Cache-Control': 'no-cache', 'Connection': 'close'})
+    return head + body
+
+
+async def read_request(reader):
+    """(method, path, {arg: first value}, {lower-cased header: value}) of one request
+
+    Only the head is read: every response closes the connection, and no route takes a body.
+    """
+    try:
+        head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), READ_TIMEOUT)
+    except asyncio.LimitOverrunError:
+        raise HeadTooLarge('Request head too large')
+    lines = head.decode('latin-1').split('\r\n')[:-2]
+    if len(lines) - 1 > MAX_HEADERS:
+        raise HeadTooLarge('Too many headers')
+    parts = lines[0].split(' ')
+    if len(parts) != 3 or not parts[0].isalpha() or not parts[1].startswith('/') or not parts[2].startswith('HTTP/1.'):
+        raise BadRequest('Malformed request line')
+    method, target, _ = parts
+    headers = {}
+    for line in lines[1:]:
+        name, sep, value = line.partition(':')
+        if not sep or not name or name != name.strip():
+            raise BadRequest('Malformed header line')
+        headers[name.lower()] = value.strip()
+    url = urlsplit(target)
+    args = {name: values[0] for name, values in parse_qs(url.query).items()}
+    return method, url.path, args, headers
+
+
+class FanOut:
+    """One version history of the live-matches feed, and the viewers waiting on it"""
+
+    def __init__(self, feed=None):
+        self.feed = feed or make_live_matches_feed()
+        self.updates = MatchUpdates()
+        self.feed.subscribe(self.updates.publish)
+        self.viewers = 0
+        self._changed = None
+        # Encoded responses of the current version, keyed by (format, starting token)
+        self._encoded = {}
+        self._encoded_token = None
+
+    async def poll(self):
+        """Refresh the feed every interval (in a thread: requests blocks) and wake the viewers on a new version"""
+        session = make_session(pool_size=1)
+        while True:
+            token = self.updates.token
+            await asyncio.to_thread(self.feed.refresh, session)
+            if self.updates.token != token:
+                async with self._changed:
+                    self._changed.notify_all()
+            await asyncio.sleep(self.feed.interval)
+
+    async def wait(self, token, timeout):
+        """Wait up to timeout seconds for a version newer than token"""
+        if token != self.updates.token:
+            return
+        async with self._changed:
+            try:
+                await asyncio.wait_for(self._changed.wait_for(lambda: self.updates.token != token), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def encoded(self, kind, since):
+        """(token, bytes) of the updates after since as an SSE event or a JSON response, shared by every viewer"""
+        token, reset, payload = self.updates.since(since)
+        if token != self._encoded_token:
+            self._encoded = {}
+            self._encoded_token = token
+        # Every stale or unknown token gets the same snapshot
+        key = (kind, None if reset else since)
+        body = self._encoded.get(key)
+        if body is None:
+            if kind == 'sse':
+                body = sse_event(token, reset, payload).encode('utf-8')
+            else:
+                body = json_response(200, updates_payload(token, reset, payload))
+            self._encoded[key] = body
+        return token, body
+
+    async def long_poll(self, writer, args):
+        try:
+            timeout = min(float(args.get('timeout', LONG_POLL_TIMEOUT)), LONG_POLL_TIMEOUT)
+        except ValueError:
+            raise BadRequest('timeout must be a number')
+        if not math.isfinite(timeout):
+            raise BadRequest('timeout must be a number')
+        since = args.get('since')
+        await self.wait(since, timeout)
+        writer.write(self.encoded('json', since)[1])
+
+    async def stream(self, reader, writer, since):
+        loop = asyncio.get_running_loop()
+        writer.write(response_head(200, {'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache',
+                                         'X-Accel-Buffering': 'no', 'Connection': 'close'}))
+        token, event = self.encoded('sse', since)
+        writer.write(event)
+        deadline = loop.time() + STREAM_MAX_DURATION
+        # A viewer sends nothing after its request, so a finished read means it went away
+        gone = asyncio.ensure_future(reader.read(1))
+        try:
+            while loop.time() < deadline:
+                await asyncio.wait_for(writer.drain(), WRITE_TIMEOUT)
+                waiting = asyncio.ensure_future(self.wait(token, min(STREAM_KEEPALIVE, deadline - loop.time())))
+                await asyncio.wait({waiting, gone}, return_when=asyncio.FIRST_COMPLETED)
+                if gone.done():
+                    waiting.cancel()
+                    return
+                if self.updates.token == token:
+                    writer.write(b": keepalive\n\n")
+                    continue
+                token, event = self.encoded('sse', token)
+                writer.write(event)
+        finally:
+            gone.cancel()
+
+    async def handle(self, reader, writer):
+        self.viewers += 1
+        try:
+            try:
+                method, path, args, headers = await read_request(reader)
+                if method == 'OPTIONS':
+                    writer.write(response_head(204, {'Content-Length': 0, 'Connection': 'close'}))
+                elif path == STATUS_PATH:
+                    writer.write(json_response(200, {'version': self.updates.token, 'viewers': self.viewers - 1,
+                                                     'feed': self.feed.status()}))
+                elif path not in (UPDATES_PATH, STREAM_PATH):
+                    writer.write(json_response(404, {'error': 'Not found'}))
+                elif method != 'GET':
+                    writer.write(json_response(405, {'error': 'Method not allowed'}))
+                elif path == UPDATES_PATH:
+                    await self.long_poll(writer, args)
+                else:
+                    await self.stream(reader, writer, headers.get('last-event-id') or args.get('since'))
+            except BadRequest as e:
+                writer.write(json_response(e.status, {'error': str(e)}))
+            await asyncio.wait_for(writer.drain(), WRITE_TIMEOUT)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+            # The viewer went away or stopped reading
+            pass
+        finally:
+            self.viewers -= 1
+            writer.close()
+
+    async def start(self, host, port):
+        """Start polling the feed and listening (port 0 picks a free one); returns (server, poller task)"""
+        self._changed = asyncio.Condition()
+        self.feed.load()
+        poller = asyncio.create_task(self.poll())
+        server = await asyncio.start_server(self.handle, host, port, limit=MAX_HEAD_BYTES, backlog=1024)
+        return server, poller
+
+    async def serve(self, host, port):
+        server, poller = await self.start(host, port)
+        print(f"Serving live-match updates on {host}:{port}")
+        async with server:
+            try:
+                await server.serve_forever()
+            finally:
+                poller.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5001)
+    args = parser.parse_args()
+    try:
+        asyncio.run(FanOut().serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
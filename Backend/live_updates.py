@@ -0,0 +1,139 @@
+"""Per-match diffs between successive live-match snapshots, fanned out to waiting subscribers.
+
+Every snapshot of the live-matches feed is compared with the previous one by game_id; the
+changes become one numbered version. Subscribers (long-poll or SSE) pass the last version
+token they saw and receive only the diffs after it, or a full reset when the token comes from
+another process or has fallen out of the history.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from upstream import UpstreamFeed
+
+LIVE_MATCHES_URL = os.environ.get('LIVE_MATCHES_URL', 'https://livescoreapi.thehindu.com/api/cricket/grouped/fixtures/3634')
+FALLBACK_FILE = 'Static/public/ipl_matches_2025.json'
+# Sections of the feed that hold matches
+SECTIONS = ['current_matches', 'upcoming_matches']
+# Match fields whose changes are pushed: score, status and toss
+TRACKED_FIELDS = ['match_status', 'results', 'game_status', 'toss_status']
+# Longest wait of one long-poll request, and how often an idle stream sends a keepalive
+LONG_POLL_TIMEOUT = 25
+STREAM_KEEPALIVE = 15
+# Streams end after this long; EventSource reconnects and resumes from Last-Event-ID
+STREAM_MAX_DURATION = 600
+
+
+def make_live_matches_feed():
+    """The live-matches UpstreamFeed, refreshed every LIVE_MATCHES_REFRESH seconds"""
+    return UpstreamFeed('live matches', [LIVE_MATCHES_URL], FALLBACK_FILE,
+                        interval=int(os.environ.get('LIVE_MATCHES_REFRESH', 30)))
+
+
+def updates_payload(token, reset, payload):
+    if reset:
+        return {'version': token, 'reset': True, 'matches': payload}
+    return {'version': token, 'reset': False, 'diffs': payload}
+
+
+def sse_event(token, reset, payload):
+    """One server-sent event carrying a version's snapshot or diffs"""
+    data = json.dumps(updates_payload(token, reset, payload))
+    return f"id: {token}\nevent: {'snapshot' if reset else 'diff'}\ndata: {data}\n\n"
+
+
+def index_matches(data):
+    """{game_id: (section, match)} for every match in a feed snapshot"""
+    matches = {}
+    for section in SECTIONS:
+        for match in (data or {}).get(section) or []:
+            if isinstance(match, dict) and match.get('game_id') is not None:
+                matches[match['game_id']] = (section, match)
+    return matches
+
+
+def diff_matches(old, new):
+    """Diffs turning the indexed snapshot old into new"""
+    diffs = []
+    for game_id, (section, match) in new.items():
+        if game_id not in old:
+            diffs.append({'game_id': game_id, 'type': 'added', 'section': section, 'match': match})
+            continue
+        old_section, old_match = old[game_id]
+        changes = {field: match.get(field) for field in TRACKED_FIELDS if match.get(field) != old_match.get(field)}
+        if section != old_section:
+            diffs.append({'game_id': game_id, 'type': 'moved', 'section': section, 'match': match})
+        elif changes:
+            diffs.append({'game_id': game_id, 'type': 'changed', 'changes': changes})
+    for game_id, (section, _) in old.items():
+        if game_id not in new:
+            diffs.append({'game_id': game_id, 'type': 'removed', 'section': section})
+    return diffs
+
+
+class MatchUpdates:
+    """Versioned diff history of the live-matches feed"""
+
+    def __init__(self, history=256):
+        self._new_epoch()
+        # Workers forked from a preloading master diverge from it, so each starts its own epoch
+        os.register_at_fork(after_in_child=self._new_epoch)
+        self.version = 0
+        self.snapshot = None
+        self._matches = {}
+        self._history = deque(maxlen=history)
+        self._changed = threading.Condition()
+
+    def _new_epoch(self):
+        # Tokens from another worker or an earlier run carry a different epoch
+        self.epoch = f"{os.getpid():x}{int(time.time()):x}"
+
+    @property
+    def token(self):
+        return f"{self.epoch}-{self.version}"
+
+    def publish(self, data):
+        """Record a new feed snapshot; wakes subscribers only if some match changed"""
+        matches = index_matches(data)
+        with self._changed:
+            diffs = diff_matches(self._matches, matches) if self.snapshot is not None else []
+            first = self.snapshot is None
+            self.snapshot = data
+            self._matches = matches
+            if diffs or first:
+                self.version += 1
+                self._history.append((self.version, diffs))
+                self._changed.notify_all()
+        return diffs
+
+    def _parse(self, token):
+        """The version a token refers to, or None if it can't be continued from here"""
+        if not token:
+            return None
+        epoch, _, version = str(token).rpartition('-')
+        if epoch != self.epoch or not version.isdigit():
+            return None
+        version = int(version)
+        oldest = self._history[0][0] if self._history else self.version + 1
+        # Diffs after version must still be in the history (version itself may have been dropped)
+        if version > self.version or version < oldest - 1:
+            return None
+        return version
+
+    def since(self, token):
+        """(token, reset, payload): diffs after token, or the full snapshot if it can't be continued"""
+        with self._changed:
+            version = self._parse(token)
+            if version is None:
+                return self.token, True, self.snapshot
+            diffs = [d for v, batch in self._history if v > version for d in batch]
+            return self.token, False, diffs
+
+    def wait(self, token, timeout):
+        """Like since(), but blocks up to timeout seconds for a version newer than token"""
+        with self._changed:
+            version = self._parse(token)
+            if version is not None and version == self.version:
+                self._changed.wait_for(lambda: self.version != version, timeout)
+        return self.since(token)
@@ -0,0 +1,217 @@
+from collections import namedtuple
+
+# Dream11 selection rules, shared with Dream11Predictor.select_dream11_team
+TEAM_SIZE = 11
+MAX_CREDITS = 100
+MAX_FOREIGN = 4
+MIN_PER_CATEGORY = 1
+MAX_PER_CATEGORY = 8
+CATEGORIES = ['wicket_keepers', 'batsmen', 'all_rounders', 'bowlers']
+
+# Slack for float credit sums such as 8.5 + 9.5
+CREDIT_EPSILON = 1e-9
+# Search nodes one optimize_lineups call may visit, a few seconds of search
+MAX_SEARCH_NODES = 2000000
+
+Candidate = namedtuple('Candidate', ['name', 'score', 'credits', 'foreign', 'category'])
+# Lineups found, and whether the node budget ran out before count of them were
+LineupSearch = namedtuple('LineupSearch', ['lineups', 'truncated'])
+
+
+class _Search:
+    """Depth-first branch-and-bound over candidates sorted by descending score"""
+
+    def __init__(self, candidates, team_size, max_credits, max_foreign, min_per_category, max_per_category,
+                 max_nodes=None):
+        self.candidates = candidates
+        self.team_size = team_size
+        self.max_credits = max_credits
+        self.max_foreign = max_foreign
+        self.min_per_category = min_per_category
+        self.max_per_category = max_per_category
+        self.category_index = [CATEGORIES.index(c.category) for c in candidates]
+
+        n = len(candidates)
+        # score_prefix[i] = sum of the first i scores; the best k picks from i onward are i..i+k-1
+        self.score_prefix = [0.0]
+        for c in candidates:
+            self.score_prefix.append(self.score_prefix[-1] + c.score)
+        # cheapest_from[i][k] = smallest credit total of k candidates taken from i onward
+        self.cheapest_from = []
+        for i in range(n + 1):
+            cheapest = [0.0]
+            for credits in sorted(c.credits for c in candidates[i:])[:team_size]:
+                cheapest.append(cheapest[-1] + credits)
+            self.cheapest_from.append(cheapest)
+        # category_left[i][j] = candidates of category j from i onward
+        self.category_left = [[0] * len(CATEGORIES) for _ in range(n + 1)]
+        for i in range(n - 1, -1, -1):
+            self.category_left[i] = list(self.category_left[i + 1])
+            self.category_left[i][self.category_index[i]] += 1
+
+        self.scores = [c.score for c in candidates]
+        self.all_mask = (1 << n) - 1
+
+        # Nodes visited over every run; once past max_nodes every run gives up
+        self.nodes = 0
+        self.max_nodes = max_nodes
+        self.exhausted = False
+
+    def run(self, previous=(), max_overlap=None):
+        """Best team sharing at most max_overlap players with each of the previous teams
+
+        The bounds above depend only on the candidate pool, so repeated runs for more
+        lineups reuse them and only add the overlap constraint. Returns None if there is
+        no such team, or if the node budget runs out first (see exhausted).
+        """
+        self.best_score = float('-inf')
+        self.best = None
+        self.previous = list(previous)
+        self.max_overlap = self.team_size if max_overlap is None else max_overlap
+        # previous_with[i] = indexes of the previous teams that contain candidate i
+        self.previous_with = [[k for k, team in enumerate(self.previous) if i in team]
+                              for i in range(len(self.candidates))]
+        # Bit masks over candidate indexes: each previous team, and the candidates no longer
+        # allowed because a previous team containing them already shares max_overlap players
+        self.team_masks = [sum(1 << i for i in team) for team in self.previous]
+        self.blocked = 0
+        if self.max_overlap == 0:
+            for mask in self.team_masks:
+                self.blocked |= mask
+        self._visit(0, [], 0.0, 0.0, 0, [0] * len(CATEGORIES), [0] * len(self.previous))
+        return None if self.exhausted else self.best
+
+    def _open_bound(self, i, slots):
+        """Best score the open slots can add from the candidates still allowed, or None if too few are left"""
+        window = ((1 << slots) - 1) << i
+        if not self.blocked & window:
+            return self.score_prefix[i + slots] - self.score_prefix[i]
+        allowed = (self.all_mask >> i << i) & ~self.blocked
+        if bin(allowed).count('1') < slots:
+            return None
+        bound = 0.0
+        for _ in range(slots):
+            low = allowed & -allowed
+            bound += self.scores[low.bit_length() - 1]
+            allowed ^= low
+        return bound
+
+    def _visit(self, i, chosen, score, credits, foreign, counts, overlaps):
+        if self.exhausted:
+            return
+        self.nodes += 1
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            self.exhausted = True
+            return
+        slots = self.team_size - len(chosen)
+        if slots == 0:
+            if score > self.best_score and min(counts) >= self.min_per_category:
+                self.best_score = score
+                self.best = list(chosen)
+            return
+
+        n = len(self.candidates)
+        if n - i < slots:
+            return
+        # Optimistic bound: fill every open slot with the next best scores
+        if score + self.score_prefix[i + slots] - self.score_prefix[i] <= self.best_score:
+            return
+        # The same, skipping players of previous teams this one already shares max_overlap with
+        if self.blocked:
+            bound = self._open_bound(i, slots)
+            if bound is None or score + bound <= self.best_score:
+                return
+        # Even the cheapest remaining picks would exceed the credit cap
+        if credits + self.cheapest_from[i][slots] > self.max_credits + CREDIT_EPSILON:
+            return
+        # Every category still below its minimum must be fillable from what is left
+        missing = 0
+        for j, count in enumerate(counts):
+            need = self.min_per_category - count
+            if need > 0:
+                if self.category_left[i][j] < need:
+                    return
+                missing += need
+        if missing > slots:
+            return
+
+        candidate = self.candidates[i]
+        j = self.category_index[i]
+        # Taking a player whose category is already covered must leave room for the missing ones
+        covers_missing = counts[j] < self.min_per_category
+        if (counts[j] < self.max_per_category
+                and (covers_missing or missing < slots)
+                and credits + candidate.credits <= self.max_credits + CREDIT_EPSILON
+                and (not candidate.foreign or foreign < self.max_foreign)
+                and not self.blocked >> i & 1):
+            chosen.append(i)
+            counts[j] += 1
+            blocked = self.blocked
+            for k in self.previous_with[i]:
+                overlaps[k] += 1
+                if overlaps[k] == self.max_overlap:
+                    self.blocked |= self.team_masks[k]
+            self._visit(i + 1, chosen, score + candidate.score, credits + candidate.credits,
+                        foreign + (1 if candidate.foreign else 0), counts, overlaps)
+            self.blocked = blocked
+            for k in self.previous_with[i]:
+                overlaps[k] -= 1
+            counts[j] -= 1
+            chosen.pop()
+        self._visit(i + 1, chosen, score, credits, foreign, counts, overlaps)
+
+
+def _team_result(chosen):
+    """(team, captain, vice_captain, total_credits, foreign_count) for candidates in score order"""
+    team = [(c.name, c.score) for c in chosen]
+    total_credits = sum(c.credits for c in chosen)
+    foreign_count = sum(1 for c in chosen if c.foreign)
+    captain = team[0][0] if len(team) >= 2 else None
+    vice_captain = team[1][0] if len(team) >= 2 else None
+    return team, captain, vice_captain, total_credits, foreign_count
+
+
+def search_lineups(candidates, count, max_overlap=TEAM_SIZE - 1, team_size=TEAM_SIZE, max_credits=MAX_CREDITS,
+                   max_foreign=MAX_FOREIGN, min_per_category=MIN_PER_CATEGORY, max_per_category=MAX_PER_CATEGORY,
+                   max_nodes=MAX_SEARCH_NODES):
+    """Up to count best distinct teams, each sharing at most max_overlap players with any other
+
+    Teams come in descending total score; each is the best team compatible with the ones
+    before it. Fewer than count teams are found once no further team is feasible, or once
+    the search has visited max_nodes nodes (None for no limit): the teams completed by then
+    are kept and the one being searched for is dropped. Returns a LineupSearch, truncated in
+    the second case, so fewer than count lineups without truncation means no more exist.
+    """
+    # Stable sort keeps the caller's order among equal scores
+    ordered = sorted(candidates, key=lambda c: c.score, reverse=True)
+    search = _Search(ordered, team_size, max_credits, max_foreign, min_per_category, max_per_category, max_nodes)
+    lineups = []
+    chosen_sets = []
+    while len(lineups) < count:
+        best = search.run(chosen_sets, max_overlap)
+        if best is None:
+            break
+        chosen_sets.append(set(best))
+        lineups.append(_team_result([ordered[i] for i in best]))
+    return LineupSearch(lineups, search.exhausted)
+
+
+def optimize_lineups(candidates, count, max_overlap=TEAM_SIZE - 1, team_size=TEAM_SIZE, max_credits=MAX_CREDITS,
+                     max_foreign=MAX_FOREIGN, min_per_category=MIN_PER_CATEGORY, max_per_category=MAX_PER_CATEGORY,
+                     max_nodes=MAX_SEARCH_NODES):
+    """The lineups of search_lineups, without saying whether the budget cut them short"""
+    return search_lineups(candidates, count, max_overlap, team_size, max_credits, max_foreign, min_per_category,
+                          max_per_category, max_nodes).lineups
+
+
+def optimize_team(candidates, team_size=TEAM_SIZE, max_credits=MAX_CREDITS, max_foreign=MAX_FOREIGN,
+                  min_per_category=MIN_PER_CATEGORY, max_per_category=MAX_PER_CATEGORY):
+    """Return the highest-scoring team satisfying every selection rule
+
+    Returns (team, captain, vice_captain, total_credits, foreign_count) with team as
+    (name, score) pairs in descending score order, so the captain and vice-captain are the
+    two highest scorers; returns None if no team satisfies the rules.
+    """
+    lineups = optimize_lineups(candidates, 1, team_size=team_size, max_credits=max_credits, max_foreign=max_foreign,
+                               min_per_category=min_per_category, max_per_category=max_per_category, max_nodes=None)
+    return lineups[0] if lineups else None
@@ -0,0 +1,210 @@
+"""Player name resolution shared by app.py and team.py.
+
+One registry is built per process from the squad CSVs in Teams/, squads.json and
+PLAYER_NAME_MAP. Lookups go through exact, alias and normalized-name indexes, with a
+cached fuzzy fallback for partial or misspelt names.
+"""
+import difflib
+import json
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict, namedtuple
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TEAMS_FOLDER_PATH = os.path.join(BASE_DIR, 'Teams')
+SQUADS_PATH = os.path.join(BASE_DIR, 'Static', 'public', 'squads.json')
+
+# Squad-sheet (display) name -> cricsheet name used in deliveries.csv
+PLAYER_NAME_MAP = {'Sanju Samson': 'SV Samson', 'Shubham Dubey': 'SB Dubey', 'Vaibhav Suryavanshi': 'V Suryavanshi', 'Kunal Rathore': 'KS Rathore', 'Shimron Hetmyer': 'SO Hetmyer', 'Yashasvi Jaiswal': 'YBK Jaiswal', 'Dhruv Jurel': 'Dhruv Jurel', 'Riyan Parag': 'R Parag', 'Nitish Rana': 'N Rana', 'Yudhvir Singh Charak': 'Yudhvir Singh', 'Jofra Archer': 'JC Archer', 'Maheesh Theekshana': 'M Theekshana', 'Wanindu Hasaranga': 'PWH de Silva', 'Akash Madhwal': 'A Madhwal', 'Kumar Kartikeya Singh': 'K Kartikeya', 'Tushar Deshpande': 'TU Deshpande', 'Fazalhaq Farooqi': 'Fazalhaq Farooqi', 'Kwena Maphaka': 'K Maphaka', 'Ashok Sharma': 'A Sharma', 'Sandeep Sharma': 'Sandeep Sharma', 'Ishan Kishan': 'Ishan Kishan', 'Atharva Taide': 'Atharva Taide', 'Abhinav Manohar': 'A Manohar', 'Aniket Verma': 'Aniket Verma', 'Heinrich Klaasen': 'H Klaasen', 'Travis Head': 'TM Head', 'Harshal Patel': 'HV Patel', 'Kamindu Mendis': 'PHKD Mendis', 'Wiaan Mulder': 'PWA Mulder', 'Abhishek Sharma': 'Abhishek Sharma', 'Nitish Kumar Reddy': 'Nithish Kumar Reddy', 'Pat Cummins': 'Pat Cummins', 'Mohammad Shami': 'Mohammad Shami', 'Rahul Chahar': 'RD Chahar', 'Simarjeet Singh': 'Simarjeet Singh', 'Zeeshan Ansari': 'Zeeshan Ansari', 'Jaydev Unadkat': 'JD Unadkat', 'Eshan Malinga': 'E Malinga', 'Ajinkya Rahane': 'AM Rahane', 'Rinku Singh': 'RK Singh', 'Quinton de Kock': 'Q de Kock', 'Rahmanullah Gurbaz': 'Rahmanullah Gurbaz', 'Angkrish Raghuvanshi': 'A Raghuvanshi', 'Rovman Powell': 'R Powell', 'Manish Pandey': 'MK Pandey', 'Venkatesh Iyer': 'VR Iyer', 'Anukul Roy': 'AS Roy', 'Moeen Ali': 'MM Ali', 'Ramandeep Singh': 'Ramandeep Singh', 'Andre Russell': 'AD Russell', 'Anrich Nortje': 'A Nortje', 'Vaibhav Arora': 'VG Arora', 'Mayank Markande': 'M Markande', 'Spencer Johnson': 'SH Johnson', 'Harshit Rana': 'Harshit Rana', 'Sunil Narine': 'SP Narine', 'Varun Chakaravarthy': 'CV Varun', 'Chetan Sakariya': 'C Sakariya', 'MS Dhoni': 'MS Dhoni', 'Dewald Brevis': 'D Brevis', 'Devon Conway': 'DP Conway', 'Rahul Tripathi': 'R Tripathi', 'Shaik Rasheed': 'SK Rasheed', 'Ayush Mhatre': 'A Mhatre ', 'Rachin Ravindra': 'R Ravindra', 'Ravichandran Ashwin': 'R Ashwin', 'Vijay Shankar': 'V Shankar', 'Sam Curran': 'SM Curran', 'Anshul Kamboj': 'A Kamboj', 'Deepak Hooda': 'DJ Hooda', 'Jamie Overton': 'J Overton', 'Ravindra Jadeja': 'RA Jadeja', 'Shivam Dube': 'S Dube', 'Khaleel Ahmed': 'KK Ahmed', 'Noor Ahmad': 'Noor Ahmad', 'Mukesh Choudhary': 'Mukesh Choudhary', 'Nathan Ellis': 'NT Ellis', 'Shreyas Gopal': 'S Gopal', 'Matheesha Pathirana': 'M Pathirana', 'Shubman Gill': 'Shubman Gill', 'Jos Buttler': 'JC Buttler', 'Kumar Kushagra': 'Kumar Kushagra', 'Anuj Rawat': 'Anuj Rawat', 'Sherfane Rutherford': 'SE Rutherford', 'Mahipal Lomror': 'MK Lomror', 'Washington Sundar': 'Washington Sunder', 'Mohd. Arshad Khan': 'Arshad Khan', 'Sai Kishore': 'R Sai Kishore', 'Jayant Yadav': 'J Yadav', 'Sai Sudharsan': 'B Sai Sudharsan', 'Dasun shanaka': 'MD Shanaka', 'Shahrukh Khan': 'M Shahrukh Khan', 'Kagiso Rabada': 'K Rabada', 'Mohammed Siraj': 'Mohammed Siraj', 'Prasidh Krishna': 'M Prasidh Krishna', 'Gerald Coetzee': 'G Coetzee', 'Ishant Sharma': 'I Sharma', 'Kulwant Khejroliya': 'K Khejroliya', 'Rahul Tewatia': 'R Tewatia', 'Rashid Khan': 'Rashid Khan', 'Rajat Patidar': ' RM Patidar', 'Virat Kohli': 'V Kohli', 'Phil Salt': 'PD Salt', 'Jitesh Sharma': 'JM Sharma', 'Devdutt Padikkal': 'D Padikkal', 'Swastik Chhikara': 'SS Chhikara', 'Liam Livingstone': 'LS Livingstone', 'Krunal Pandya': 'KH Pandya', 'Swapnil Singh': 'S Singh', 'Tim David': 'TH David', 'Romario Shepherd': 'R Shepherd', 'Manoj Bhandage': 'MS Bhandage', 'Jacob Bethell': 'JG Bethell', 'Josh Hazlewood': 'JR Hazlewood', 'Rasikh Dar': 'Rasikh Salam', 'Suyash Sharma': 'Suyash Sharma', 'Bhuvneshwar Kumar': 'B Kumar', 'Nuwan Thushara': 'N Thushara', 'Lungisani Ngidi': 'L Ngidi', 'Abhinandan Singh': 'A Singh', 'Mohit Rathee': 'M Rathee', 'Yash Dayal': 'Y Dayal', 'Rishabh Pant': 'RR Pant', 'David Miller': 'DA Miller', 'Aiden Markram': 'AK Markram', 'Nicholas Pooran': 'N Pooran', 'Mitchell Marsh': 'MR Marsh', 'Abdul Samad': 'Abdul Samad ', 'Shahbaz Ahamad': 'Shahbaz Ahmed', 'Rajvardhan Hangargekar': 'RS Hangargekar', 'Ayush Badoni': 'A Badoni', 'Shardul Thakur': 'SN Thakur', 'Avesh Khan': 'Avesh Khan', 'Akash Deep': 'Akash Deep', 'M. Siddharth': 'M Siddharth', 'Digvesh Singh': 'DS Rathi', 'Akash Singh': 'Akash Singh', 'Prince Yadav': 'Prince Yadav', 'Mayank Yadav': 'MP Yadav', 'Ravi Bishnoi': 'Ravi Bishnoi', 'Shreyas Iyer': 'SS Iyer', 'Nehal Wadhera': 'N Wadhera', 'Vishnu Vinod': 'Vishnu Vinod', 'Josh Inglis': 'JP Inglis', 'Prabhsimran Singh': 'P Simran Singh', 'Shashank Singh': 'Shashank Singh', 'Marcus Stoinis': 'MP Stoinis', 'Glenn Maxwell': 'GJ Maxwell', 'Harpreet Brar': 'Harpreet Brar', 'Marco Jansen': 'M Jansen', 'Azmatullah Omarzai': 'Azmatullah Omarzai', 'Priyansh Arya': 'Priyansh Arya', 'Suryansh Shedge': 'Suryansh Shedge', 'Arshdeep Singh': 'Arshdeep Singh', 'Yuzvendra Chahal': 'YS Chahal', 'Vyshak Vijaykumar': 'Vijaykumar Vyshak', 'Yash Thakur': 'Yash Thakur', 'Lockie Ferguson': 'LH Ferguson', 'Kuldeep Sen': 'KR Sen', 'Xavier Bartlett': 'XC Bartlett', 'Pravin Dubey': 'P Dubey', 'KL Rahul': 'KL Rahul', 'Jake Fraser-McGurk': 'J Fraser-McGurk', 'Karun Nair': 'KK Nair', 'Faf du Plessis': 'F du Plessis', 'Donovan Ferreira': 'D Ferreira', 'Abishek Porel': 'Abhishek Porel', 'Tristan Stubbs': 'T Stubbs', 'Axar Patel': 'AR Patel', 'Sameer Rizvi': 'Sameer Rizvi', 'Ashutosh Sharma': 'Ashutosh Sharma', 'Vipraj Nigam': 'V Nigam', 'Mitchell Starc': 'MA Starc', 'T. Natarajan': 'T Natarajan', 'Mohit Sharma': 'MM Sharma', 'Mukesh Kumar': 'Mukesh Kumar', 'Dushmantha Chameera': 'PVD Chameera', 'Kuldeep Yadav': 'Kuldeep Yadav', 'Rohit Sharma': 'RG Sharma', 'Surya Kumar Yadav': 'SA Yadav', 'Robin Minz': 'R Minz', 'Ryan Rickelton': 'RD Rickelton', 'Shrijith Krishnan': 'K Shrijith', 'Bevon Jacobs': 'B Jacobs', 'N. Tilak Varma': 'Tilak Varma', 'Hardik Pandya': 'HH Pandya', 'Naman Dhir': 'Naman Dhir', 'Will Jacks': 'WG Jacks', 'Mitchell Santner': 'MJ Santner', 'Raj Angad Bawa': 'RA Bawa', 'Vignesh Puthur': 'V Puthur', 'Trent Boult': 'TA Boult', 'Karn Sharma': 'KV Sharma', 'Deepak Chahar': 'DL Chahar', 'Ashwani Kumar': 'Ashwani Kumar', 'Reece Topley': 'R Topley', 'V.Satyanarayana Penmetsa': 'PVSN Raju', 'Arjun Tendulkar': 'A Tendulkar', 'Mujeeb-ur-Rahman': 'Mujeeb ur Rahman', 'Jasprit Bumrah': 'JJ Bumrah'}
+
+# Credit columns the squad CSVs have used, in order of preference
+CREDIT_COLUMNS = ['Credits', 'credits', 'Credit']
+DEFAULT_CREDITS = 7.0
+
+# Similarity needed for a misspelt name to resolve (difflib ratio on normalized names)
+FUZZY_CUTOFF = 0.85
+# Fuzzy lookups remembered, least recently used first out; lookups are client strings
+MAX_FUZZY_CACHE = 4096
+
+# name is the squad-sheet name, cricsheet_name the name in the ball-by-ball data and
+# full_name the sheet's own Full Name column
+PlayerRecord = namedtuple('PlayerRecord', ['name', 'team', 'role', 'credits', 'foreign', 'cricsheet_name', 'full_name'])
+
+
+def normalize_name(name):
+    """Casefolded, accent-free name with punctuation and repeated spaces collapsed"""
+    name = unicodedata.normalize('NFKD', str(name))
+    name = ''.join(c for c in name if not unicodedata.combining(c))
+    return ' '.join(re.sub(r"[^\w\s]", ' ', name.casefold()).split())
+
+
+def _credits(row, filename):
+    import pandas as pd
+    for column in CREDIT_COLUMNS:
+        if column in row and not pd.isna(row[column]):
+            try:
+                return float(row[column])
+            except ValueError:
+                print(f"Invalid {column} {row[column]!r} for {row['Name']} in {filename}")
+                break
+    return DEFAULT_CREDITS
+
+
+class PlayerRegistry:
+    """Squad players indexed by every name they are known under"""
+
+    def __init__(self, records, aliases=()):
+        self.records = list(records)
+        self._exact = {}
+        self._aliases = {}
+        self._normalized = {}
+        self._fuzzy_cache = OrderedDict()
+        self._lock = threading.Lock()
+
+        for record in self.records:
+            # The first team listing a player wins, as team files are read in order
+            self._exact.setdefault(record.name, record)
+            self._normalized.setdefault(normalize_name(record.name), record)
+        for record in self.records:
+            for alias in (record.cricsheet_name, record.full_name):
+                if alias:
+                    self._add_alias(alias, record)
+        for alias, name in aliases:
+            record = self.resolve(name, fuzzy=False)
+            if record is not None:
+                self._add_alias(alias, record)
+        self._normalized_names = list(self._normalized)
+        self._longest_name = max(map(len, self._normalized_names), default=0)
+
+    def _add_alias(self, alias, record):
+        if alias not in self._exact:
+            self._aliases.setdefault(alias, record)
+        self._normalized.setdefault(normalize_name(alias), record)
+
+    def __len__(self):
+        return len(self.records)
+
+    def team_players(self, team_name):
+        """Records of one team's squad in sheet order"""
+        key = team_name.casefold()
+        return [r for r in self.records if r.team.casefold() == key]
+
+    def resolve(self, name, fuzzy=True):
+        """Return the PlayerRecord for any known name of a player, or None"""
+        if not name:
+            return None
+        name = str(name).strip()
+        record = self._exact.get(name) or self._aliases.get(name)
+        if record is not None:
+            return record
+        key = normalize_name(name)
+        record = self._normalized.get(key)
+        if record is not None or not fuzzy or not key:
+            return record
+
+        with self._lock:
+            if key in self._fuzzy_cache:
+                self._fuzzy_cache.move_to_end(key)
+                return self._fuzzy_cache[key]
+        record = self._fuzzy(key)
+        # Strings longer than any known name are not worth remembering as misses
+        if record is not None or len(key) <= self._longest_name:
+            with self._lock:
+                self._fuzzy_cache[key] = record
+                while len(self._fuzzy_cache) > MAX_FUZZY_CACHE:
+                    self._fuzzy_cache.popitem(last=False)
+        return record
+
+    def _fuzzy(self, key):
+        # Partial names ("Bumrah") match the first name containing them, like the old CSV scan
+        for candidate in self._normalized_names:
+            if key in candidate:
+                return self._normalized[candidate]
+        matches = difflib.get_close_matches(key, self._normalized_names, n=1, cutoff=FUZZY_CUTOFF)
+        return self._normalized[matches[0]] if matches else None
+
+    def player_info(self, name):
+        """Role, credits, foreign flag and team of a player, or None if not in any squad"""
+        record = self.resolve(name)
+        if record is None:
+            return None
+        return {
+            'role': record.role,
+            'credits': record.credits,
+            'foreign': record.foreign,
+            'team': record.team,
+        }
+
+    def cricsheet_name(self, name):
+        """Name of a player in the ball-by-ball data; unknown names are returned unchanged"""
+        record = self.resolve(name, fuzzy=False)
+        if record is None or not record.cricsheet_name:
+            return str(name).strip()
+        return record.cricsheet_name
+
+
+def load_records(teams_folder_path):
+    """PlayerRecords from every *_squad.csv, in directory order"""
+    # pandas is only needed to build the registry, not to import this module (app.py imports it for the name map)
+    import pandas as pd
+    records = []
+    for filename in os.listdir(teams_folder_path):
+        if not filename.endswith('_squad.csv'):
+            continue
+        team_name = filename.replace('_squad.csv', '').replace('-', ' ').title()
+        try:
+            team_df = pd.read_csv(os.path.join(teams_folder_path, filename))
+        except Exception as e:
+            print(f"Error loading {filename}: {e}")
+            continue
+        for _, row in team_df.iterrows():
+            if pd.isna(row['Name']):
+                continue
+            name = str(row['Name'])
+            full_name = row.get('Full Name')
+            full_name = full_name.strip() if isinstance(full_name, str) else None
+            cricsheet_name = PLAYER_NAME_MAP.get(name, full_name)
+            records.append(PlayerRecord(
+                name=name,
+                team=team_name,
+                role=row['Role'],
+                credits=_credits(row, filename),
+                foreign=row.get('Foreign Player', False) == True,
+                cricsheet_name=cricsheet_name.strip() if cricsheet_name else None,
+                full_name=full_name,
+            ))
+    return records
+
+
+def load_aliases(squads_path):
+    """(alias, name) pairs from squads.json and PLAYER_NAME_MAP"""
+    aliases = [(cricsheet.strip(), name) for name, cricsheet in PLAYER_NAME_MAP.items()]
+    try:
+        with open(squads_path, 'r') as f:
+            squads = json.load(f).get('squads', [])
+    except (OSError, ValueError):
+        squads = []
+    for squad in squads:
+        for player in squad.get('players', []):
+            if player.get('name'):
+                aliases.append((player['name'], player['name']))
+    return aliases
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_registry(teams_folder_path=TEAMS_FOLDER_PATH, squads_path=SQUADS_PATH):
+    """Return the shared registry for a Teams folder, building it on first use"""
+    key = (os.path.abspath(teams_folder_path), os.path.abspath(squads_path))
+    registry = _registries.get(key)
+    if registry is None:
+        with _registries_lock:
+            registry = _registries.get(key)
+            if registry is None:
+                registry = PlayerRegistry(load_records(teams_folder_path), load_aliases(squads_path))
+                _registries[key] = registry
+    return registry
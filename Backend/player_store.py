@@ -0,0 +1,480 @@
+"""Compiled, memory-mapped form of batter_data_cache.json and bowler_data_cache.json.
+
+The JSON caches stay the source of truth and are recompiled whenever they change.
+Their venue and recent-form text tables are parsed into numeric records at compile time;
+players covered by the ingested aggregates (player_aggregates.json, see ingest.py) take
+their venue and recent-form records from those instead, and re-ingesting recompiles too.
+File layout: MAGIC, uint32 header length, JSON header, then 8-byte aligned arrays.
+"""
+import argparse
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+from collections import OrderedDict
+import numpy as np
+import metrics
+
+MAGIC = b'P11STATS'
+FORMAT_VERSION = 3
+DEFAULT_FILENAME = 'player_stats.bin'
+
+BATTER_H2H_FIELDS = ['Balls Faced', 'Dot Balls', 'Total Runs', '1s', '2s', '3s', '4s', '6s',
+                     'Dismissals', 'Strike Rate', 'Average', 'Boundary %']
+BOWLER_H2H_FIELDS = ['Balls', 'Runs', 'Dismissals', 'Avg', 'Econ']
+# Key of the venue table and label of the match-wise recent_form table in each JSON cache
+VENUE_TABLES = {'batter': 'Batting', 'bowler': 'Bowling'}
+FORM_TABLES = {'batter': 'Batting Match-wise', 'bowler': 'Bowling Match-wise'}
+# Venue columns the predictor scores on, with the value it uses when a column is absent
+VENUE_FIELDS = {
+    'batter': {'Strike_Rate': 0.0, 'Average': 0.0},
+    'bowler': {'Wickets': 0.0, 'Economy': 15.0},
+}
+# Recent-form columns averaged over the last matches (NaN when a column is absent)
+FORM_FIELDS = {'batter': ['Runs', 'Strike Rate'], 'bowler': ['Wickets', 'Economy']}
+# Venue lookups whose matching venue ids are kept, least recently used first out
+MAX_VENUE_MATCHES = 1024
+
+_COLUMN_SEPARATOR = re.compile(r'\s{2,}')
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _batter_h2h_row(h2h_data):
+    """Numeric row for one batter-vs-bowler entry, or None if the predictor would skip it"""
+    # If there's a list of encounters, the first one is used
+    if isinstance(h2h_data, list) and len(h2h_data) > 0:
+        h2h_data = h2h_data[0]
+    if not isinstance(h2h_data, dict) or 'Message' in h2h_data:
+        return None
+    # Mirror Dream11Predictor: non-numeric fields make the batting score raise and be skipped
+    try:
+        (h2h_data.get('Strike Rate', 0) / 100) * 2 + (h2h_data.get('Average', 0) / 10) \
+            + (h2h_data.get('Boundary %', 0) / 10) - (h2h_data.get('Dismissals', 0) * 2)
+    except (TypeError, ValueError):
+        return None
+    return [_to_float(h2h_data.get(field, 0)) for field in BATTER_H2H_FIELDS]
+
+
+def _bowler_h2h_row(h2h_data):
+    """Numeric row for one bowler-vs-batter entry, or None if the predictor would skip it"""
+    if not isinstance(h2h_data, dict):
+        return None
+    try:
+        dismissals = float(h2h_data.get('Dismissals', 0))
+        economy = float(h2h_data.get('Econ', 15))  # Default high economy if not available
+    except (TypeError, ValueError):
+        return None
+    row = [_to_float(h2h_data.get(field)) for field in BOWLER_H2H_FIELDS]
+    row[2] = dismissals
+    row[4] = economy
+    return row
+
+
+def parse_text_table(text):
+    """Split a printed DataFrame (columns separated by 2+ spaces) into its columns and rows"""
+    lines = [line for line in text.split('\n') if line.strip()]
+    if not lines:
+        return [], []
+    columns = _COLUMN_SEPARATOR.split(lines[0].strip())
+    rows = []
+    for line in lines[1:]:
+        values = _COLUMN_SEPARATOR.split(line.strip())
+        # Each printed row starts with its index label
+        if len(values) == len(columns) + 1:
+            values = values[1:]
+        if len(values) == len(columns):
+            rows.append(values)
+    return columns, rows
+
+
+def normalize_venue(name):
+    return ' '.join(name.casefold().split())
+
+
+def _venue_rows(player_data, kind):
+    """(normalized venue, scoring values) for each row of a player's venue table, in table order"""
+    venue_data = player_data.get('venue', {})
+    if not venue_data or VENUE_TABLES[kind] not in venue_data:
+        return []
+    columns, rows = parse_text_table(venue_data[VENUE_TABLES[kind]])
+    if 'venue' not in columns:
+        return []
+    venue_col = columns.index('venue')
+    records = []
+    for values in rows:
+        try:
+            record = [float(values[columns.index(field)]) if field in columns else default
+                      for field, default in VENUE_FIELDS[kind].items()]
+        except ValueError:
+            continue
+        records.append((normalize_venue(values[venue_col]), record))
+    return records
+
+
+def _aggregate_venue_rows(aggregates, kind, player):
+    """Venue rows of an aggregated player, ordered as cache_builder orders its venue tables"""
+    order = 'Runs' if kind == 'batter' else 'Wickets'
+    rows = sorted(((venue, aggregates.venue_stats(kind, player, venue)) for venue in aggregates.venues[kind][player]),
+                  key=lambda item: item[1][order], reverse=True)
+    return [(normalize_venue(venue), [float(row[field]) if field in row else default
+                                      for field, default in VENUE_FIELDS[kind].items()])
+            for venue, row in rows]
+
+
+def _aggregate_form_means(aggregates, kind, player):
+    """Mean of each FORM_FIELDS column over an aggregated player's recent matches, or None"""
+    rows = aggregates.recent_form(kind, player)
+    if not rows:
+        return None
+    return [sum(float(row[field]) for row in rows) / len(rows) for field in FORM_FIELDS[kind]]
+
+
+def _form_means(player_data, kind):
+    """Mean of each FORM_FIELDS column over the match-wise recent form table, or None"""
+    for form_data in player_data.get('recent_form', []):
+        if len(form_data) >= 2 and form_data[0] == FORM_TABLES[kind]:
+            columns, rows = parse_text_table(form_data[1])
+            means = []
+            for field in FORM_FIELDS[kind]:
+                values = [_to_float(values[columns.index(field)]) for values in rows] if field in columns else []
+                values = [value for value in values if not np.isnan(value)]
+                means.append(sum(values) / len(values) if values else np.nan)
+            return means
+    return None
+
+
+class _StringTable:
+    def __init__(self):
+        self.strings = []
+        self.ids = {}
+
+    def add(self, value):
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = self.ids[value] = len(self.strings)
+            self.strings.append(value)
+        return string_id
+
+
+def _source_stamp(path):
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _sources(batter_data_path, bowler_data_path, aggregates_path=None):
+    """Stamps of every file the compiled stats are built from; the aggregates' is None while they don't exist"""
+    sources = {'batter': _source_stamp(batter_data_path), 'bowler': _source_stamp(bowler_data_path)}
+    if aggregates_path is not None:
+        sources['aggregates'] = _source_stamp(aggregates_path) if os.path.exists(aggregates_path) else None
+    return sources
+
+
+def _load_aggregates(aggregates_path):
+    """(PlayerAggregates, cache key -> aggregated name), or (None, None) without an aggregates file"""
+    if aggregates_path is None or not os.path.exists(aggregates_path):
+        return None, None
+    # Only needed when there are aggregates; ingest pulls in pandas
+    from ingest import PlayerAggregates
+    from player_registry import get_registry
+    aggregates = PlayerAggregates.load(aggregates_path)
+    registry = get_registry()
+
+    def aggregate_name(player):
+        # --all-players caches are already keyed by cricsheet names
+        for kind in ('batter', 'bowler'):
+            if player in aggregates.venues[kind] or player in aggregates.form[kind]:
+                return player
+        return registry.cricsheet_name(player)
+    return aggregates, aggregate_name
+
+
+def _compile_kind(data, kind, names, venues, row_builder, n_fields, aggregates=None, aggregate_name=None):
+    """Build the arrays for one JSON cache ('batter' or 'bowler')
+
+    aggregate_name maps a cache key to the player's name in aggregates (cricsheet names).
+    """
+    players = list(data)
+    player_ids = [names.add(player) for player in players]
+
+    offsets = [0]
+    opponents = []
+    values = []
+    for player in players:
+        head_to_head = data[player].get('head_to_head', {})
+        rows = []
+        if isinstance(head_to_head, dict):
+            for opponent, h2h_data in head_to_head.items():
+                row = row_builder(h2h_data)
+                if row is not None:
+                    rows.append((names.add(opponent), row))
+        # Sorted by opponent id so lookups can binary-search a player's slice
+        rows.sort(key=lambda item: item[0])
+        opponents.extend(opponent_id for opponent_id, _ in rows)
+        values.extend(row for _, row in rows)
+        offsets.append(len(opponents))
+
+    arrays = {
+        f'{kind}_players': np.array(player_ids, dtype='<i4'),
+        f'{kind}_h2h_offsets': np.array(offsets, dtype='<i8'),
+        f'{kind}_h2h_opponents': np.array(opponents, dtype='<i4'),
+        f'{kind}_h2h_values': np.array(values, dtype='<f8').reshape(-1, n_fields),
+    }
+
+    # Venue tables: per-player row ranges of (venue string id, scoring values), in table order
+    venue_offsets = [0]
+    venue_ids = []
+    venue_values = []
+    # Recent form: one row of column means per player
+    form = []
+    for player in players:
+        aggregated = aggregate_name(player) if aggregates is not None else None
+        if aggregated is not None and aggregated in aggregates.venues[kind]:
+            venue_rows = _aggregate_venue_rows(aggregates, kind, aggregated)
+        else:
+            venue_rows = _venue_rows(data[player], kind)
+        for venue, record in venue_rows:
+            venue_ids.append(venues.add(venue))
+            venue_values.append(record)
+        venue_offsets.append(len(venue_ids))
+        if aggregated is not None and aggregated in aggregates.form[kind]:
+            means = _aggregate_form_means(aggregates, kind, aggregated)
+        else:
+            means = _form_means(data[player], kind)
+        # The last column flags whether the player has a form table at all
+        if means is None:
+            form.append([np.nan] * len(FORM_FIELDS[kind]) + [0.0])
+        else:
+            form.append(means + [1.0])
+
+    arrays.update({
+        f'{kind}_venue_offsets': np.array(venue_offsets, dtype='<i8'),
+        f'{kind}_venue_ids': np.array(venue_ids, dtype='<i4'),
+        f'{kind}_venue_values': np.array(venue_values, dtype='<f8').reshape(-1, len(VENUE_FIELDS[kind])),
+        f'{kind}_form': np.array(form, dtype='<f8').reshape(-1, len(FORM_FIELDS[kind]) + 1),
+    })
+    return arrays
+
+
+@metrics.phase('compile_stats')
+def compile_player_stats(batter_data_path, bowler_data_path, output_path, aggregates_path=None):
+    """Compile both JSON caches, and the aggregates if that file exists, into the binary store at output_path
+
+    The file is written atomically.
+    """
+    with open(batter_data_path, 'r') as f:
+        batter_data = json.load(f)
+    with open(bowler_data_path, 'r') as f:
+        bowler_data = json.load(f)
+    # Stamped before reading, so aggregates rewritten mid-compile make the result stale
+    sources = _sources(batter_data_path, bowler_data_path, aggregates_path)
+    aggregates, aggregate_name = _load_aggregates(aggregates_path)
+
+    names = _StringTable()
+    venues = _StringTable()
+    arrays = {}
+    arrays.update(_compile_kind(batter_data, 'batter', names, venues, _batter_h2h_row, len(BATTER_H2H_FIELDS),
+                                aggregates, aggregate_name))
+    arrays.update(_compile_kind(bowler_data, 'bowler', names, venues, _bowler_h2h_row, len(BOWLER_H2H_FIELDS),
+                                aggregates, aggregate_name))
+    # Venue ids index the venue names, which follow the player names in the string table
+    for kind in ('batter', 'bowler'):
+        arrays[f'{kind}_venue_ids'] += len(names.strings)
+
+    encoded = [s.encode('utf-8') for s in names.strings + venues.strings]
+    string_offsets = np.zeros(len(encoded) + 1, dtype='<i8')
+    np.cumsum([len(s) for s in encoded], out=string_offsets[1:])
+    arrays['string_offsets'] = string_offsets
+    arrays['string_data'] = np.frombuffer(b''.join(encoded), dtype='u1')
+
+    header = {
+        'format': FORMAT_VERSION,
+        'sources': sources,
+        'aggregates_version': aggregates.version if aggregates is not None else None,
+        'n_names': len(names.strings),
+        'arrays': {},
+    }
+    # Offsets are relative to the start of the data section, which follows the aligned header
+    position = 0
+    for name, array in arrays.items():
+        position = (position + 7) // 8 * 8
+        header['arrays'][name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': position}
+        position += array.nbytes
+
+    header_bytes = json.dumps(header).encode('utf-8')
+    prefix_len = len(MAGIC) + 4 + len(header_bytes)
+    data_start = (prefix_len + 7) // 8 * 8
+
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b'\0' * (data_start - prefix_len))
+        for name, array in arrays.items():
+            f.seek(data_start + header['arrays'][name]['offset'])
+            f.write(np.ascontiguousarray(array).tobytes())
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+def _read_header(path):
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            return None
+        (header_len,) = struct.unpack('<I', f.read(4))
+        return json.loads(f.read(header_len))
+
+
+def _is_fresh(path, sources):
+    try:
+        header = _read_header(path)
+    except (OSError, ValueError, struct.error):
+        return False
+    return header is not None and header.get('format') == FORMAT_VERSION and header['sources'] == sources
+
+
+class PlayerStats:
+    """Read-only view over a compiled player stats file"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (header_len,) = struct.unpack_from('<I', self._mmap, len(MAGIC))
+        header = json.loads(self._mmap[len(MAGIC) + 4:len(MAGIC) + 4 + header_len])
+        data_start = (len(MAGIC) + 4 + header_len + 7) // 8 * 8
+        self.sources = header['sources']
+        self.aggregates_version = header['aggregates_version']
+
+        self._arrays = {}
+        for name, spec in header['arrays'].items():
+            count = int(np.prod(spec['shape']))
+            array = np.frombuffer(self._mmap, dtype=np.dtype(spec['dtype']), count=count,
+                                  offset=data_start + spec['offset'])
+            self._arrays[name] = array.reshape(spec['shape'])
+
+        self._string_offsets = self._arrays['string_offsets']
+        self._string_data = self._arrays['string_data']
+        # Player and opponent names -> string id
+        self.name_ids = {self.string(i): i for i in range(header['n_names'])}
+        # Player name -> row in the per-kind arrays
+        self.batters = {self.string(i): row for row, i in enumerate(self._arrays['batter_players'].tolist())}
+        self.bowlers = {self.string(i): row for row, i in enumerate(self._arrays['bowler_players'].tolist())}
+        # Normalized venue name -> string id
+        self.venues = {self.string(i): i for i in range(header['n_names'], len(self._string_offsets) - 1)}
+        self._venue_matches = OrderedDict()
+        self._venue_lock = threading.Lock()
+
+    def array(self, name):
+        """One of the compiled arrays (read-only, backed by the mapped file)"""
+        return self._arrays[name]
+
+    def string(self, string_id):
+        start, stop = self._string_offsets[string_id], self._string_offsets[string_id + 1]
+        return self._string_data[start:stop].tobytes().decode('utf-8')
+
+    def _head_to_head(self, kind, player_row, opponent, fields):
+        opponent_id = self.name_ids.get(opponent)
+        if opponent_id is None:
+            return None
+        offsets = self._arrays[f'{kind}_h2h_offsets']
+        start, stop = offsets[player_row], offsets[player_row + 1]
+        opponents = self._arrays[f'{kind}_h2h_opponents'][start:stop]
+        i = np.searchsorted(opponents, opponent_id)
+        if i == len(opponents) or opponents[i] != opponent_id:
+            return None
+        return dict(zip(fields, self._arrays[f'{kind}_h2h_values'][start + i].tolist()))
+
+    def batter_head_to_head(self, batter, bowler):
+        """Scoring fields of batter vs bowler, or None if there is no usable record"""
+        row = self.batters.get(batter)
+        return None if row is None else self._head_to_head('batter', row, bowler, BATTER_H2H_FIELDS)
+
+    def bowler_head_to_head(self, bowler, batter):
+        """Scoring fields of bowler vs batter, or None if there is no usable record"""
+        row = self.bowlers.get(bowler)
+        return None if row is None else self._head_to_head('bowler', row, batter, BOWLER_H2H_FIELDS)
+
+    def matching_venues(self, venue):
+        """String ids of the known venues whose normalized name contains the given venue"""
+        key = normalize_venue(venue)
+        with self._venue_lock:
+            matches = self._venue_matches.get(key)
+            if matches is not None:
+                self._venue_matches.move_to_end(key)
+                return matches
+        matches = np.array(sorted(i for name, i in self.venues.items() if key in name), dtype='<i4')
+        with self._venue_lock:
+            self._venue_matches[key] = matches
+            while len(self._venue_matches) > MAX_VENUE_MATCHES:
+                self._venue_matches.popitem(last=False)
+        return matches
+
+    def venue_record(self, kind, player, venue):
+        """Scoring fields from the first row of a player's venue table matching venue, or None"""
+        row = (self.batters if kind == 'batter' else self.bowlers).get(player)
+        if row is None:
+            return None
+        offsets = self._arrays[f'{kind}_venue_offsets']
+        start, stop = offsets[row], offsets[row + 1]
+        hits = np.flatnonzero(np.isin(self._arrays[f'{kind}_venue_ids'][start:stop], self.matching_venues(venue)))
+        if len(hits) == 0:
+            return None
+        return dict(zip(VENUE_FIELDS[kind], self._arrays[f'{kind}_venue_values'][start + hits[0]].tolist()))
+
+    def recent_form(self, kind, player):
+        """Column means of a player's match-wise recent form table, or None if there is none"""
+        row = (self.batters if kind == 'batter' else self.bowlers).get(player)
+        if row is None:
+            return None
+        values = self._arrays[f'{kind}_form'][row].tolist()
+        if not values[-1]:
+            return None
+        return dict(zip(FORM_FIELDS[kind], values[:-1]))
+
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def load_player_stats(batter_data_path, bowler_data_path, compiled_path=None, aggregates_path=None):
+    """Return the shared PlayerStats for the two JSON caches and the aggregates, compiling them when any changed"""
+    if compiled_path is None:
+        compiled_path = os.path.join(os.path.dirname(os.path.abspath(batter_data_path)), DEFAULT_FILENAME)
+    key = os.path.abspath(compiled_path)
+    sources = _sources(batter_data_path, bowler_data_path, aggregates_path)
+
+    stats = _stats.get(key)
+    if stats is not None and stats.sources == sources:
+        metrics.cache_lookup('player_stats', True)
+        return stats
+    metrics.cache_lookup('player_stats', False)
+    with _stats_lock:
+        stats = _stats.get(key)
+        if stats is None or stats.sources != sources:
+            fresh = _is_fresh(compiled_path, sources)
+            metrics.cache_lookup('player_stats_compiled', fresh)
+            if not fresh:
+                compile_player_stats(batter_data_path, bowler_data_path, compiled_path, aggregates_path)
+            stats = _stats[key] = PlayerStats(compiled_path)
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compile the batter/bowler JSON caches into a memory-mappable store')
+    parser.add_argument('batter_data', nargs='?', default='Static/public/batter_data_cache.json')
+    parser.add_argument('bowler_data', nargs='?', default='Static/public/bowler_data_cache.json')
+    parser.add_argument('-o', '--output', default=None)
+    parser.add_argument('--aggregates', default='player_aggregates.json', help="ingest.py state file, used if it exists")
+    args = parser.parse_args()
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(args.batter_data)), DEFAULT_FILENAME)
+    compile_player_stats(args.batter_data, args.bowler_data, output, args.aggregates)
+    print(f"Player stats compiled to {output}")
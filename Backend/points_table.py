@@ -0,0 +1,140 @@
+"""The IPL points table, normalized once into one typed record per team.
+
+Shared by the /points_table route (a background-refreshed UpstreamFeed) and
+fetch_points_table.py (a one-off fetch into a JSON file). Every payload shape seen so far,
+sportskeeda's grouped table, a flat list of rows, or a file written here, normalizes to
+the same records, so a table's version is a hash of its standings alone: it changes only
+when the standings do, and doubles as the route's ETag.
+"""
+import hashlib
+import json
+import os
+from collections import namedtuple
+from upstream import BROWSER_HEADERS, UpstreamFeed
+
+API_URL = 'https://cf-gotham.sportskeeda.com/cricket/ipl/points-table'
+PROXY_URL = f'https://corsproxy.io/?{API_URL}'
+HEADERS = dict(BROWSER_HEADERS, Referer='https://www.sportskeeda.com/')
+FALLBACK_FILE = 'Static/public/points_table.json'
+
+# (field, type, default) of a team record, in output order
+FIELDS = [
+    ('position', int, 0),
+    ('team_name', str, ''),
+    ('team_short_name', str, ''),
+    ('team_flag', str, ''),
+    ('played', int, 0),
+    ('won', int, 0),
+    ('lost', int, 0),
+    ('tied', int, 0),
+    ('no_result', int, 0),
+    ('points', int, 0),
+    ('nrr', float, 0.0),
+]
+# Other names upstream rows have used for a field
+ALIASES = {
+    'team_name': ['name', 'team'],
+    'team_short_name': ['short_name'],
+    'played': ['matches'],
+    'no_result': ['nr'],
+    'points': ['pts'],
+    'nrr': ['net_run_rate'],
+}
+
+# body is the serialized {"version", "points"} served by the route, etag the table's version
+PointsTable = namedtuple('PointsTable', ['points', 'body', 'etag'])
+
+
+def team_rows(data):
+    """The per-team rows of a points-table payload, flattening sportskeeda's groups"""
+    if isinstance(data, dict):
+        rows = next((data[key] for key in ('points', 'teams', 'standings') if isinstance(data.get(key), list)), None)
+        if rows is None:
+            table = data.get('table')
+            if isinstance(table, list) and table and isinstance(table[0], dict) and isinstance(table[0].get('table'), list):
+                rows = table[0]['table']
+            else:
+                rows = table if isinstance(table, list) else []
+    else:
+        rows = data if isinstance(data, list) else []
+    flat = []
+    for row in rows:
+        if isinstance(row, dict) and isinstance(row.get('group'), list):
+            flat.extend(row['group'])
+        elif isinstance(row, dict):
+            flat.append(row)
+    return flat
+
+
+def _field(row, name, kind, default):
+    for key in [name] + ALIASES.get(name, []):
+        value = row.get(key)
+        if value is None or value == '' or isinstance(value, (dict, list)):
+            continue
+        try:
+            # '16' and 16.0 are both 16 points
+            return kind(float(value)) if kind is int else kind(value)
+        except (TypeError, ValueError):
+            continue
+    return default
+
+
+def team_record(row):
+    """Compact typed record of one upstream team row"""
+    return {name: _field(row, name, kind, default) for name, kind, default in FIELDS}
+
+
+def normalize(data):
+    """One record per named team, ordered by position (or points then net run rate without one)"""
+    records = [record for record in map(team_record, team_rows(data)) if record['team_name']]
+    if records and all(record['position'] > 0 for record in records):
+        records.sort(key=lambda record: record['position'])
+    else:
+        records.sort(key=lambda record: (-record['points'], -record['nrr']))
+        for position, record in enumerate(records, 1):
+            record['position'] = position
+    return records
+
+
+def make_table(points):
+    standings = json.dumps(points, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    version = hashlib.sha256(standings.encode('utf-8')).hexdigest()[:16]
+    body = json.dumps({'version': version, 'points': points}, separators=(',', ':'), ensure_ascii=False)
+    return PointsTable(points, body.encode('utf-8'), version)
+
+
+def parse(data):
+    """PointsTable of any points-table payload"""
+    return make_table(normalize(data))
+
+
+EMPTY_TABLE = make_table([])
+
+
+def load(path):
+    """(table, source URL, response validators) saved at path; (None, None, {}) if there is none"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None, None, {}
+    if not isinstance(data, dict):
+        return parse(data), None, {}
+    return parse(data), data.get('source'), data.get('validators') or {}
+
+
+def save(path, table, source=None, validators=None):
+    """Atomically write the table, with where it came from so the next fetch can be conditional"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': table.etag, 'source': source, 'validators': validators or {}, 'points': table.points},
+                  f, separators=(',', ':'), ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+class PointsTableFeed(UpstreamFeed):
+    """UpstreamFeed of the points table, whose snapshots are PointsTables"""
+
+    def __init__(self, urls=(API_URL, PROXY_URL), fallback_path=FALLBACK_FILE, interval=300):
+        super().__init__('points table', urls, fallback_path, interval=interval, timeout=10, headers=HEADERS,
+                         transform=parse)
@@ -0,0 +1,175 @@
+"""On-demand sampling profiler for a running worker.
+
+A profile samples the Python stacks of the threads serving requests (optionally only one
+route, or every thread in the process) from the admin request's own thread, for a number of
+seconds or until a number of matching requests have finished, and returns them as collapsed
+stacks: one "outer;...;inner count" line per distinct stack, as flamegraph.pl and speedscope read.
+
+Only one profile runs per process at a time. The sampler stretches its interval whenever
+taking samples would use more than MAX_OVERHEAD of the time, and nothing is recorded (or
+paid beyond one attribute check per request) while no profile is running.
+"""
+import collections
+import math
+import os
+import sys
+import threading
+import time
+
+DEFAULT_INTERVAL = 0.005
+MIN_INTERVAL = 0.001
+MAX_INTERVAL = 1.0
+MAX_SECONDS = 60
+MAX_REQUESTS = 1000
+# Fraction of wall time the sampler thread may spend walking stacks
+MAX_OVERHEAD = 0.05
+MAX_DEPTH = 128
+# Distinct stacks kept; further new stacks are counted under TRUNCATED
+MAX_STACKS = 20000
+TRUNCATED = '[truncated]'
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+def frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collapse(frame, labels):
+    """Outermost-first "a;b;c" of a frame's stack; labels caches one string per code object"""
+    names = []
+    while frame is not None and len(names) < MAX_DEPTH:
+        code = frame.f_code
+        label = labels.get(code)
+        if label is None:
+            label = labels[code] = frame_label(code).replace(';', ':')
+        names.append(label)
+        frame = frame.f_back
+    names.reverse()
+    return ';'.join(names)
+
+
+class Profile:
+    """One profiling run; route None matches every request, max_requests None runs for seconds"""
+
+    def __init__(self, seconds, interval=DEFAULT_INTERVAL, route=None, max_requests=None, all_threads=False):
+        self.seconds = seconds
+        self.interval = interval
+        self.route = route
+        self.max_requests = max_requests
+        self.all_threads = all_threads
+        self.counts = collections.Counter()
+        self.samples = 0
+        self.sampling_time = 0.0
+        self.started_requests = 0
+        self.finished_requests = 0
+        self.elapsed = 0.0
+        self.done = threading.Event()
+        self._threads = set()
+        self._lock = threading.Lock()
+
+    def matches(self, rule):
+        return self.route is None or rule == self.route
+
+    def request_started(self, rule):
+        if not self.matches(rule):
+            return
+        with self._lock:
+            if self.max_requests is not None and self.started_requests >= self.max_requests:
+                return
+            self.started_requests += 1
+            self._threads.add(threading.get_ident())
+
+    def request_finished(self):
+        ident = threading.get_ident()
+        with self._lock:
+            if ident not in self._threads:
+                return
+            self._threads.discard(ident)
+            self.finished_requests += 1
+            if self.max_requests is not None and self.finished_requests >= self.max_requests:
+                self.done.set()
+
+    def sample(self, labels):
+        own = threading.get_ident()
+        with self._lock:
+            threads = None if self.all_threads else set(self._threads)
+        for ident, frame in sys._current_frames().items():
+            if ident == own or (threads is not None and ident not in threads):
+                continue
+            stack = collapse(frame, labels)
+            if stack not in self.counts and len(self.counts) >= MAX_STACKS:
+                stack = TRUNCATED
+            self.counts[stack] += 1
+            self.samples += 1
+
+    def run(self):
+        """Sample until seconds pass or max_requests matching requests have finished"""
+        labels = {}
+        start = time.perf_counter()
+        deadline = start + self.seconds
+        while not self.done.is_set():
+            sample_start = time.perf_counter()
+            if sample_start >= deadline:
+                break
+            self.sample(labels)
+            cost = time.perf_counter() - sample_start
+            self.sampling_time += cost
+            # Keep sampling within MAX_OVERHEAD of wall time however many threads there are
+            self.done.wait(max(self.interval - cost, cost / MAX_OVERHEAD - cost))
+        self.elapsed = time.perf_counter() - start
+        self.done.set()
+
+    def collapsed(self):
+        return ''.join(f"{stack} {count}\n" for stack, count in sorted(self.counts.items()))
+
+    def summary(self):
+        return {
+            'pid': os.getpid(),
+            'seconds': round(self.elapsed, 3),
+            'samples': self.samples,
+            'stacks': len(self.counts),
+            'requests': self.finished_requests,
+            'overhead': round(self.sampling_time / self.elapsed, 4) if self.elapsed else 0.0,
+        }
+
+
+_active = None
+_run_lock = threading.Lock()
+
+
+def request_started(rule):
+    """Called at the start of every request with its route template"""
+    profile = _active
+    if profile is not None:
+        profile.request_started(rule)
+
+
+def request_finished():
+    profile = _active
+    if profile is not None:
+        profile.request_finished()
+
+
+def run(seconds, interval=DEFAULT_INTERVAL, route=None, max_requests=None, all_threads=False):
+    """Profile this process from the calling thread, which is never sampled itself
+
+    Returns the finished Profile; raises ProfilerBusy if another profile is running.
+    """
+    global _active
+    # NaN slips through min/max and would never reach the deadline
+    if not (math.isfinite(seconds) and math.isfinite(interval)):
+        raise ValueError("seconds and interval must be finite")
+    if not _run_lock.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already running in this worker")
+    try:
+        profile = Profile(min(seconds, MAX_SECONDS), min(max(interval, MIN_INTERVAL), MAX_INTERVAL), route,
+                          min(max_requests, MAX_REQUESTS) if max_requests else None, all_threads)
+        _active = profile
+        profile.run()
+        return profile
+    finally:
+        _active = None
+        _run_lock.release()
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict, namedtuple
+import metrics
+
+# body is the serialized summary, etag a strong validator derived from its content
+CachedResult = namedtuple('CachedResult', ['filename', 'body', 'etag'])
+
+
+def _filename_part(name):
+    # Path separators would let a player name escape the spill directory
+    return name.replace(' ', '').replace('/', '-').replace('\\', '-')
+
+
+def result_filename(batter_name, bowler_name):
+    """Name under which a head-to-head summary is published at /results/<filename>"""
+    return f"{_filename_part(batter_name)}_vs_{_filename_part(bowler_name)}.json"
+
+
+def safe_filename(filename):
+    """True if filename names a file directly inside a directory"""
+    return os.path.basename(filename) == filename and filename not in ('', '.', '..')
+
+
+def make_entry(filename, summary):
+    body = json.dumps(summary, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    etag = hashlib.sha256(body).hexdigest()[:32]
+    return CachedResult(filename, body, etag)
+
+
+class ResultCache:
+    """Bounded LRU of head-to-head summaries keyed by (batter, bowler, data version)
+
+    When spill_dir is set, evicted entries are written to spill_dir/<version>/<filename>
+    and read back on a memory miss; directories of older data versions are pruned.
+    """
+
+    def __init__(self, max_entries=4096, spill_dir=None, name='results'):
+        self.name = name
+        self.max_entries = max_entries
+        self.spill_dir = spill_dir
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._by_filename = {}
+        self._spill_version = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_or_compute(self, batter_name, bowler_name, version, compute):
+        """Return the cached entry for the pair, calling compute() on a miss.
+
+        Returns None when compute() finds no data; misses are not cached.
+        """
+        key = (batter_name, bowler_name, version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                metrics.cache_lookup(self.name, True)
+                return entry
+            self.misses += 1
+        metrics.cache_lookup(self.name, False)
+
+        filename = result_filename(batter_name, bowler_name)
+        entry = self._read_spill(version, filename)
+        if entry is None:
+            summary = compute()
+            if summary is None:
+                return None
+            entry = make_entry(filename, summary)
+        self._put(key, entry)
+        return entry
+
+    def get_by_filename(self, filename, version):
+        """Look up a previously computed summary by its published filename"""
+        with self._lock:
+            key = self._by_filename.get((filename, version))
+            entry = self._entries.get(key) if key is not None else None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                metrics.cache_lookup(self.name, True)
+                return entry
+            self.misses += 1
+        metrics.cache_lookup(self.name, False)
+        return self._read_spill(version, filename)
+
+    def _put(self, key, entry):
+        evicted = []
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._by_filename[(entry.filename, key[2])] = key
+            while len(self._entries) > self.max_entries:
+                old_key, old_entry = self._entries.popitem(last=False)
+                self._by_filename.pop((old_entry.filename, old_key[2]), None)
+                evicted.append((old_key[2], old_entry))
+        for version, old_entry in evicted:
+            self._spill(version, old_entry)
+
+    def _spill_path(self, version, filename):
+        return os.path.join(self.spill_dir, version, filename)
+
+    def _spill(self, version, entry):
+        if not self.spill_dir or not safe_filename(entry.filename):
+            return
+        if version != self._spill_version:
+            self._prune_spill(version)
+        path = self._spill_path(version, entry.filename)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(entry.body)
+        os.replace(tmp_path, path)
+
+    def _prune_spill(self, version):
+        """Drop spilled results of every other data version"""
+        if os.path.isdir(self.spill_dir):
+            for name in os.listdir(self.spill_dir):
+                if name != version:
+                    shutil.rmtree(os.path.join(self.spill_dir, name), ignore_errors=True)
+        self._spill_version = version
+
+    def _read_spill(self, version, filename):
+        if not self.spill_dir or not safe_filename(filename):
+            return None
+        try:
+            with open(self._spill_path(version, filename), 'rb') as f:
+                body = f.read()
+        except OSError:
+            metrics.cache_lookup(f'{self.name}_spill', False)
+            return None
+        metrics.cache_lookup(f'{self.name}_spill', True)
+        return CachedResult(filename, body, hashlib.sha256(body).hexdigest()[:32])
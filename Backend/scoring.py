@@ -0,0 +1,155 @@
+"""Vectorized match scoring over the compiled player stats.
+
+Produces exactly the scores of Dream11Predictor's analyze_head_to_head,
+analyze_venue_performance and analyze_recent_form: every term uses the same
+expression, and terms are added per player in the same order.
+"""
+import threading
+import weakref
+from collections import OrderedDict
+import numpy as np
+import metrics
+from player_store import BATTER_H2H_FIELDS, BOWLER_H2H_FIELDS, VENUE_FIELDS
+
+BATTER_COLUMNS = [BATTER_H2H_FIELDS.index(f) for f in ('Strike Rate', 'Average', 'Boundary %', 'Dismissals')]
+BOWLER_COLUMNS = [BOWLER_H2H_FIELDS.index(f) for f in ('Dismissals', 'Econ')]
+# (kind, venue) tables kept per engine, least recently used first out; venues are client strings
+MAX_VENUE_TABLES = 256
+
+
+def _add_terms(total, terms, present):
+    """Add terms column by column, skipping absent ones, to keep the predictor's summation order"""
+    for j in range(terms.shape[1]):
+        total = total + np.where(present[:, j], terms[:, j], 0.0)
+    return total
+
+
+def _add_term(total, term, present):
+    return total + np.where(present, term, 0.0)
+
+
+class ScoringEngine:
+    """Scores a match's players as array expressions over integer player ids"""
+
+    def __init__(self, stats):
+        self.stats = stats
+        self.n_names = len(stats.name_ids)
+        # Sorted (player row, opponent id) keys, so a whole batter x bowler grid is one searchsorted
+        self._h2h_keys = {}
+        for kind in ('batter', 'bowler'):
+            offsets = stats.array(f'{kind}_h2h_offsets')
+            rows = np.repeat(np.arange(len(offsets) - 1, dtype=np.int64), np.diff(offsets))
+            self._h2h_keys[kind] = rows * self.n_names + stats.array(f'{kind}_h2h_opponents')
+        self._venue_tables = OrderedDict()
+        self._venue_lock = threading.Lock()
+
+    def _rows(self, kind, players):
+        index = self.stats.batters if kind == 'batter' else self.stats.bowlers
+        return np.array([index.get(p, -1) for p in players], dtype=np.int64)
+
+    def _name_ids(self, players):
+        return np.array([self.stats.name_ids.get(p, -1) for p in players], dtype=np.int64)
+
+    def _gather_h2h(self, kind, player_rows, opponent_ids):
+        """values[i, j] of player i against opponent j, and where such a record exists"""
+        keys = self._h2h_keys[kind]
+        query = player_rows[:, None] * self.n_names + opponent_ids[None, :]
+        present = (player_rows[:, None] >= 0) & (opponent_ids[None, :] >= 0)
+        if len(keys) == 0:
+            return np.zeros(query.shape + (len(BATTER_H2H_FIELDS if kind == 'batter' else BOWLER_H2H_FIELDS),)), present & False
+        positions = np.minimum(np.searchsorted(keys, query), len(keys) - 1)
+        present &= keys[positions] == query
+        return self.stats.array(f'{kind}_h2h_values')[positions], present
+
+    def head_to_head(self, kind, players, opponents):
+        """Head-to-head field values of each player against each opponent, and where a record exists"""
+        return self._gather_h2h(kind, self._rows(kind, players), self._name_ids(opponents))
+
+    def batting_terms(self, batters, bowlers):
+        """Batting score of each batter against each bowler, and which pairs count"""
+        values, present = self._gather_h2h('batter', self._rows('batter', batters), self._name_ids(bowlers))
+        strike_rate, avg, boundary_pct, dismissals = (values[..., c] for c in BATTER_COLUMNS)
+        return (strike_rate / 100) * 2 + (avg / 10) + (boundary_pct / 10) - (dismissals * 2), present
+
+    def bowling_terms(self, bowlers, batters):
+        """Bowling score of each bowler against each batter, and which pairs count"""
+        values, present = self._gather_h2h('bowler', self._rows('bowler', bowlers), self._name_ids(batters))
+        dismissals, economy = (values[..., c] for c in BOWLER_COLUMNS)
+        return (dismissals * 5) + (10 - np.minimum(economy, 10)), present
+
+    def venue_table(self, kind, venue):
+        """Per-player scoring values from the first venue row matching venue, and which players have one"""
+        key = (kind, venue)
+        with self._venue_lock:
+            table = self._venue_tables.get(key)
+            if table is not None:
+                self._venue_tables.move_to_end(key)
+        metrics.cache_lookup('venue_tables', table is not None)
+        if table is None:
+            ids = self.stats.array(f'{kind}_venue_ids')
+            offsets = self.stats.array(f'{kind}_venue_offsets')
+            values = self.stats.array(f'{kind}_venue_values')
+            hits = np.isin(ids, self.stats.matching_venues(venue))
+            # Position of each hit, with a trailing sentinel so empty player ranges reduce safely
+            positions = np.append(np.where(hits, np.arange(len(ids)), len(ids)), len(ids))
+            first = np.minimum.reduceat(positions, offsets[:-1]) if len(offsets) > 1 else np.zeros(0, dtype=np.int64)
+            found = first < offsets[1:]
+            table = (values[np.minimum(first, max(len(values) - 1, 0))] if len(values) else
+                     np.zeros((len(found), len(VENUE_FIELDS[kind]))), found)
+            with self._venue_lock:
+                self._venue_tables[key] = table
+                while len(self._venue_tables) > MAX_VENUE_TABLES:
+                    self._venue_tables.popitem(last=False)
+        return table
+
+    @metrics.phase('score_match')
+    def score_match(self, venue, team1_players, team2_players):
+        """Return {player: score} for both playing XIs, identical to Dream11Predictor's analysis
+
+        Players are assumed to appear once across both XIs; the predictor falls back to its
+        per-player analysis otherwise.
+        """
+        team_scores = []
+        for players, opponents, batting_first in ((team1_players, team2_players, True),
+                                                  (team2_players, team1_players, False)):
+            total = np.zeros(len(players))
+            batting = self.batting_terms(players, opponents)
+            bowling = self.bowling_terms(players, opponents)
+            # Team 1 is scored as batters first, team 2 as bowlers first
+            for terms, present in ((batting, bowling) if batting_first else (bowling, batting)):
+                total = _add_terms(total, terms, present)
+
+            bat_rows = self._rows('batter', players)
+            bowl_rows = self._rows('bowler', players)
+            values, found = self.venue_table('batter', venue)
+            venue_values = values[bat_rows]
+            total = _add_term(total, (venue_values[:, 0] / 100) + (venue_values[:, 1] / 20), (bat_rows >= 0) & found[bat_rows])
+            values, found = self.venue_table('bowler', venue)
+            venue_values = values[bowl_rows]
+            total = _add_term(total, (venue_values[:, 0] * 3) + (10 - np.minimum(venue_values[:, 1], 10)), (bowl_rows >= 0) & found[bowl_rows])
+
+            form = self.stats.array('batter_form')[bat_rows]
+            has_form = (bat_rows >= 0) & (form[:, -1] != 0)
+            total = _add_term(total, form[:, 0] / 10, has_form & ~np.isnan(form[:, 0]))
+            total = _add_term(total, form[:, 1] / 100, has_form & ~np.isnan(form[:, 1]))
+            form = self.stats.array('bowler_form')[bowl_rows]
+            has_form = (bowl_rows >= 0) & (form[:, -1] != 0)
+            total = _add_term(total, form[:, 0] * 5, has_form & ~np.isnan(form[:, 0]))
+            total = _add_term(total, 10 - np.minimum(form[:, 1], 10), has_form & ~np.isnan(form[:, 1]))
+            team_scores.append(total)
+
+        scores = {}
+        for players, total in zip((team1_players, team2_players), team_scores):
+            scores.update(zip(players, total.tolist()))
+        return scores
+
+
+_engines = weakref.WeakKeyDictionary()
+
+
+def get_engine(stats):
+    """Return the scoring engine for a PlayerStats, built once per store"""
+    engine = _engines.get(stats)
+    if engine is None:
+        engine = _engines[stats] = ScoringEngine(stats)
+    return engine
@@ -0,0 +1,129 @@
+"""Predict fantasy lineups for every upcoming fixture and stream them to a JSONL file.
+
+Run from the Backend directory, e.g. at deploy time:
+
+    python season.py --output Static/public/season_lineups.jsonl --lineups 5
+
+Workers are forked after the predictor is loaded, so the squads and the memory-mapped
+player stats are shared with the parent instead of being pickled for every fixture.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from optimizer import TEAM_SIZE
+from team import BASE_DIR, get_predictor, predict_fantasy_lineups
+
+FIXTURES_PATH = os.path.join(BASE_DIR, 'Static', 'public', 'ipl_matches_2025.json')
+OUTPUT_PATH = os.path.join(BASE_DIR, 'Static', 'public', 'season_lineups.jsonl')
+
+
+def load_fixtures(path, include_current=False):
+    """Fixtures as dicts with game_id, match_name, date, team1, team2 and venue"""
+    with open(path, 'r') as f:
+        schedule = json.load(f)
+
+    matches = list(schedule.get('upcoming_matches', []))
+    if include_current:
+        matches = list(schedule.get('current_matches', [])) + matches
+
+    fixtures = []
+    for match in matches:
+        teams = match.get('teams', [])
+        if len(teams) < 2:
+            continue
+        fixtures.append({
+            'game_id': match.get('game_id'),
+            'match_name': match.get('match_name'),
+            'date': match.get('game_date_time'),
+            'team1': teams[0].get('team_name'),
+            'team2': teams[1].get('team_name'),
+            'venue': match.get('venue', ''),
+        })
+    return fixtures
+
+
+def squad_playing11(predictor, team_name):
+    """The whole squad of a team as "Name(Role)" entries, since the XI is only known at the toss"""
+    squad = predictor.registry.team_players(team_name)
+    if not squad:
+        raise KeyError(f"No squad CSV for {team_name}")
+    return [f"{player.name}({player.role})" for player in squad]
+
+
+def predict_fixture(task):
+    """Worker entry point: predict one fixture with the process's shared predictor"""
+    fixture, count, max_overlap = task
+    start = time.perf_counter()
+    record = dict(fixture)
+    try:
+        predictor = get_predictor()
+        team1_playing11 = squad_playing11(predictor, fixture['team1'])
+        team2_playing11 = squad_playing11(predictor, fixture['team2'])
+        record.update(predict_fantasy_lineups(fixture['team1'], fixture['team2'], fixture['venue'],
+                                              team1_playing11, team2_playing11, count, max_overlap))
+    except Exception as e:
+        record['error'] = str(e)
+    record['seconds'] = round(time.perf_counter() - start, 4)
+    record['worker'] = os.getpid()
+    return record
+
+
+def run_season(fixtures, output_path, count=1, max_overlap=10, workers=None):
+    """Predict every fixture across a process pool, writing each record as soon as it is ready"""
+    # Load before forking so the workers inherit the predictor
+    get_predictor()
+
+    context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+    workers = workers or os.cpu_count() or 1
+    tasks = [(fixture, count, max_overlap) for fixture in fixtures]
+    failed = 0
+
+    with open(output_path, 'w') as f:
+        if workers == 1:
+            records = map(predict_fixture, tasks)
+            pool = None
+        else:
+            pool = context.Pool(min(workers, max(len(tasks), 1)))
+            records = pool.imap_unordered(predict_fixture, tasks)
+        try:
+            for record in records:
+                f.write(json.dumps(record) + '\n')
+                f.flush()
+                if 'error' in record:
+                    failed += 1
+                    print(f"{record['match_name']}: {record['error']}", file=sys.stderr)
+                else:
+                    print(f"{record['match_name']}: {record['team1']} vs {record['team2']} "
+                          f"({len(record['lineups'])} lineups, {record['seconds']:.3f}s)")
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fixtures', default=FIXTURES_PATH)
+    parser.add_argument('--output', default=OUTPUT_PATH)
+    parser.add_argument('--lineups', type=int, default=1, help="distinct lineups per fixture")
+    parser.add_argument('--max-overlap', type=int, default=10)
+    parser.add_argument('--workers', type=int, default=None, help="defaults to the number of CPUs")
+    parser.add_argument('--include-current', action='store_true', help="also predict matches in progress")
+    args = parser.parse_args()
+    if not 0 <= args.max_overlap <= TEAM_SIZE - 1:
+        parser.error(f"--max-overlap must be between 0 and {TEAM_SIZE - 1}")
+
+    fixtures = load_fixtures(args.fixtures, args.include_current)
+    start = time.perf_counter()
+    failed = run_season(fixtures, args.output, args.lineups, args.max_overlap, args.workers)
+    print(f"Predicted {len(fixtures) - failed}/{len(fixtures)} fixtures in {time.perf_counter() - start:.2f}s "
+          f"-> {args.output}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
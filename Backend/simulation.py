@@ -0,0 +1,363 @@
+"""Monte Carlo match simulation: per-player fantasy-point distributions for a fixture.
+
+Every ball's outcome (dot, 1, 2, 3, 4, 6 or wicket) is drawn from the batter-vs-bowler
+frequencies in the compiled head-to-head stats, shrunk towards the batter's and bowler's
+overall profiles when the pair has faced few balls. Both innings are simulated ball by ball
+for a whole batch of matches at once as NumPy arrays, and batches run across a process pool.
+
+    python simulation.py "Mumbai Indians" "Chennai Super Kings" --simulations 10000
+
+Not modelled: extras, fielding points and dismissal types, and the venue.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+import weakref
+import numpy as np
+import metrics
+from player_store import BATTER_H2H_FIELDS
+from scoring import get_engine
+
+# Ball outcomes, in the order of every probability table
+OUTCOMES = ['0', '1', '2', '3', '4', '6', 'W']
+RUNS = np.array([0, 1, 2, 3, 4, 6, 0])
+WICKET = OUTCOMES.index('W')
+# Head-to-head counts of each outcome; dismissals are also counted among the dot balls
+OUTCOME_FIELDS = [BATTER_H2H_FIELDS.index(f) for f in ('Dot Balls', '1s', '2s', '3s', '4s', '6s', 'Dismissals')]
+# Balls of the batter's and bowler's overall profile a pair's own record is blended with
+PRIOR_BALLS = 30
+
+OVERS = 20
+MAX_OVERS_PER_BOWLER = 4
+MIN_BOWLERS = OVERS // MAX_OVERS_PER_BOWLER
+MAX_BOWLERS = 6
+BATTING_ORDER = 11
+
+# Fantasy points (T20); only the highest milestone or haul bonus applies
+POINTS_PLAYING = 4
+POINTS_RUN = 1
+POINTS_FOUR_BONUS = 1
+POINTS_SIX_BONUS = 2
+POINTS_RUN_MILESTONES = [(100, 16), (50, 8), (30, 4)]
+POINTS_DUCK = -2
+POINTS_WICKET = 25
+POINTS_HAUL_BONUS = [(5, 16), (4, 8), (3, 4)]
+POINTS_MAIDEN = 12
+# (lowest strike rate, points) over at least 10 balls, and (highest economy, points) over at least 2 overs
+STRIKE_RATE_MIN_BALLS = 10
+STRIKE_RATE_POINTS = [(70, 0), (60, -2), (50, -4), (0, -6)]
+ECONOMY_MIN_BALLS = 12
+ECONOMY_POINTS = [(5, 6), (6, 4), (7, 2), (10, 0), (11, -2), (12, -4), (np.inf, -6)]
+
+DEFAULT_SIMULATIONS = 10000
+BATCH_SIZE = 2500
+
+
+class OutcomeModel:
+    """Ball-outcome probabilities for any batter and bowler from the compiled head-to-head stats"""
+
+    def __init__(self, stats):
+        self.stats = stats
+        offsets = stats.array('batter_h2h_offsets')
+        counts = stats.array('batter_h2h_values')[:, OUTCOME_FIELDS].astype(np.float64)
+        counts = np.nan_to_num(np.maximum(counts, 0))
+        counts[:, 0] = np.maximum(counts[:, 0] - counts[:, WICKET], 0)
+
+        self.league = self._normalize(counts.sum(axis=0))
+        # Every batter's record against everyone, and every bowler's against everyone
+        if len(counts):
+            batter_counts = np.add.reduceat(counts, np.minimum(offsets[:-1], len(counts) - 1), axis=0)
+            batter_counts[np.diff(offsets) == 0] = 0
+        else:
+            batter_counts = np.zeros((len(offsets) - 1, len(OUTCOMES)))
+        bowler_counts = np.zeros((len(stats.name_ids), len(OUTCOMES)))
+        np.add.at(bowler_counts, stats.array('batter_h2h_opponents'), counts)
+        self.batter_profiles = self._shrink(batter_counts, self.league)
+        self.bowler_profiles = self._shrink(bowler_counts, self.league)
+
+    @staticmethod
+    def _normalize(counts):
+        total = counts.sum(axis=-1, keepdims=True)
+        return np.divide(counts, total, out=np.full(counts.shape, 1 / counts.shape[-1]), where=total > 0)
+
+    @staticmethod
+    def _shrink(counts, prior, balls=PRIOR_BALLS):
+        return (counts + balls * prior) / (counts.sum(axis=-1, keepdims=True) + balls)
+
+    def probabilities(self, batters, bowlers):
+        """[batter, bowler, outcome] probabilities for every batter against every bowler"""
+        batter_rows = np.array([self.stats.batters.get(b, -1) for b in batters], dtype=np.int64)
+        bowler_ids = np.array([self.stats.name_ids.get(b, -1) for b in bowlers], dtype=np.int64)
+        batter_prior = np.where((batter_rows >= 0)[:, None], self.batter_profiles[batter_rows], self.league)
+        bowler_prior = np.where((bowler_ids >= 0)[:, None], self.bowler_profiles[bowler_ids], self.league)
+        # Odds-ratio combination of the two profiles relative to the league
+        prior = self._normalize(batter_prior[:, None, :] * bowler_prior[None, :, :] / np.maximum(self.league, 1e-9))
+
+        values, present = get_engine(self.stats).head_to_head('batter', batters, bowlers)
+        counts = np.nan_to_num(np.maximum(values[..., OUTCOME_FIELDS], 0)) * present[..., None]
+        counts[..., 0] = np.maximum(counts[..., 0] - counts[..., WICKET], 0)
+        return self._shrink(counts, prior)
+
+
+_models = weakref.WeakKeyDictionary()
+
+
+def get_model(stats):
+    """Return the outcome model for a PlayerStats, built once per store"""
+    model = _models.get(stats)
+    if model is None:
+        model = _models[stats] = OutcomeModel(stats)
+    return model
+
+
+def bowling_options(players):
+    """Bowlers of a side as indexes into players: its bowlers and all-rounders, topped up from the tail of the order"""
+    chosen = [i for i, (_, category) in enumerate(players) if category in ('bowlers', 'all_rounders')][:MAX_BOWLERS]
+    for i in reversed(range(len(players))):
+        if len(chosen) >= MIN_BOWLERS:
+            break
+        if i not in chosen:
+            chosen.append(i)
+    return chosen
+
+
+def innings_table(model, batting, bowling):
+    """Cumulative outcome probabilities and over-by-over bowlers for one side batting against the other"""
+    batters = [name for name, _ in batting[:BATTING_ORDER]]
+    bowlers = bowling_options(bowling)
+    probabilities = model.probabilities(batters, [bowling[i][0] for i in bowlers])
+    cumulative = np.cumsum(probabilities, axis=-1)
+    cumulative[..., -1] = 1.0
+    # Spare row for the batter who would come in after the last wicket
+    cumulative = np.concatenate([cumulative, cumulative[-1:]])
+    over_bowlers = np.array([over % len(bowlers) for over in range(OVERS)])
+    return {'cumulative': cumulative, 'bowlers': np.array(bowlers), 'over_bowlers': over_bowlers}
+
+
+def simulate_innings(table, rng, n, target=None):
+    """Simulate n innings at once; returns per-batter and per-bowler tallies as [n, player] arrays"""
+    cumulative, over_bowlers = table['cumulative'], table['over_bowlers']
+    n_batters, n_bowlers = cumulative.shape[0] - 1, cumulative.shape[1]
+    max_wickets = n_batters - 1
+    sims = np.arange(n)
+
+    runs = np.zeros((n, n_batters + 1), dtype=np.int32)
+    balls = np.zeros((n, n_batters + 1), dtype=np.int32)
+    fours = np.zeros((n, n_batters + 1), dtype=np.int32)
+    sixes = np.zeros((n, n_batters + 1), dtype=np.int32)
+    out = np.zeros((n, n_batters + 1), dtype=bool)
+    wickets_taken = np.zeros((n, n_bowlers), dtype=np.int32)
+    runs_conceded = np.zeros((n, n_bowlers), dtype=np.int32)
+    balls_bowled = np.zeros((n, n_bowlers), dtype=np.int32)
+    maidens = np.zeros((n, n_bowlers), dtype=np.int32)
+
+    striker = np.zeros(n, dtype=np.int64)
+    non_striker = np.ones(n, dtype=np.int64)
+    next_batter = np.full(n, 2, dtype=np.int64)
+    wickets = np.zeros(n, dtype=np.int32)
+    total = np.zeros(n, dtype=np.int32)
+    active = np.ones(n, dtype=bool)
+
+    for over in range(OVERS):
+        bowler = over_bowlers[over]
+        over_table = cumulative[:, bowler, :]
+        over_runs = np.zeros(n, dtype=np.int32)
+        over_balls = np.zeros(n, dtype=np.int32)
+        for _ in range(6):
+            outcome = (rng.random(n)[:, None] > over_table[striker]).sum(axis=1)
+            scored = RUNS[outcome] * active
+            wicket = (outcome == WICKET) & active
+
+            runs[sims, striker] += scored
+            balls[sims, striker] += active
+            fours[sims, striker] += scored == 4
+            sixes[sims, striker] += scored == 6
+            out[sims, striker] |= wicket
+            total += scored
+            over_runs += scored
+            over_balls += active
+            wickets += wicket
+
+            striker = np.where(wicket, next_batter, striker)
+            next_batter += wicket
+            swap = scored % 2 == 1
+            striker, non_striker = np.where(swap, non_striker, striker), np.where(swap, striker, non_striker)
+
+            wickets_taken[:, bowler] += wicket
+            active &= wickets < max_wickets
+            if target is not None:
+                active &= total <= target
+            if not active.any():
+                break
+        runs_conceded[:, bowler] += over_runs
+        balls_bowled[:, bowler] += over_balls
+        maidens[:, bowler] += (over_balls == 6) & (over_runs == 0)
+        striker, non_striker = non_striker, striker
+        if not active.any():
+            break
+
+    return {
+        'total': total, 'runs': runs[:, :-1], 'balls': balls[:, :-1], 'fours': fours[:, :-1],
+        'sixes': sixes[:, :-1], 'out': out[:, :-1], 'wickets': wickets_taken, 'conceded': runs_conceded,
+        'balls_bowled': balls_bowled, 'maidens': maidens,
+    }
+
+
+def _banded(values, bands, default=0):
+    """Points of the first (threshold, points) band values reach, where bands are in descending threshold order"""
+    return np.select([values >= threshold for threshold, _ in bands], [points for _, points in bands], default)
+
+
+def batting_points(innings):
+    runs, balls = innings['runs'], innings['balls']
+    points = runs * POINTS_RUN + innings['fours'] * POINTS_FOUR_BONUS + innings['sixes'] * POINTS_SIX_BONUS
+    points = points + _banded(runs, POINTS_RUN_MILESTONES)
+    points = points + np.where(innings['out'] & (runs == 0), POINTS_DUCK, 0)
+    strike_rate = np.divide(runs * 100.0, balls, out=np.zeros(runs.shape), where=balls > 0)
+    return points + np.where(balls >= STRIKE_RATE_MIN_BALLS, _banded(strike_rate, STRIKE_RATE_POINTS), 0)
+
+
+def bowling_points(innings):
+    wickets, balls = innings['wickets'], innings['balls_bowled']
+    points = wickets * POINTS_WICKET + _banded(wickets, POINTS_HAUL_BONUS) + innings['maidens'] * POINTS_MAIDEN
+    economy = np.divide(innings['conceded'] * 6.0, balls, out=np.zeros(wickets.shape), where=balls > 0)
+    # First band whose upper limit the economy is below
+    economy_points = np.select([economy < limit for limit, _ in ECONOMY_POINTS], [p for _, p in ECONOMY_POINTS])
+    return points + np.where(balls >= ECONOMY_MIN_BALLS, economy_points, 0)
+
+
+def simulate_batch(task):
+    """Worker entry point: fantasy points of every player in n simulated matches, as [n, players]
+
+    The first half of the batch has team 1 batting first, the second half team 2.
+    """
+    tables, n_players, n, seed = task
+    rng = np.random.default_rng(seed)
+    points = np.full((n, sum(n_players)), POINTS_PLAYING, dtype=np.float64)
+    offsets = (0, n_players[0])
+    halves = [(0, n // 2, (0, 1)), (n // 2, n, (1, 0))]
+    for start, stop, (first, second) in halves:
+        if stop == start:
+            continue
+        target = None
+        for side in (first, second):
+            other = 1 - side
+            innings = simulate_innings(tables[side], rng, stop - start, target)
+            target = innings['total']
+            batted = batting_points(innings)
+            points[start:stop, offsets[side]:offsets[side] + batted.shape[1]] += batted
+            bowlers = offsets[other] + tables[side]['bowlers']
+            points[start:stop, bowlers] += bowling_points(innings)
+    return points
+
+
+class MatchSimulation:
+    """Simulated fantasy points of every player in a fixture, one row per simulated match"""
+
+    def __init__(self, players, points):
+        self.players = players
+        self.points = points
+        self._summary = None
+
+    def summary(self):
+        """{player: mean, std, p10, p50, p90 and p_top, the chance of being the match's top scorer}"""
+        if self._summary is None:
+            points = self.points
+            top = points == points.max(axis=1, keepdims=True)
+            p_top = (top / top.sum(axis=1, keepdims=True)).mean(axis=0)
+            percentiles = np.percentile(points, [10, 50, 90], axis=0)
+            self._summary = {
+                player: {
+                    'mean': round(float(points[:, i].mean()), 2),
+                    'std': round(float(points[:, i].std()), 2),
+                    'p10': round(float(percentiles[0, i]), 2),
+                    'p50': round(float(percentiles[1, i]), 2),
+                    'p90': round(float(percentiles[2, i]), 2),
+                    'p_top': round(float(p_top[i]), 4),
+                }
+                for i, player in enumerate(self.players)
+            }
+        return self._summary
+
+
+@metrics.phase('simulation')
+def simulate_match(stats, team1, team2, simulations=DEFAULT_SIMULATIONS, workers=1, seed=None, batch_size=BATCH_SIZE):
+    """Simulate a fixture between two XIs given as [(name, category)] in batting order
+
+    Batches of batch_size matches run on a forked process pool when workers > 1; the same
+    seed gives the same result for any number of workers.
+    """
+    model = get_model(stats)
+    team1, team2 = list(team1)[:BATTING_ORDER], list(team2)[:BATTING_ORDER]
+    tables = (innings_table(model, team1, team2), innings_table(model, team2, team1))
+    n_players = (len(team1), len(team2))
+    sizes = [min(batch_size, simulations - start) for start in range(0, simulations, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(tables, n_players, size, child) for size, child in zip(sizes, seeds)]
+
+    if workers <= 1 or len(tasks) == 1:
+        batches = list(map(simulate_batch, tasks))
+    else:
+        context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+        with context.Pool(min(workers, len(tasks))) as pool:
+            batches = pool.map(simulate_batch, tasks)
+    points = np.concatenate(batches) if batches else np.zeros((0, sum(n_players)))
+    return MatchSimulation([name for name, _ in team1 + team2], points)
+
+
+CAPTAIN_STRATEGIES = {
+    # Head-to-head contests: the most expected points
+    'mean': lambda stats: stats['mean'],
+    # Tournaments: the best chance of the match's top score, then the highest ceiling
+    'upside': lambda stats: (stats['p_top'], stats['p90']),
+}
+
+
+def choose_captains(players, summary, strategy='mean'):
+    """(captain, vice_captain) among players ranked by strategy on their simulated points"""
+    key = CAPTAIN_STRATEGIES[strategy]
+    ranked = sorted((p for p in players if p in summary), key=lambda p: key(summary[p]), reverse=True)
+    if len(ranked) < 2:
+        return None, None
+    return ranked[0], ranked[1]
+
+
+def main():
+    from team import get_predictor
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('team1')
+    parser.add_argument('team2')
+    parser.add_argument('--simulations', type=int, default=DEFAULT_SIMULATIONS)
+    parser.add_argument('--workers', type=int, default=None, help="defaults to the number of CPUs")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    predictor = get_predictor().session()
+    sides = []
+    for team in (args.team1, args.team2):
+        squad = predictor.registry.team_players(team)
+        if not squad:
+            print(f"No squad CSV for {team}", file=sys.stderr)
+            return 1
+        predictor.set_player_roles([f"{p.name}({p.role})" for p in squad])
+        sides.append([(p.name, predictor.player_category(p.name)) for p in squad][:BATTING_ORDER])
+
+    start = time.perf_counter()
+    simulation = simulate_match(predictor.stats, sides[0], sides[1], args.simulations,
+                                args.workers or os.cpu_count() or 1, args.seed)
+    elapsed = time.perf_counter() - start
+    summary = simulation.summary()
+    for player, stats in sorted(summary.items(), key=lambda item: -item[1]['mean']):
+        print(f"{player:28} mean {stats['mean']:6.1f}  p10 {stats['p10']:6.1f}  p50 {stats['p50']:6.1f}  "
+              f"p90 {stats['p90']:6.1f}  top {stats['p_top'] * 100:5.1f}%")
+    for strategy in CAPTAIN_STRATEGIES:
+        captain, vice_captain = choose_captains(simulation.players, summary, strategy)
+        print(f"{strategy} captain: {captain}, vice-captain: {vice_captain}")
+    print(f"{args.simulations} simulations in {elapsed:.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,72 +1,71 @@
+import copy
 import json
-import pandas as pd
 import numpy as np
 import os
+import threading
 from collections import defaultdict
 import argparse
+from player_registry import get_registry
+from player_store import load_player_stats
+from scoring import get_engine
+from optimizer import MAX_SEARCH_NODES, Candidate, optimize_team, search_lineups
+from simulation import DEFAULT_SIMULATIONS, choose_captains, simulate_match
+import metrics
+
+# Bundled data used by the long-lived predictor behind /api/fantasy_team
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BATTER_DATA_PATH = os.path.join(BASE_DIR, 'Static', 'public', 'batter_data_cache.json')
+BOWLER_DATA_PATH = os.path.join(BASE_DIR, 'Static', 'public', 'bowler_data_cache.json')
+TEAMS_FOLDER_PATH = os.path.join(BASE_DIR, 'Teams')
+# Venue and recent-form aggregates kept by ingest.py; used once the file exists
+AGGREGATES_PATH = os.path.join(BASE_DIR, 'player_aggregates.json')
 
 class Dream11Predictor:
-    def __init__(self, batter_data_path, bowler_data_path, teams_folder_path):
-        # Load data from JSON files
-        with open(batter_data_path, 'r') as f:
-            self.batter_data = json.load(f)
-        
-        with open(bowler_data_path, 'r') as f:
-            self.bowler_data = json.load(f)
+    def __init__(self, batter_data_path, bowler_data_path, teams_folder_path, aggregates_path=AGGREGATES_PATH):
+        self.batter_data_path = batter_data_path
+        self.bowler_data_path = bowler_data_path
+        self.aggregates_path = aggregates_path
+        self.load_player_stats()
         
-        # Load team data from CSV files
-        self.teams_data = {}
-        self.load_teams_data(teams_folder_path)
+        # Squad players from the CSV files, indexed by every known form of their name
+        self.registry = get_registry(teams_folder_path)
         
+        self.reset_match_state()
+    
+    @metrics.phase('load_stats')
+    def load_player_stats(self):
+        """Memory-map the compiled player stats (recompiled from the JSON files and aggregates when they change)"""
+        self.stats = load_player_stats(self.batter_data_path, self.bowler_data_path,
+                                       aggregates_path=self.aggregates_path)
+        
+        # Player name -> row in the compiled store, used for membership checks
+        self.batter_data = self.stats.batters
+        self.bowler_data = self.stats.bowlers
+    
+    def reset_match_state(self):
+        """Clear the per-match scoring state"""
         self.player_scores = {}
         self.selected_team = []
         self.player_roles = {}
         self.player_credits = {}
         self.player_is_foreign = {}
     
-    def load_teams_data(self, teams_folder_path):
-        """Load all team data from CSV files in the Teams folder"""
-        for filename in os.listdir(teams_folder_path):
-            if filename.endswith('_squad.csv'):
-                team_name = filename.replace('_squad.csv', '').replace('-', ' ').title()
-                file_path = os.path.join(teams_folder_path, filename)
-                try:
-                    team_df = pd.read_csv(file_path)
-                    self.teams_data[team_name] = team_df
-                except Exception as e:
-                    print(f"Error loading {filename}: {e}")
+    def session(self):
+        """Return a predictor sharing this one's loaded data but with its own per-match state
+        
+        The loaded stats and squads are never mutated, so one predictor can serve concurrent
+        requests as long as each prediction runs on its own session.
+        """
+        session = copy.copy(self)
+        session.load_player_stats()
+        session.reset_match_state()
+        return session
     
     def get_player_info_from_csv(self, player_name):
-        """Find player information in the CSV data"""
-        for team_name, team_df in self.teams_data.items():
-            # Try exact match first
-            player_row = team_df[team_df['Name'] == player_name]
-            
-            # If not found, try partial match
-            if player_row.empty:
-                player_row = team_df[team_df['Name'].str.contains(player_name, case=False, na=False)]
-            
-            if not player_row.empty:
-                # Return the first match
-                player_info = player_row.iloc[0]
-                
-                # Check different possible credit column names
-                credit_value = 7.0  # Default value
-                for credit_col in ['Credits', 'credits', 'Credit']:
-                    if credit_col in player_info and not pd.isna(player_info[credit_col]):
-                        credit_value = float(player_info[credit_col])
-                        break
-                
-                return {
-                    'role': player_info['Role'],
-                    'credits': credit_value,
-                    'foreign': player_info.get('Foreign Player', False) == True,
-                    'team': team_name
-                }
-        
-        # If player not found in any team
-        return None
+        """Find player information in the squad CSVs through the shared player registry"""
+        return self.registry.player_info(player_name)
     
+    @metrics.phase('set_roles')
     def set_player_roles(self, players_with_roles):
         """Set player roles from the provided list and update with CSV data"""
         for player_info in players_with_roles:
@@ -97,6 +96,7 @@ class Dream11Predictor:
                 self.player_credits[player_name] = 7.0  # Default credit value
                 self.player_is_foreign[player_name] = False  # Default to Indian player
     
+    @metrics.phase('head_to_head')
     def analyze_head_to_head(self, team1_players, team2_players):
         """Analyze head-to-head performance between players of two teams"""
         for batter in team1_players:
@@ -106,27 +106,19 @@ class Dream11Predictor:
             if batter in self.batter_data:
                 # Analyze batter's performance against team2 bowlers
                 for bowler in team2_players:
-                    if bowler in self.batter_data[batter].get('head_to_head', {}):
-                        h2h_data = self.batter_data[batter]['head_to_head'][bowler]
-                        
-                        # If there's a list of encounters, take the first one
-                        if isinstance(h2h_data, list) and len(h2h_data) > 0:
-                            h2h_data = h2h_data[0]
+                    h2h_data = self.stats.batter_head_to_head(batter, bowler)
+                    
+                    # Skip if no usable data
+                    if h2h_data is not None:
+                        # Calculate batting score based on strike rate, average, and boundary %
+                        strike_rate = h2h_data['Strike Rate']
+                        avg = h2h_data['Average']
+                        boundary_pct = h2h_data['Boundary %']
+                        dismissals = h2h_data['Dismissals']
                         
-                        # Skip if no data or message indicates no data
-                        if isinstance(h2h_data, dict) and 'Message' not in h2h_data:
-                            # Calculate batting score based on strike rate, average, and boundary %
-                            try:
-                                strike_rate = h2h_data.get('Strike Rate', 0)
-                                avg = h2h_data.get('Average', 0)
-                                boundary_pct = h2h_data.get('Boundary %', 0)
-                                dismissals = h2h_data.get('Dismissals', 0)
-                                
-                                # Higher score for better performance against this bowler
-                                batting_score = (strike_rate / 100) * 2 + (avg / 10) + (boundary_pct / 10) - (dismissals * 2)
-                                self.player_scores[batter] += batting_score
-                            except (TypeError, ValueError):
-                                pass
+                        # Higher score for better performance against this bowler
+                        batting_score = (strike_rate / 100) * 2 + (avg / 10) + (boundary_pct / 10) - (dismissals * 2)
+                        self.player_scores[batter] += batting_score
         
         for bowler in team2_players:
             if bowler not in self.player_scores:
@@ -135,112 +127,71 @@ class Dream11Predictor:
             if bowler in self.bowler_data:
                 # Analyze bowler's performance against team1 batters
                 for batter in team1_players:
-                    if batter in self.bowler_data[bowler].get('head_to_head', {}):
-                        h2h_data = self.bowler_data[bowler]['head_to_head'][batter]
+                    h2h_data = self.stats.bowler_head_to_head(bowler, batter)
+                    
+                    # Skip if no usable data
+                    if h2h_data is not None:
+                        # Calculate bowling score based on economy and wickets
+                        dismissals = h2h_data['Dismissals']
+                        economy = h2h_data['Econ']
                         
-                        # Skip if no data
-                        if isinstance(h2h_data, dict):
-                            # Calculate bowling score based on economy and wickets
-                            try:
-                                dismissals = float(h2h_data.get('Dismissals', 0))
-                                economy = float(h2h_data.get('Econ', 15))  # Default high economy if not available
-                                
-                                # Higher score for more wickets and lower economy
-                                bowling_score = (dismissals * 5) + (10 - min(economy, 10))
-                                self.player_scores[bowler] += bowling_score
-                            except (TypeError, ValueError):
-                                pass
+                        # Higher score for more wickets and lower economy
+                        bowling_score = (dismissals * 5) + (10 - min(economy, 10))
+                        self.player_scores[bowler] += bowling_score
     
+    @metrics.phase('venue')
     def analyze_venue_performance(self, venue, players):
         """Analyze players' performance at the given venue"""
         for player in players:
             if player not in self.player_scores:
                 self.player_scores[player] = 0
             
-            # Check batter venue stats
-            if player in self.batter_data:
-                venue_data = self.batter_data[player].get('venue', {})
-                if venue_data and 'Batting' in venue_data:
-                    # Parse the venue data (it's in string format in your JSON)
-                    try:
-                        venue_df = pd.read_csv(pd.StringIO(venue_data['Batting']), sep=r'\s{2,}', engine='python')
-                        
-                        # Find this venue's data
-                        venue_row = venue_df[venue_df['venue'].str.contains(venue, case=False, na=False)]                        
-                        if not venue_row.empty:
-                            # Add venue-specific batting score
-                            strike_rate = venue_row['Strike_Rate'].values[0] if 'Strike_Rate' in venue_row else 0
-                            avg = venue_row['Average'].values[0] if 'Average' in venue_row else 0
-                            
-                            venue_score = (strike_rate / 100) + (avg / 20)
-                            self.player_scores[player] += venue_score
-                    except Exception:
-                        pass
+            # Check batter venue stats (venue tables are parsed when the stats are compiled)
+            venue_stats = self.stats.venue_record('batter', player, venue)
+            if venue_stats is not None:
+                # Add venue-specific batting score
+                strike_rate = venue_stats['Strike_Rate']
+                avg = venue_stats['Average']
+                
+                venue_score = (strike_rate / 100) + (avg / 20)
+                self.player_scores[player] += venue_score
             
             # Check bowler venue stats
-            if player in self.bowler_data:
-                venue_data = self.bowler_data[player].get('venue', {})
-                if venue_data and 'Bowling' in venue_data:
-                    try:
-                        venue_df = pd.read_csv(pd.StringIO(venue_data['Bowling']), sep=r'\s{2,}', engine='python')
-                        
-                        # Find this venue's data
-                        venue_row = venue_df[venue_df['venue'].str.contains(venue, case=False, na=False)]
-                        if not venue_row.empty:
-                            # Add venue-specific bowling score
-                            wickets = venue_row['Wickets'].values[0] if 'Wickets' in venue_row else 0
-                            economy = venue_row['Economy'].values[0] if 'Economy' in venue_row else 15
-                            
-                            venue_score = (wickets * 3) + (10 - min(economy, 10))
-                            self.player_scores[player] += venue_score
-                    except Exception:
-                        pass
+            venue_stats = self.stats.venue_record('bowler', player, venue)
+            if venue_stats is not None:
+                # Add venue-specific bowling score
+                wickets = venue_stats['Wickets']
+                economy = venue_stats['Economy']
+                
+                venue_score = (wickets * 3) + (10 - min(economy, 10))
+                self.player_scores[player] += venue_score
     
+    @metrics.phase('form')
     def analyze_recent_form(self, players):
         """Analyze players' recent form based on last 5 matches"""
         for player in players:
             if player not in self.player_scores:
                 self.player_scores[player] = 0
             
-            # Check batter recent form
-            if player in self.batter_data and 'recent_form' in self.batter_data[player]:
-                recent_form = self.batter_data[player]['recent_form']
+            # Check batter recent form (averages are precomputed, NaN if a column is missing)
+            form = self.stats.recent_form('batter', player)
+            if form is not None:
+                # Average runs and strike rate from last 5 matches
+                if not np.isnan(form['Runs']):
+                    self.player_scores[player] += form['Runs'] / 10
                 
-                for form_data in recent_form:
-                    if len(form_data) >= 2 and form_data[0] == 'Batting Match-wise':
-                        try:
-                            form_df = pd.read_csv(pd.StringIO(form_data[1]), sep=r'\s{2,}', engine='python')
-                            
-                            # Calculate average runs and strike rate from last 5 matches
-                            if 'Runs' in form_df.columns:
-                                avg_runs = form_df['Runs'].mean()
-                                self.player_scores[player] += avg_runs / 10
-                            
-                            if 'Strike Rate' in form_df.columns:
-                                avg_sr = form_df['Strike Rate'].mean()
-                                self.player_scores[player] += avg_sr / 100
-                        except Exception:
-                            pass
+                if not np.isnan(form['Strike Rate']):
+                    self.player_scores[player] += form['Strike Rate'] / 100
             
             # Check bowler recent form
-            if player in self.bowler_data and 'recent_form' in self.bowler_data[player]:
-                recent_form = self.bowler_data[player]['recent_form']
+            form = self.stats.recent_form('bowler', player)
+            if form is not None:
+                # Average wickets and economy from last 5 matches
+                if not np.isnan(form['Wickets']):
+                    self.player_scores[player] += form['Wickets'] * 5
                 
-                for form_data in recent_form:
-                    if len(form_data) >= 2 and form_data[0] == 'Bowling Match-wise':
-                        try:
-                            form_df = pd.read_csv(pd.StringIO(form_data[1]), sep=r'\s{2,}', engine='python')
-                            
-                            # Calculate average wickets and economy from last 5 matches
-                            if 'Wickets' in form_df.columns:
-                                avg_wickets = form_df['Wickets'].mean()
-                                self.player_scores[player] += avg_wickets * 5
-                            
-                            if 'Economy' in form_df.columns:
-                                avg_economy = form_df['Economy'].mean()
-                                self.player_scores[player] += (10 - min(avg_economy, 10))
-                        except Exception:
-                            pass
+                if not np.isnan(form['Economy']):
+                    self.player_scores[player] += (10 - min(form['Economy'], 10))
     
     def categorize_players(self, sorted_players):
         """Categorize players based on their roles"""
@@ -312,8 +263,53 @@ class Dream11Predictor:
         
         return selected_players, total_credits, foreign_count
     
+    def player_category(self, player):
+        """Selection category of a player based on their role"""
+        role = self.player_roles.get(player, "Unknown")
+        if "WK" in role:
+            return 'wicket_keepers'
+        elif "Bowler" in role:
+            return 'bowlers'
+        elif "All-Rounder" in role or "Allrounder" in role or "All-rounder" in role or "All Rounder" in role:
+            return 'all_rounders'
+        elif "Batter" in role or "Batsman" in role:
+            return 'batsmen'
+        # Fallback logic
+        if player in self.batter_data and player not in self.bowler_data:
+            if player in ['MS Dhoni', 'Rishabh Pant', 'KL Rahul', 'Sanju Samson', 'Ishan Kishan', 'Nicholas Pooran', 'Josh Inglis', 'Prabhsimran Singh']:
+                return 'wicket_keepers'
+            return 'batsmen'
+        elif player in self.bowler_data and player not in self.batter_data:
+            return 'bowlers'
+        return 'all_rounders'
+    
+    def candidate_pool(self):
+        """Scored players with the credits, foreign status and category the optimizer needs"""
+        return [
+            Candidate(player, score, self.player_credits.get(player, 7.0),
+                      self.player_is_foreign.get(player, False), self.player_category(player))
+            for player, score in self.player_scores.items()
+        ]
+    
+    @metrics.phase('selection')
     def select_dream11_team(self):
-        """Select the best Dream11 team based on player scores with flexible constraints"""
+        """Select the highest-scoring Dream11 team that satisfies every selection rule"""
+        result = optimize_team(self.candidate_pool())
+        if result is None:
+            # No full XI satisfies the rules; fall back to the best partial greedy team
+            return self.select_dream11_team_greedy()
+        
+        team, captain, vice_captain, total_credits, foreign_count = result
+        self.selected_team = team
+        return team, captain, vice_captain, total_credits, foreign_count
+    
+    @metrics.phase('lineup_selection')
+    def select_lineups(self, count, max_overlap=10, max_nodes=MAX_SEARCH_NODES):
+        """Select up to count best distinct teams sharing at most max_overlap players pairwise (a LineupSearch)"""
+        return search_lineups(self.candidate_pool(), count, max_overlap=max_overlap, max_nodes=max_nodes)
+    
+    def select_dream11_team_greedy(self):
+        """Select a Dream11 team greedily based on player scores with flexible constraints"""
         # Sort players by score
         sorted_players = sorted(self.player_scores.items(), key=lambda x: x[1], reverse=True)
         
@@ -424,6 +420,33 @@ class Dream11Predictor:
     
     def predict_dream11(self, team1, team2, venue, team1_playing11, team2_playing11):
         """Main function to predict Dream11 team for a match with specific playing XI"""
+        self.score_players(venue, team1_playing11, team2_playing11)
+        
+        # Select the best team
+        team, captain, vice_captain, total_credits, foreign_count = self.select_dream11_team()
+        
+        return team, captain, vice_captain, team1, team2, venue, total_credits, foreign_count
+    
+    def predict_lineups(self, venue, team1_playing11, team2_playing11, count, max_overlap=10, max_nodes=MAX_SEARCH_NODES):
+        """Score the match once and select up to count distinct teams from the same candidate pool"""
+        self.score_players(venue, team1_playing11, team2_playing11)
+        return self.select_lineups(count, max_overlap, max_nodes)
+    
+    def simulate_match(self, team1_playing11, team2_playing11, simulations=DEFAULT_SIMULATIONS, workers=1, seed=None):
+        """Monte Carlo fantasy-point distributions of both XIs, batting in the order given"""
+        sides = []
+        for playing11 in (team1_playing11, team2_playing11):
+            names = [p.split('(')[0].strip() for p in playing11]
+            sides.append([(name, self.player_category(name)) for name in names])
+        return simulate_match(self.stats, sides[0], sides[1], simulations, workers, seed)
+    
+    @metrics.phase('score')
+    def score_players(self, venue, team1_playing11, team2_playing11, vectorized=True):
+        """Set roles and compute player_scores for a match with specific playing XI
+        
+        The vectorized engine gives the same scores as the per-player analysis below, which
+        is kept as the reference (and for XIs that list a player twice).
+        """
         # Combine playing 11 from both teams
         playing11 = team1_playing11 + team2_playing11
         
@@ -437,6 +460,10 @@ class Dream11Predictor:
         team1_players = [p.split('(')[0].strip() for p in team1_playing11]
         team2_players = [p.split('(')[0].strip() for p in team2_playing11]
         
+        if vectorized and len(set(all_players)) == len(all_players):
+            self.player_scores = get_engine(self.stats).score_match(venue, team1_players, team2_players)
+            return
+        
         # Reset player scores
         self.player_scores = {}
         
@@ -445,11 +472,6 @@ class Dream11Predictor:
         self.analyze_head_to_head(team2_players, team1_players)  # Analyze in reverse too
         self.analyze_venue_performance(venue, all_players)
         self.analyze_recent_form(all_players)
-        
-        # Select the best team
-        team, captain, vice_captain, total_credits, foreign_count = self.select_dream11_team()
-        
-        return team, captain, vice_captain, team1, team2, venue, total_credits, foreign_count
 
     def display_team(self, team, captain, vice_captain, team1, team2, venue, total_credits, foreign_count):
         """Display the selected Dream11 team"""
@@ -518,6 +540,137 @@ class Dream11Predictor:
         print("\nCAPTAIN: " + (captain if captain else "None"))
         print("VICE-CAPTAIN: " + (vice_captain if vice_captain else "None"))
 
+def team_abbreviation(team_name):
+    """Convert a team name to its abbreviation"""
+    if "Sunrisers" in team_name:
+        return "SRH"
+    elif "Delhi" in team_name:
+        return "DC"
+    elif "Chennai" in team_name:
+        return "CSK"
+    elif "Mumbai" in team_name:
+        return "MI"
+    elif "Kolkata" in team_name:
+        return "KKR"
+    elif "Punjab" in team_name:
+        return "PBKS"
+    elif "Rajasthan" in team_name:
+        return "RR"
+    elif "Bangalore" in team_name or "Bengaluru" in team_name:
+        return "RCB"
+    elif "Gujarat" in team_name:
+        return "GT"
+    elif "Lucknow" in team_name:
+        return "LSG"
+    else:
+        return team_name[:2]
+
+@metrics.phase('build_team')
+def build_fantasy_team(predictor, team, captain, vice_captain, team1, team2, venue, total_credits, team1_playing11, team2_playing11):
+    """Build the fantasy_team.json payload for a predicted team"""
+    team1_players = [p.split('(')[0].strip() for p in team1_playing11]
+    team2_players = [p.split('(')[0].strip() for p in team2_playing11]
+    
+    team_data = []
+    for player, score in team:
+        role = predictor.player_roles.get(player, "Unknown")
+        credits = predictor.player_credits.get(player, 7.0)
+        
+        # Determine player's team
+        player_team = "Unknown"
+        if player in team1_players:
+            player_team = team1
+        elif player in team2_players:
+            player_team = team2
+        
+        # Simplify role for web display
+        display_role = "Batsman"
+        if "WK" in role:
+            display_role = "Wicketkeeper"
+        elif "Bowler" in role:
+            display_role = "Bowler"
+        elif "All-Rounder" in role or "Allrounder" in role:
+            display_role = "All-Rounder"
+        
+        team_data.append({
+            "name": player,
+            "team": team_abbreviation(player_team),
+            "role": display_role,
+            "credit": credits,
+        })
+    
+    return {
+        "players": team_data,
+        "total_credits": total_credits,
+        "match": f"{team1} vs {team2}",
+        "venue": venue,
+        "captain": captain,
+        "vice_captain": vice_captain
+    }
+
+_predictor = None
+_predictor_lock = threading.Lock()
+
+def get_predictor():
+    """Return the process-wide predictor over the bundled data, creating it on first use"""
+    global _predictor
+    if _predictor is None:
+        with _predictor_lock:
+            if _predictor is None:
+                _predictor = Dream11Predictor(BATTER_DATA_PATH, BOWLER_DATA_PATH, TEAMS_FOLDER_PATH)
+    return _predictor
+
+def predict_fantasy_team(team1, team2, venue, team1_playing11, team2_playing11, captain_strategy=None,
+                         simulations=DEFAULT_SIMULATIONS):
+    """Predict a fantasy team with the shared predictor; safe to call from concurrent requests
+    
+    With a captain_strategy ('mean' or 'upside') the captain and vice-captain are chosen from
+    simulated fantasy-point distributions, which are added to the payload. The simulation runs
+    in the calling thread: forking a pool from a threaded server worker is unsafe, so process
+    pools are left to the command-line tools.
+    """
+    predictor = get_predictor().session()
+    team, captain, vice_captain, team1, team2, venue, total_credits, foreign_count = predictor.predict_dream11(
+        team1, team2, venue, team1_playing11, team2_playing11
+    )
+    summary = None
+    if captain_strategy is not None:
+        summary = predictor.simulate_match(team1_playing11, team2_playing11, simulations).summary()
+        simulated_captain, simulated_vice_captain = choose_captains([player for player, _ in team], summary,
+                                                                    captain_strategy)
+        if simulated_captain is not None:
+            captain, vice_captain = simulated_captain, simulated_vice_captain
+    fantasy_team = build_fantasy_team(predictor, team, captain, vice_captain, team1, team2, venue,
+                                      total_credits, team1_playing11, team2_playing11)
+    if summary is not None:
+        fantasy_team["captain_strategy"] = captain_strategy
+        fantasy_team["simulation"] = {player: summary[player] for player, _ in team if player in summary}
+    return fantasy_team
+
+def predict_fantasy_lineups(team1, team2, venue, team1_playing11, team2_playing11, count, max_overlap=10,
+                            max_nodes=MAX_SEARCH_NODES):
+    """Predict up to count distinct fantasy teams with the shared predictor
+    
+    Returns {'lineups', 'truncated', 'infeasible'}: truncated if the max_nodes budget ran out
+    before count lineups were found, infeasible if the search proved no further lineup exists.
+    When the budget runs out before the first lineup, the greedy team /api/fantasy_team falls
+    back to is returned instead (with 'fallback': 'greedy').
+    """
+    predictor = get_predictor().session()
+    lineups, truncated = predictor.predict_lineups(venue, team1_playing11, team2_playing11, count, max_overlap,
+                                                   max_nodes)
+    result = {'truncated': truncated, 'infeasible': not truncated and len(lineups) < count}
+    if not lineups and truncated:
+        team, captain, vice_captain, total_credits, foreign_count = predictor.select_dream11_team_greedy()
+        lineups = [(team, captain, vice_captain, total_credits, foreign_count)]
+        result['fallback'] = 'greedy'
+    result['lineups'] = [
+        build_fantasy_team(predictor, team, captain, vice_captain, team1, team2, venue,
+                           total_credits, team1_playing11, team2_playing11)
+        for team, captain, vice_captain, total_credits, foreign_count in lineups
+    ]
+    return result
+
 def main():
     # Define paths to data files
     batter_data = 'batter_data_cache.json'
@@ -584,72 +737,15 @@ def main():
     predictor.display_team(team, captain, vice_captain, team1, team2, venue, total_credits, foreign_count)
     
     # Save the team data to a JSON file
-    team_data = []
-    for player, score in team:
-        role = predictor.player_roles.get(player, "Unknown")
-        credits = predictor.player_credits.get(player, 7.0)
-        is_foreign = predictor.player_is_foreign.get(player, False)
-        
-        # Determine player's team
-        player_team = "Unknown"
-        if player in [p.split('(')[0].strip() for p in team1_playing11]:
-            player_team = team1
-        elif player in [p.split('(')[0].strip() for p in team2_playing11]:
-            player_team = team2
-            
-        # Convert team name to abbreviation
-        team_abbr = ""
-        if "Sunrisers" in player_team:
-            team_abbr = "SRH"
-        elif "Delhi" in player_team:
-            team_abbr = "DC"
-        elif "Chennai" in player_team:
-            team_abbr = "CSK"
-        elif "Mumbai" in player_team:
-            team_abbr = "MI"
-        elif "Kolkata" in player_team:
-            team_abbr = "KKR"
-        elif "Punjab" in player_team:
-            team_abbr = "PBKS"
-        elif "Rajasthan" in player_team:
-            team_abbr = "RR"
-        elif "Bangalore" in player_team or "Bengaluru" in player_team:
-            team_abbr = "RCB"
-        elif "Gujarat" in player_team:
-            team_abbr = "GT"
-        elif "Lucknow" in player_team:
-            team_abbr = "LSG"
-        else:
-            team_abbr = player_team[:2]
-        
-        # Simplify role for web display
-        display_role = "Batsman"
-        if "WK" in role:
-            display_role = "Wicketkeeper"
-        elif "Bowler" in role:
-            display_role = "Bowler"
-        elif "All-Rounder" in role or "Allrounder" in role:
-            display_role = "All-Rounder"
-        
-        team_data.append({
-            "name": player,
-            "team": team_abbr,
-            "role": display_role,
-            "credit": credits,
-        })
+    fantasy_team = build_fantasy_team(predictor, team, captain, vice_captain, team1, team2, venue,
+                                      total_credits, team1_playing11, team2_playing11)
     
     # Save to JSON file
     with open('fantasy_team.json', 'w') as f:
-        json.dump({
-            "players": team_data,
-            "total_credits": total_credits,
-            "match": f"{team1} vs {team2}",
-            "venue": venue,
-            "captain": captain,
-            "vice_captain": vice_captain
-        }, f, indent=2)
+        json.dump(fantasy_team, f, indent=2)
     
     print("\nTeam data saved to fantasy_team.json")
+    return fantasy_team
     
 if __name__ == "__main__":
     main()
\ No newline at end of file
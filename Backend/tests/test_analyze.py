@@ -0,0 +1,135 @@
+"""The /analyze, /analyze/bulk and /results routes over a small deliveries file"""
+import json
+import os
+import pytest
+import app
+from deliveries import get_deliveries
+from result_cache import ResultCache
+
+DELIVERIES = """match_id,inning,batter,bowler,batsman_runs,extras_type,player_dismissed
+1,1,V Kohli,JJ Bumrah,4,,
+1,1,V Kohli,JJ Bumrah,0,,V Kohli
+1,1,V Kohli,JJ Bumrah,0,wides,
+1,1,AB/CD,Rashid Khan,6,,
+1,1,AB/CD,Rashid Khan,1,,
+2,1,RG Sharma,RA Jadeja,6,,
+2,1,RG Sharma,RA Jadeja,0,,RG Sharma
+"""
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    path = str(tmp_path / 'deliveries.csv')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(DELIVERIES)
+    monkeypatch.setattr(app, 'DELIVERIES_FILE', path)
+    monkeypatch.setattr(app, 'deliveries_store', lambda store_path=path: get_deliveries(store_path))
+    # One entry in memory, so every other pair is spilled to disk
+    monkeypatch.setattr(app, 'result_cache', ResultCache(max_entries=1, spill_dir=str(tmp_path / 'spill')))
+    return app.app.test_client()
+
+
+def analyze(client, batter, bowler, **headers):
+    return client.get('/analyze', query_string={'batter': batter, 'bowler': bowler}, headers=headers)
+
+
+def test_summary_etag_and_304(client):
+    response = analyze(client, 'V Kohli', 'JJ Bumrah')
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'no-cache'
+    assert response.get_json()['Total Runs'] == 4 and response.get_json()['Dismissals'] == 1
+    etag = response.headers['ETag']
+
+    cached = analyze(client, 'V Kohli', 'JJ Bumrah', **{'If-None-Match': etag})
+    assert cached.status_code == 304 and cached.data == b''
+    assert cached.headers['ETag'] == etag
+    assert analyze(client, 'V Kohli', 'JJ Bumrah', **{'If-None-Match': '"stale"'}).status_code == 200
+    assert analyze(client, 'V Kohli', 'Rashid Khan').status_code == 404
+
+
+def test_evicted_results_are_served_from_the_spill(client):
+    published = client.post('/analyze', json={'batter': 'AB/CD', 'bowler': 'Rashid Khan'}).get_json()
+    # The path separator in the player name does not reach the file system
+    assert published['filename'] == 'AB-CD_vs_RashidKhan.json'
+    first = client.get(f"/results/{published['filename']}")
+    assert first.status_code == 200 and first.get_json()['6s'] == 1
+
+    # Caching a second pair evicts the first to spill/<data version>/<filename>
+    assert analyze(client, 'V Kohli', 'JJ Bumrah').status_code == 200
+    assert len(app.result_cache) == 1
+    spill_path = os.path.join(app.result_cache.spill_dir, app.deliveries_store().version, published['filename'])
+    assert os.path.isfile(spill_path)
+
+    spilled = client.get(f"/results/{published['filename']}")
+    assert spilled.status_code == 200
+    assert spilled.data == first.data
+    assert spilled.headers['ETag'] == first.headers['ETag'] == f'"{published["etag"]}"'
+    assert client.get(f"/results/{published['filename']}", headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+    assert client.get('/results/Nobody_vs_Nobody.json').status_code == 404
+
+
+def ndjson(response):
+    return [json.loads(line) for line in response.data.decode('utf-8').splitlines()]
+
+
+def test_batch_reports_unknown_pairs_per_line(client):
+    pairs = [['V Kohli', 'JJ Bumrah'], ['Nobody At All', 'JJ Bumrah'], ['AB/CD', 'Rashid Khan'], ['V Kohli', 'Rashid Khan']]
+    response = client.post('/analyze', json={'pairs': pairs})
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    assert response.headers['X-Pair-Count'] == '4'
+    assert response.headers['X-Data-Version'] == app.deliveries_store().version
+
+    lines = ndjson(response)
+    assert [[line['batter'], line['bowler']] for line in lines] == pairs
+    assert lines[0]['summary'] == analyze(client, 'V Kohli', 'JJ Bumrah').get_json() and 'error' not in lines[0]
+    assert lines[1] == {'batter': 'Nobody At All', 'bowler': 'JJ Bumrah', 'summary': None,
+                        'error': 'No deliveries found for Nobody At All'}
+    assert lines[2]['summary']['Total Runs'] == 7
+    # Both players are known, they just never met
+    assert lines[3] == {'batter': 'V Kohli', 'bowler': 'Rashid Khan', 'summary': None}
+
+
+@pytest.mark.parametrize('body', [{'pairs': 'V Kohli'}, {'pairs': [['V Kohli']]}, {'team1': 'Mumbai Indians'}])
+def test_bad_batches(client, body):
+    assert client.post('/analyze', json=body).status_code == 400
+
+
+def test_bulk_grid(client):
+    response = client.post('/analyze/bulk', json={'batters': ['V Kohli', 'Nobody At All'],
+                                                  'bowlers': ['JJ Bumrah', 'Rashid Khan']})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['version'] == app.deliveries_store().version
+    assert body['grid']['V Kohli']['JJ Bumrah']['Dismissals'] == 1
+    assert body['grid']['V Kohli']['Rashid Khan'] is None
+    assert body['grid']['Nobody At All'] == {'JJ Bumrah': None, 'Rashid Khan': None}
+    assert client.post('/analyze/bulk', json={'batters': [], 'bowlers': ['JJ Bumrah']}).status_code == 400
+
+
+def test_squad_batch_streams_every_pair_in_batches(client, monkeypatch):
+    monkeypatch.setattr(app, 'ANALYZE_STREAM_BATCH', 50)
+    expected = app.squad_pairs('Mumbai Indians', 'Chennai Super Kings')
+    # Squad file names work as well as team names
+    response = client.post('/analyze', json={'team1': 'Mumbai Indians', 'team2': 'chennai-super-kings'}, buffered=False)
+    assert response.status_code == 200
+    assert response.headers['X-Pair-Count'] == str(len(expected))
+    assert response.headers['X-Data-Version'] == app.deliveries_store().version
+    chunks = list(response.response)
+    assert len(chunks) == -(-len(expected) // 50)
+
+    lines = [json.loads(line) for line in b''.join(chunks).decode('utf-8').splitlines()]
+    assert [(line['batter'], line['bowler']) for line in lines] == expected
+    # Squad-sheet names are looked up under their cricsheet names
+    rohit = next(line for line in lines if (line['batter'], line['bowler']) == ('Rohit Sharma', 'Ravindra Jadeja'))
+    assert rohit['summary']['Batter'] == 'RG Sharma' and rohit['summary']['Average'] == 6.0
+    assert all(line['summary'] is None for line in lines if line is not rohit)
+
+
+def test_batch_limits(client, monkeypatch):
+    monkeypatch.setattr(app, 'MAX_ANALYZE_PAIRS', 2)
+    pairs = [{'batter': 'V Kohli', 'bowler': 'JJ Bumrah'}, {'batter': 'AB/CD', 'bowler': 'Rashid Khan'}]
+    assert [line['summary']['Bowler'] for line in ndjson(client.post('/analyze', json={'pairs': pairs}))] == [
+        'JJ Bumrah', 'Rashid Khan']
+    assert client.post('/analyze', json={'pairs': pairs * 2}).status_code == 400
+    assert client.post('/analyze', json={'team1': 'Mumbai Indians', 'team2': 'Nowhere XI'}).status_code == 400
@@ -0,0 +1,55 @@
+"""The hashed asset build, its manifest, and the caching headers app.py serves them with"""
+import os
+import pytest
+import app
+import assets
+
+SQUADS = 'Static/public/squads.json'
+
+
+@pytest.fixture(scope='module')
+def manifest(tmp_path_factory):
+    build_dir = str(tmp_path_factory.mktemp('build'))
+    return build_dir, assets.build(build_dir)
+
+
+@pytest.fixture
+def client(manifest, monkeypatch):
+    monkeypatch.setattr(app, 'asset_manifest', assets.AssetManifest(manifest[0]))
+    return app.app.test_client()
+
+
+def test_manifest_entries_name_built_files(manifest):
+    build_dir, built = manifest
+    assert SQUADS in built['assets']
+    for url_path, entry in built['assets'].items():
+        files = [entry['file'], *entry['encodings'].values(), *(v['file'] for v in entry.get('variants', []))]
+        assert all(os.path.isfile(os.path.join(build_dir, name)) for name in files), url_path
+        with open(os.path.join(build_dir, entry['file']), 'rb') as f:
+            assert assets.content_hash(f.read()) == entry['hash']
+        assert entry['file'] == assets.hashed_name(url_path, entry['hash'])
+    # Rebuilding prunes nothing that is still referenced, and names stay the same
+    assert assets.build(build_dir)['assets'] == built['assets']
+
+
+def test_hashed_urls_are_immutable(client, manifest):
+    entry = manifest[1]['assets'][SQUADS]
+    response = client.get(f"/assets/{entry['file']}", headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == f'public, max-age={assets.IMMUTABLE_MAX_AGE}, immutable'
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert client.get('/assets/squads.000000000000.json').status_code == 404
+
+
+def test_unhashed_urls_revalidate(client, manifest):
+    response = client.get(f'/{SQUADS}')
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'no-cache'
+    assert 'immutable' not in response.headers['Cache-Control']
+    etag = response.headers['ETag']
+    assert client.get(f'/{SQUADS}', headers={'If-None-Match': etag}).status_code == 304
+
+    listed = client.get('/assets/manifest.json')
+    assert listed.headers['Cache-Control'] == 'no-cache'
+    assert listed.get_json()['assets'][SQUADS]['file'] == manifest[1]['assets'][SQUADS]['file']
+    assert client.get('/assets/manifest.json', headers={'If-None-Match': listed.headers['ETag']}).status_code == 304
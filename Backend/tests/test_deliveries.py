@@ -0,0 +1,164 @@
+"""DeliveriesStore's precomputed head-to-head summaries against the original per-pair scan"""
+import random
+import numpy as np
+import pandas as pd
+import pytest
+from deliveries import DELIVERIES_COLUMNS, DELIVERIES_DTYPES, DeliveriesStore, PairSummaries
+
+HEADER = ['match_id', 'inning', 'batting_team', 'bowling_team', 'over', 'ball', 'batter', 'bowler', 'non_striker',
+          'batsman_runs', 'extra_runs', 'total_runs', 'extras_type', 'is_wicket', 'player_dismissed',
+          'dismissal_kind', 'fielder']
+BATTERS = ['V Kohli', 'RG Sharma', 'SV Samson', 'JC Buttler']
+BOWLERS = ['JJ Bumrah', 'Rashid Khan', 'YS Chahal']
+# A pair that meets in every match but never takes the batter's wicket
+UNDISMISSED = ('JC Buttler', 'YS Chahal')
+
+
+def deliveries(rng, match_ids, balls=30):
+    """Rows in deliveries.csv columns, every match's rows together"""
+    rows = []
+    for match_id in match_ids:
+        for ball in range(balls):
+            batter, bowler = rng.choice(BATTERS), rng.choice(BOWLERS)
+            if ball == 0:
+                batter, bowler = UNDISMISSED
+            extras_type = rng.choice(['', '', '', 'wides', 'legbyes', 'byes', 'noballs'])
+            runs = 0 if extras_type in ('wides', 'legbyes', 'byes') else rng.choice([0, 0, 1, 1, 2, 3, 4, 6])
+            dismissed = ''
+            if (batter, bowler) != UNDISMISSED and rng.random() < 0.1:
+                dismissed = rng.choice([batter, batter, 'ns'])
+            rows.append([match_id, 1, 'A', 'B', ball // 6, ball % 6 + 1, batter, bowler, 'ns', runs,
+                         int(bool(extras_type)), runs + int(bool(extras_type)), extras_type, int(bool(dismissed)),
+                         dismissed, 'caught' if dismissed else '', ''])
+    return rows
+
+
+def write_csv(path, rows, mode='w'):
+    pd.DataFrame(rows, columns=HEADER).to_csv(path, mode=mode, header=mode == 'w', index=False)
+
+
+def baseline_summary(file, batter_name, bowler_name):
+    """analyze_batter_vs_bowler as it was before the store: a scan of the whole CSV per pair"""
+    df = pd.read_csv(file)
+    head_to_head = df[(df['batter'] == batter_name) & (df['bowler'] == bowler_name)].copy()
+    head_to_head = head_to_head[~head_to_head['extras_type'].isin(['wides', 'legbyes', 'byes']) | head_to_head['extras_type'].isna()]
+    if head_to_head.empty:
+        return None
+    total_balls = len(head_to_head)
+    dot_balls = len(head_to_head[head_to_head['batsman_runs'] == 0])
+    runs = head_to_head['batsman_runs'].sum()
+    run_breakdown = head_to_head['batsman_runs'].value_counts().to_dict()
+    dismissals = head_to_head['player_dismissed'].eq(batter_name).sum()
+    strike_rate = (runs / total_balls) * 100 if total_balls else 0
+    average = (runs / dismissals) if dismissals else runs
+    boundary_pct = (run_breakdown.get(4, 0) + run_breakdown.get(6, 0)) / total_balls * 100 if total_balls else 0
+    summary = {
+        'Batter': batter_name,
+        'Bowler': bowler_name,
+        'Balls Faced': total_balls,
+        'Dot Balls': dot_balls,
+        'Total Runs': runs,
+        '1s': run_breakdown.get(1, 0),
+        '2s': run_breakdown.get(2, 0),
+        '3s': run_breakdown.get(3, 0),
+        '4s': run_breakdown.get(4, 0),
+        '6s': run_breakdown.get(6, 0),
+        'Dismissals': dismissals,
+        'Strike Rate': round(strike_rate, 2),
+        'Average': round(average, 2),
+        'Boundary %': round(boundary_pct, 2)
+    }
+    return {k: (int(v) if isinstance(v, (np.integer, int)) else float(v) if isinstance(v, (np.floating, float)) else v)
+            for k, v in summary.items()}
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / 'deliveries.csv'
+    write_csv(path, deliveries(random.Random(1), range(1, 6)))
+    return str(path)
+
+
+def assert_matches_baseline(store, path):
+    for batter in BATTERS + ['Nobody']:
+        for bowler in BOWLERS:
+            summary = store.summary(batter, bowler)
+            expected = baseline_summary(path, batter, bowler)
+            assert summary == expected
+            if summary is not None:
+                assert [type(v) for v in summary.values()] == [type(v) for v in expected.values()]
+
+
+# 7-row chunks split every 30-ball match across chunks
+@pytest.mark.parametrize('chunk_rows', [7, 1000])
+def test_summaries_match_the_baseline(csv_path, chunk_rows):
+    store = DeliveriesStore(csv_path, chunk_rows=chunk_rows).refresh()
+    assert_matches_baseline(store, csv_path)
+    assert store.has_player('batter', 'V Kohli') and not store.has_player('batter', 'JJ Bumrah')
+
+
+def test_undismissed_average_is_the_run_total(csv_path):
+    summary = DeliveriesStore(csv_path).refresh().summary(*UNDISMISSED)
+    assert summary['Dismissals'] == 0
+    assert summary['Average'] == summary['Total Runs'] and isinstance(summary['Average'], int)
+
+
+def summaries_of(store):
+    return {pair: store.summary(*pair) for pair in store.pairs()}
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    """Count full reloads of any store"""
+    calls = []
+    full_load = DeliveriesStore._load
+    monkeypatch.setattr(DeliveriesStore, '_load', lambda self: calls.append(self.path) or full_load(self))
+    return calls
+
+
+def test_appended_rows_merge_like_a_rebuild(csv_path, loads):
+    store = DeliveriesStore(csv_path, chunk_rows=7).refresh()
+    version = store.version
+    write_csv(csv_path, deliveries(random.Random(2), range(6, 9)), mode='a')
+
+    store.refresh()
+    assert len(loads) == 1 and store.version != version
+    assert summaries_of(store) == summaries_of(DeliveriesStore(csv_path).refresh())
+    assert_matches_baseline(store, csv_path)
+
+
+def test_partial_line_waits_for_the_next_refresh(csv_path, loads):
+    store = DeliveriesStore(csv_path).refresh()
+    rows = pd.DataFrame(deliveries(random.Random(3), [9]), columns=HEADER).to_csv(header=False, index=False)
+    cut = rows.index('\n', len(rows) // 2) + 5
+    with open(csv_path, 'a', encoding='utf-8', newline='') as f:
+        f.write(rows[:cut])
+    store.refresh()
+    with open(csv_path, 'a', encoding='utf-8', newline='') as f:
+        f.write(rows[cut:])
+    store.refresh()
+    assert len(loads) == 1
+    assert summaries_of(store) == summaries_of(DeliveriesStore(csv_path).refresh())
+
+
+@pytest.mark.parametrize('change', ['truncate', 'rewrite'])
+def test_other_changes_reload_the_file(csv_path, loads, change):
+    store = DeliveriesStore(csv_path).refresh()
+    if change == 'truncate':
+        write_csv(csv_path, deliveries(random.Random(1), range(1, 3)))
+    else:
+        # Longer than before, but not by appending
+        write_csv(csv_path, deliveries(random.Random(4), range(1, 8)))
+    store.refresh()
+    assert len(loads) == 2
+    assert_matches_baseline(store, csv_path)
+
+
+def test_merged_summaries_equal_one_pass(csv_path):
+    frame = pd.read_csv(csv_path, usecols=DELIVERIES_COLUMNS, dtype=DELIVERIES_DTYPES)
+    first, second = frame.iloc[:70], frame.iloc[70:]
+    merged = PairSummaries(first).merge(PairSummaries(second))
+    whole = PairSummaries(frame)
+    assert sorted(merged.pairs()) == sorted(whole.pairs())
+    assert all(merged.summary(*pair) == whole.summary(*pair) for pair in whole.pairs())
+    assert PairSummaries().merge(whole).pairs() == whole.pairs()
@@ -0,0 +1,65 @@
+"""The Parquet deliveries dataset against the CSV, and the CSV fallback without pyarrow"""
+import os
+import pytest
+import deliveries_parquet
+from deliveries import DeliveriesStore, get_deliveries
+
+DELIVERIES = """match_id,inning,batting_team,bowling_team,over,ball,batter,bowler,non_striker,batsman_runs,extra_runs,total_runs,extras_type,is_wicket,player_dismissed,dismissal_kind,fielder
+1,1,A,B,0,1,V Kohli,JJ Bumrah,ns,4,0,4,,0,,,
+1,1,A,B,0,2,V Kohli,JJ Bumrah,ns,0,0,0,,1,V Kohli,caught,x
+1,1,A,B,0,3,V Kohli,JJ Bumrah,ns,0,1,1,wides,0,,,
+2,1,A,B,0,1,V Kohli,Rashid Khan,ns,6,0,6,,0,,,
+2,1,A,B,0,2,SV Samson,Rashid Khan,ns,1,0,1,byes,1,ns,run out,y
+3,1,A,B,0,1,SV Samson,JJ Bumrah,ns,2,0,2,,0,,,
+3,1,A,B,0,2,SV Samson,JJ Bumrah,ns,0,1,1,legbyes,1,SV Samson,bowled,z
+"""
+# Every season has a value in each name column, so each partition's file has the same schema
+MATCHES = """id,season,date,venue
+1,2023,2023-04-01,Eden Gardens
+2,2007/08,2008-04-18,Wankhede Stadium
+3,2024,2024-04-01,Eden Gardens
+"""
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / 'deliveries.csv'
+    path.write_text(DELIVERIES)
+    (tmp_path / 'matches.csv').write_text(MATCHES)
+    return str(path)
+
+
+def summaries_of(store):
+    return {pair: store.summary(*pair) for pair in store.pairs()}
+
+
+def test_dataset_summaries_equal_the_csv(csv_path, tmp_path):
+    pytest.importorskip('pyarrow')
+    out_dir = str(tmp_path / 'deliveries_parquet')
+    written = deliveries_parquet.convert(csv_path, str(tmp_path / 'matches.csv'), out_dir, row_group_rows=2)
+    assert written == {'2007-08': 2, '2023': 3, '2024': 2}
+    assert sorted(os.listdir(out_dir)) == ['season=2007-08', 'season=2023', 'season=2024']
+
+    from_csv = DeliveriesStore(csv_path).refresh()
+    from_parquet = DeliveriesStore(out_dir, chunk_rows=2).refresh()
+    assert from_parquet.is_dataset()
+    assert summaries_of(from_parquet) == summaries_of(from_csv)
+    assert deliveries_parquet.pair_summary(out_dir, 'V Kohli', 'JJ Bumrah') == from_csv.summary('V Kohli', 'JJ Bumrah')
+
+    # Converting again replaces the dataset whole
+    deliveries_parquet.convert(csv_path, str(tmp_path / 'matches.csv'), out_dir)
+    assert summaries_of(DeliveriesStore(out_dir).refresh()) == summaries_of(from_csv)
+
+
+def test_dataset_falls_back_to_the_csv_without_pyarrow(csv_path, tmp_path, monkeypatch):
+    monkeypatch.setattr(deliveries_parquet, 'pa', None)
+    out_dir = tmp_path / 'deliveries_parquet'
+    (out_dir / 'season=2023').mkdir(parents=True)
+
+    store = get_deliveries(str(out_dir), fallback=csv_path)
+    assert store.path == os.path.abspath(csv_path) and not store.is_dataset()
+    assert store.summary('V Kohli', 'JJ Bumrah')['Total Runs'] == 4
+    # A CSV path never falls back, and a dataset without a fallback says what is missing
+    assert get_deliveries(csv_path, fallback=str(tmp_path / 'other.csv')) is store
+    with pytest.raises(RuntimeError, match='pyarrow'):
+        DeliveriesStore(str(out_dir)).refresh()
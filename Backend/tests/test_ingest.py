@@ -0,0 +1,64 @@
+"""ingest.py add: appending a match and its aggregates, and re-running after a failure"""
+import argparse
+import os
+import pandas as pd
+import pytest
+import ingest
+from ingest import PlayerAggregates
+
+HEADER = ['match_id', 'inning', 'batter', 'bowler', 'batsman_runs', 'extra_runs', 'total_runs', 'extras_type',
+          'is_wicket', 'player_dismissed', 'dismissal_kind']
+
+
+def deliveries(match_id, balls):
+    return pd.DataFrame([[match_id, 1, 'A Batter', 'A Bowler', 4, 0, 4, None, 0, None, None]] * balls, columns=HEADER)
+
+
+@pytest.fixture
+def paths(tmp_path):
+    deliveries_path, match_path = tmp_path / 'deliveries.csv', tmp_path / 'match.csv'
+    deliveries(1, 6).to_csv(deliveries_path, index=False)
+    deliveries(2, 12).to_csv(match_path, index=False)
+    return argparse.Namespace(deliveries=str(deliveries_path), state=str(tmp_path / 'player_aggregates.json'),
+                              match_csv=str(match_path), venue='Eden Gardens', date='2025-05-10', matches=None)
+
+
+def appended(args, match_id):
+    return int((pd.read_csv(args.deliveries)['match_id'] == match_id).sum())
+
+
+def test_add_is_idempotent(paths):
+    assert ingest.add(paths) == 0
+    assert ingest.add(paths) == 0
+    aggregates = PlayerAggregates.load(paths.state)
+    assert aggregates.version == 1
+    assert aggregates.venue_stats('batter', 'A Batter', 'Eden Gardens')['Runs'] == 48
+    assert appended(paths, 2) == 12
+
+
+def test_rerun_after_a_failed_append(paths, monkeypatch):
+    def fail(*args):
+        raise OSError('disk full')
+    with monkeypatch.context() as patch:
+        patch.setattr(ingest, 'append_deliveries', fail)
+        with pytest.raises(OSError):
+            ingest.add(paths)
+    assert appended(paths, 2) == 0
+
+    assert ingest.add(paths) == 0
+    aggregates = PlayerAggregates.load(paths.state)
+    assert aggregates.version == 1
+    assert aggregates.venue_stats('batter', 'A Batter', 'Eden Gardens')['Runs'] == 48
+    assert appended(paths, 2) == 12
+
+
+def test_rerun_after_a_lost_state_file(paths):
+    # Deliveries already appended by an earlier run whose state never reached the disk
+    ingest.append_deliveries(paths.deliveries, deliveries(2, 12))
+    assert ingest.add(paths) == 0
+    assert PlayerAggregates.load(paths.state).venue_stats('batter', 'A Batter', 'Eden Gardens')['Runs'] == 48
+    assert appended(paths, 2) == 12
+
+
+def test_state_file_is_next_to_the_module():
+    assert ingest.STATE_FILE == os.path.join(os.path.dirname(ingest.__file__), 'player_aggregates.json')
@@ -0,0 +1,144 @@
+"""live_stream.py's request parsing, limits and subscriber handling over real sockets"""
+import asyncio
+import json
+import live_stream
+
+MATCHES = {'current_matches': [{'game_id': 1, 'match_status': 'Live', 'results': '10/0'}], 'upcoming_matches': []}
+
+
+class StubFeed:
+    """A live-matches feed that never touches the network"""
+    interval = 3600
+
+    def __init__(self):
+        self.listeners = []
+
+    def subscribe(self, callback):
+        self.listeners.append(callback)
+
+    def publish(self, data):
+        for callback in self.listeners:
+            callback(data)
+
+    def load(self):
+        self.publish(MATCHES)
+
+    def refresh(self, session):
+        return True
+
+    def status(self):
+        return {'source': 'stub'}
+
+
+def run(scenario):
+    """Run scenario(fanout, port) against a FanOut listening on a free local port"""
+    async def main():
+        fanout = live_stream.FanOut(StubFeed())
+        server, poller = await fanout.start('127.0.0.1', 0)
+        try:
+            async with server:
+                return await scenario(fanout, server.sockets[0].getsockname()[1])
+        finally:
+            poller.cancel()
+    return asyncio.run(main())
+
+
+async def exchange(port, request):
+    """Send raw request bytes and read the whole response"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(request)
+    await writer.drain()
+    response = await asyncio.wait_for(reader.read(), 5)
+    writer.close()
+    return response
+
+
+def status_of(response):
+    return int(response.split(b' ', 2)[1])
+
+
+def test_long_poll_returns_the_snapshot():
+    async def scenario(fanout, port):
+        return await exchange(port, b'GET /api/live-matches/updates?timeout=0 HTTP/1.1\r\nHost: x\r\n\r\n')
+    response = run(scenario)
+    assert status_of(response) == 200
+    body = json.loads(response.split(b'\r\n\r\n', 1)[1])
+    assert body['reset'] is True and body['matches'] == MATCHES
+
+
+def test_malformed_requests():
+    requests = [
+        b'GARBAGE\r\n\r\n',
+        b'GET /api/live-matches/updates\r\n\r\n',
+        b'GET  /api/live-matches/updates HTTP/1.1\r\n\r\n',
+        b'GET http://evil/ HTTP/1.1\r\n\r\n',
+        b'GET /api/live-matches/updates HTTP/1.1\r\nno colon here\r\n\r\n',
+        b'GET /api/live-matches/updates HTTP/1.1\r\n : empty name\r\n\r\n',
+        b'GET /api/live-matches/updates?timeout=nan HTTP/1.1\r\n\r\n',
+    ]
+
+    async def scenario(fanout, port):
+        return [await exchange(port, request) for request in requests]
+    assert [status_of(response) for response in run(scenario)] == [400] * len(requests)
+
+
+def test_oversized_heads():
+    too_long = b'GET /api/live-matches/updates HTTP/1.1\r\nX-Pad: ' + b'a' * live_stream.MAX_HEAD_BYTES + b'\r\n\r\n'
+    too_many = (b'GET /api/live-matches/updates HTTP/1.1\r\n'
+                + b''.join(b'X-%d: 1\r\n' % i for i in range(live_stream.MAX_HEADERS + 1)) + b'\r\n')
+
+    async def scenario(fanout, port):
+        return [await exchange(port, request) for request in (too_long, too_many)]
+    assert [status_of(response) for response in run(scenario)] == [431, 431]
+
+
+def test_routes_and_methods():
+    async def scenario(fanout, port):
+        return [status_of(await exchange(port, request)) for request in (
+            b'GET /nowhere HTTP/1.1\r\n\r\n',
+            b'POST /api/live-matches/updates HTTP/1.1\r\n\r\n',
+            b'OPTIONS /api/live-matches/stream HTTP/1.1\r\n\r\n',
+            b'GET /status HTTP/1.1\r\n\r\n',
+        )]
+    assert run(scenario) == [404, 405, 204, 200]
+
+
+def test_stream_pushes_diffs_and_forgets_disconnected_viewers():
+    async def scenario(fanout, port):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b'GET /api/live-matches/stream HTTP/1.1\r\n\r\n')
+        head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), 5)
+        snapshot = await asyncio.wait_for(reader.readuntil(b'\n\n'), 5)
+
+        changed = {'current_matches': [{**MATCHES['current_matches'][0], 'results': '20/1'}], 'upcoming_matches': []}
+        fanout.feed.publish(changed)
+        async with fanout._changed:
+            fanout._changed.notify_all()
+        diff = await asyncio.wait_for(reader.readuntil(b'\n\n'), 5)
+        viewers = fanout.viewers
+
+        writer.close()
+        for _ in range(50):
+            if fanout.viewers == 0:
+                break
+            await asyncio.sleep(0.05)
+        return head, snapshot, diff, viewers, fanout.viewers
+
+    head, snapshot, diff, viewers, remaining = run(scenario)
+    assert status_of(head) == 200 and b'text/event-stream' in head
+    assert b'event: snapshot' in snapshot
+    assert b'event: diff' in diff and b'"results": "20/1"' in diff
+    assert viewers == 1
+    assert remaining == 0
+
+
+def test_silent_clients_are_dropped(monkeypatch):
+    monkeypatch.setattr(live_stream, 'READ_TIMEOUT', 0.2)
+
+    async def scenario(fanout, port):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b'GET /api/live-matches/updates HTTP/1.1\r\n')
+        closed = await asyncio.wait_for(reader.read(), 5)
+        writer.close()
+        return closed, fanout.viewers
+    assert run(scenario) == (b'', 0)
@@ -0,0 +1,41 @@
+"""The app's live-match long-poll and stream routes and their per-worker subscriber cap"""
+import threading
+import pytest
+import app
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(app, 'live_subscriber_slots', threading.BoundedSemaphore(1))
+    monkeypatch.setattr(app, 'LIVE_STREAM_URL', None)
+    return app.app.test_client()
+
+
+def test_stream_holds_a_slot_until_closed(client):
+    stream = client.get('/api/live-matches/stream', buffered=False)
+    assert stream.status_code == 200
+    assert next(iter(stream.response)).startswith(b'id: ')
+
+    full = client.get('/api/live-matches/stream')
+    assert full.status_code == 503
+    assert full.headers['Retry-After'] == str(app.LIVE_RETRY_AFTER)
+    # Waiting long-polls share the cap; an immediate poll never waits
+    assert client.get('/api/live-matches/updates?timeout=1').status_code == 503
+    assert client.get('/api/live-matches/updates?timeout=0').status_code == 200
+
+    stream.close()
+    again = client.get('/api/live-matches/stream', buffered=False)
+    assert again.status_code == 200
+    again.close()
+
+
+def test_immediate_poll_resumes_from_its_version(client):
+    first = client.get('/api/live-matches/updates?timeout=0').get_json()
+    assert first['reset'] is True
+    update = client.get(f"/api/live-matches/updates?timeout=0&since={first['version']}").get_json()
+    assert update == {'version': first['version'], 'reset': False, 'diffs': []}
+
+
+@pytest.mark.parametrize('timeout', ['nan', 'soon'])
+def test_bad_timeouts(client, timeout):
+    assert client.get(f'/api/live-matches/updates?timeout={timeout}').status_code == 400
@@ -0,0 +1,93 @@
+"""The branch-and-bound optimizer against exhaustive search on small random candidate pools"""
+import itertools
+import random
+import pytest
+from optimizer import CATEGORIES, CREDIT_EPSILON, Candidate, optimize_lineups, optimize_team, search_lineups
+
+CREDITS = [6.0, 6.5, 7.0, 7.5, 8.0, 8.5, 9.0, 9.5, 10.0, 10.5, 11.0]
+
+
+def random_pool(rng, size):
+    # Continuous scores, so the best team is unique
+    return [Candidate(f"Player {i}", rng.uniform(0, 60), rng.choice(CREDITS), rng.random() < 0.35,
+                      CATEGORIES[i] if i < len(CATEGORIES) else rng.choice(CATEGORIES))
+            for i in range(size)]
+
+
+def valid(team, team_size=11, max_credits=100, max_foreign=4, min_per_category=1, max_per_category=8):
+    counts = [sum(1 for c in team if c.category == category) for category in CATEGORIES]
+    return (len(team) == team_size
+            and sum(c.credits for c in team) <= max_credits + CREDIT_EPSILON
+            and sum(1 for c in team if c.foreign) <= max_foreign
+            and min(counts) >= min_per_category and max(counts) <= max_per_category)
+
+
+def brute_force_lineups(pool, count, max_overlap, **rules):
+    """Each lineup the best valid team sharing at most max_overlap players with every earlier one"""
+    teams = sorted((team for team in itertools.combinations(pool, rules.get('team_size', 11)) if valid(team, **rules)),
+                   key=lambda team: sum(c.score for c in team), reverse=True)
+    lineups = []
+    for team in teams:
+        if len(lineups) == count:
+            break
+        if all(len(set(team) & set(other)) <= max_overlap for other in lineups):
+            lineups.append(team)
+    return lineups
+
+
+def names(team):
+    return sorted(name for name, _ in team)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_best_team_matches_brute_force(seed):
+    pool = random_pool(random.Random(seed), 15)
+    expected = brute_force_lineups(pool, 1, 11)
+    result = optimize_team(pool)
+    if not expected:
+        assert result is None
+        return
+    team, captain, vice_captain, total_credits, foreign_count = result
+    assert names(team) == sorted(c.name for c in expected[0])
+    assert sum(score for _, score in team) == pytest.approx(sum(c.score for c in expected[0]))
+    assert [score for _, score in team] == sorted((score for _, score in team), reverse=True)
+    assert (captain, vice_captain) == (team[0][0], team[1][0])
+
+
+@pytest.mark.parametrize('seed', range(10))
+@pytest.mark.parametrize('max_overlap', [7, 8, 9, 10])
+def test_lineups_match_brute_force(seed, max_overlap):
+    pool = random_pool(random.Random(1000 + seed), 16)
+    expected = brute_force_lineups(pool, 5, max_overlap)
+    lineups = optimize_lineups(pool, 5, max_overlap)
+    assert [names(team) for team, *_ in lineups] == [sorted(c.name for c in team) for team in expected]
+
+
+def test_tight_rules_match_brute_force():
+    rng = random.Random(7)
+    rules = dict(max_credits=85, max_foreign=2, max_per_category=4)
+    for _ in range(10):
+        pool = random_pool(rng, 15)
+        expected = brute_force_lineups(pool, 1, 11, **rules)
+        result = optimize_team(pool, **rules)
+        assert (result is None) == (not expected)
+        if expected:
+            assert names(result[0]) == sorted(c.name for c in expected[0])
+
+
+def test_node_budget_returns_the_lineups_completed():
+    pool = random_pool(random.Random(3), 24)
+    complete = optimize_lineups(pool, 20, 6, max_nodes=None)
+    budgeted = optimize_lineups(pool, 20, 6, max_nodes=2000)
+    assert 0 < len(budgeted) < len(complete)
+    assert budgeted == complete[:len(budgeted)]
+
+
+def test_search_reports_truncation_and_infeasibility():
+    pool = random_pool(random.Random(3), 24)
+    assert search_lineups(pool, 20, 6, max_nodes=2000).truncated
+    complete = search_lineups(pool, 3, 6, max_nodes=None)
+    assert len(complete.lineups) == 3 and not complete.truncated
+    # No XI fits 60 credits: the search proves it rather than running out of budget
+    impossible = search_lineups(pool, 3, 6, max_credits=60)
+    assert impossible.lineups == [] and not impossible.truncated
@@ -0,0 +1,32 @@
+"""PlayerRegistry's fuzzy lookups and their bounded cache"""
+import player_registry
+from player_registry import PlayerRecord, PlayerRegistry
+
+RECORDS = [
+    PlayerRecord('Jasprit Bumrah', 'Mumbai Indians', 'Bowler', 9.0, False, 'JJ Bumrah', None),
+    PlayerRecord('Virat Kohli', 'Royal Challengers Bengaluru', 'Batter', 10.0, False, 'V Kohli', None),
+    PlayerRecord('Rashid Khan', 'Gujarat Titans', 'Bowler', 9.5, True, 'Rashid Khan', None),
+]
+
+
+def test_fuzzy_lookups():
+    registry = PlayerRegistry(RECORDS)
+    assert registry.resolve('Bumrah').name == 'Jasprit Bumrah'
+    assert registry.resolve('Virat Kohlli').name == 'Virat Kohli'
+    assert registry.resolve('Nobody') is None
+    assert registry.resolve('Nobody', fuzzy=False) is None
+
+
+def test_fuzzy_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(player_registry, 'MAX_FUZZY_CACHE', 2)
+    registry = PlayerRegistry(RECORDS)
+    for name in ('Bumrah', 'Kohlli', 'Rashid', 'Bumrah', 'Nobody'):
+        registry.resolve(name)
+    assert list(registry._fuzzy_cache) == ['bumrah', 'nobody']
+
+
+def test_long_misses_are_not_cached():
+    registry = PlayerRegistry(RECORDS)
+    assert registry.resolve('x' * 200) is None
+    assert registry.resolve('Jasprit Bumrah (Mumbai Indians)') is None
+    assert registry._fuzzy_cache == {}
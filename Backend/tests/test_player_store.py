@@ -0,0 +1,77 @@
+"""Compiled player stats over the JSON caches and the ingested aggregates"""
+import pytest
+import player_store
+from ingest import PlayerAggregates
+from player_store import load_player_stats
+from team import BATTER_DATA_PATH, BOWLER_DATA_PATH
+
+# Squad-sheet name in the caches, and the cricsheet name the aggregates use
+PLAYER = 'Sanju Samson'
+CRICSHEET_NAME = 'SV Samson'
+VENUE = 'Wankhede Stadium, Mumbai'
+
+
+def save_aggregates(path, form):
+    aggregates = PlayerAggregates({
+        'version': len(form),
+        'matches': [row[1] for row in form],
+        'venues': {'batter': {CRICSHEET_NAME: {VENUE: [2, 150, 100, 1, 1, 1]}}, 'bowler': {}},
+        'form': {'batter': {CRICSHEET_NAME: form}, 'bowler': {}},
+    })
+    aggregates.save(path)
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return str(tmp_path / 'player_stats.bin'), str(tmp_path / 'player_aggregates.json')
+
+
+def test_aggregates_replace_the_cache_tables(paths):
+    compiled_path, aggregates_path = paths
+    cached = load_player_stats(BATTER_DATA_PATH, BOWLER_DATA_PATH, compiled_path, aggregates_path)
+    assert cached.aggregates_version is None
+    save_aggregates(aggregates_path, [['2025-05-01', 1, 80, 40, True], ['2025-05-03', 2, 20, 40, False]])
+
+    stats = load_player_stats(BATTER_DATA_PATH, BOWLER_DATA_PATH, compiled_path, aggregates_path)
+    assert stats is not cached
+    assert stats.aggregates_version == 2
+    assert stats.venue_record('batter', PLAYER, 'Wankhede')['Average'] == 150.0
+    assert stats.recent_form('batter', PLAYER) == {'Runs': 50.0, 'Strike Rate': 125.0}
+    assert stats.venue_record('batter', PLAYER, 'Wankhede') != cached.venue_record('batter', PLAYER, 'Wankhede')
+    # Players the aggregates do not cover keep their cache tables
+    other = next(name for name in stats.batters if name != PLAYER and cached.recent_form('batter', name))
+    assert stats.recent_form('batter', other) == cached.recent_form('batter', other)
+    assert stats.recent_form('bowler', PLAYER) == cached.recent_form('bowler', PLAYER)
+
+
+def test_ingesting_recompiles(paths):
+    compiled_path, aggregates_path = paths
+    save_aggregates(aggregates_path, [['2025-05-01', 1, 80, 40, True]])
+    stats = load_player_stats(BATTER_DATA_PATH, BOWLER_DATA_PATH, compiled_path, aggregates_path)
+    assert stats.recent_form('batter', PLAYER) == {'Runs': 80.0, 'Strike Rate': 200.0}
+    assert load_player_stats(BATTER_DATA_PATH, BOWLER_DATA_PATH, compiled_path, aggregates_path) is stats
+
+    save_aggregates(aggregates_path, [['2025-05-01', 1, 80, 40, True], ['2025-05-03', 2, 20, 40, False]])
+    stats = load_player_stats(BATTER_DATA_PATH, BOWLER_DATA_PATH, compiled_path, aggregates_path)
+    assert stats.aggregates_version == 2
+    assert stats.recent_form('batter', PLAYER) == {'Runs': 50.0, 'Strike Rate': 125.0}
+
+
+def test_venue_matches_are_bounded(paths, monkeypatch):
+    monkeypatch.setattr(player_store, 'MAX_VENUE_MATCHES', 2)
+    stats = load_player_stats(BATTER_DATA_PATH, BOWLER_DATA_PATH, *paths)
+    wankhede = stats.venue_record('batter', PLAYER, 'Wankhede')
+    assert wankhede is not None
+    for venue in ('Eden Gardens', 'No Such Ground', 'Another Client String'):
+        stats.matching_venues(venue)
+    assert len(stats._venue_matches) == 2
+    # An evicted lookup is recomputed identically
+    assert stats.venue_record('batter', PLAYER, 'Wankhede') == wankhede
+
+
+def test_empty_form_window_is_no_form(paths):
+    compiled_path, aggregates_path = paths
+    save_aggregates(aggregates_path, [])
+    stats = load_player_stats(BATTER_DATA_PATH, BOWLER_DATA_PATH, compiled_path, aggregates_path)
+    assert stats.recent_form('batter', PLAYER) is None
+    assert stats.venue_record('batter', PLAYER, 'Wankhede')['Average'] == 150.0
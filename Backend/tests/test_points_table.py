@@ -0,0 +1,110 @@
+"""Points-table normalization, and fetch_points_table.py's conditional fetch and atomic write"""
+import functools
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import fetch_points_table
+import points_table
+from points_table import PointsTableFeed
+
+# sportskeeda's shape: strings for numbers, teams inside a group
+UPSTREAM = {'table': [{'table': [{'end_date': '2025-05-25', 'group': [
+    {'team_name': 'Royal Challengers Bengaluru', 'team_short_name': 'RCB', 'position': '2', 'played': 11,
+     'won': 8, 'lost': 3, 'points': '16', 'nrr': '0.482', 'deductions': ''},
+    {'team_name': 'Gujarat Titans', 'team_short_name': 'GT', 'position': '1', 'played': 11,
+     'won': 8, 'lost': 3, 'points': '16', 'nrr': '0.867', 'order': 1},
+]}]}]}
+# The same standings as a flat list with other field names and no positions
+FLAT = [
+    {'name': 'Gujarat Titans', 'short_name': 'GT', 'matches': '11', 'won': 8, 'lost': 3, 'pts': 16.0, 'net_run_rate': 0.867},
+    {'name': 'Royal Challengers Bengaluru', 'short_name': 'RCB', 'matches': 11, 'won': '8', 'lost': 3, 'pts': '16',
+     'net_run_rate': '0.482'},
+    {'short_name': 'XX', 'pts': 30},
+]
+
+
+def test_payloads_normalize_to_the_same_table():
+    table = points_table.parse(UPSTREAM)
+    assert [team['team_short_name'] for team in table.points] == ['GT', 'RCB']
+    assert table.points[0] == {'position': 1, 'team_name': 'Gujarat Titans', 'team_short_name': 'GT', 'team_flag': '',
+                               'played': 11, 'won': 8, 'lost': 3, 'tied': 0, 'no_result': 0, 'points': 16, 'nrr': 0.867}
+    # Rows without a team name are dropped; positions come from points then net run rate
+    assert points_table.parse(FLAT) == table
+    assert json.loads(table.body) == {'version': table.etag, 'points': table.points}
+    assert points_table.parse({'unexpected': True}) == points_table.EMPTY_TABLE
+
+
+class Upstream(BaseHTTPRequestHandler):
+    """Serves UPSTREAM with an ETag, answering a matching If-None-Match with 304"""
+    etag = '"v1"'
+    requests = []
+
+    def do_GET(self):
+        self.requests.append(self.headers.get('If-None-Match'))
+        if self.headers.get('If-None-Match') == self.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = json.dumps(UPSTREAM).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('ETag', self.etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    Upstream.requests = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Upstream)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f'http://127.0.0.1:{server.server_address[1]}/points-table'
+    monkeypatch.setattr(fetch_points_table, 'PointsTableFeed', functools.partial(PointsTableFeed, urls=[url]))
+    yield url
+    server.shutdown()
+    server.server_close()
+
+
+def test_not_modified_keeps_the_file(upstream, tmp_path):
+    output = str(tmp_path / 'points_table.json')
+    assert fetch_points_table.fetch_points_table(output)
+    saved, source, validators = points_table.load(output)
+    assert saved == points_table.parse(UPSTREAM)
+    assert source == upstream and validators == {'etag': '"v1"'}
+
+    os.utime(output, ns=(0, 0))
+    assert fetch_points_table.fetch_points_table(output)
+    assert Upstream.requests == [None, '"v1"']
+    assert os.stat(output).st_mtime_ns == 0
+
+    # New validators with the same standings leave the file alone too
+    Upstream.etag = '"v2"'
+    try:
+        assert fetch_points_table.fetch_points_table(output)
+    finally:
+        Upstream.etag = '"v1"'
+    assert os.stat(output).st_mtime_ns == 0
+
+
+def test_failed_write_leaves_the_old_file(tmp_path):
+    output = str(tmp_path / 'points_table.json')
+    old = points_table.parse(UPSTREAM)
+    points_table.save(output, old, 'https://upstream', {'etag': '"v1"'})
+    with open(output, 'rb') as f:
+        before = f.read()
+
+    # Serializing fails part way through the new file
+    unwritable = points_table.PointsTable([{'team_name': 'Gujarat Titans', 'nrr': object()}], b'', 'broken')
+    with pytest.raises(TypeError):
+        points_table.save(output, unwritable, 'https://upstream')
+
+    with open(output, 'rb') as f:
+        assert f.read() == before
+    assert points_table.load(output)[0] == old
@@ -0,0 +1,56 @@
+"""The vectorized ScoringEngine against Dream11Predictor's per-player scoring"""
+import pytest
+import scoring
+from season import squad_playing11
+from team import get_predictor
+
+FIXTURES = [
+    ('Mumbai Indians', 'Chennai Super Kings', 'Wankhede Stadium, Mumbai'),
+    ('Royal Challengers Bengaluru', 'Kolkata Knight Riders', 'Eden Gardens'),
+    ('Gujarat Titans', 'Sunrisers Hyderabad', 'Narendra Modi Stadium, Ahmedabad'),
+    # Venue lookups match substrings
+    ('Delhi Capitals', 'Punjab Kings', 'Arun Jaitley'),
+    ('Rajasthan Royals', 'Lucknow Super Giants', 'Unknown Ground'),
+]
+
+
+@pytest.fixture(scope='module')
+def predictor():
+    return get_predictor().session()
+
+
+def scores(predictor, venue, team1_playing11, team2_playing11, vectorized):
+    predictor.score_players(venue, team1_playing11, team2_playing11, vectorized=vectorized)
+    return predictor.player_scores
+
+
+@pytest.mark.parametrize('team1, team2, venue', FIXTURES)
+def test_vectorized_scores_match_per_player_scores(predictor, team1, team2, venue):
+    team1_playing11 = squad_playing11(predictor, team1)[:11]
+    team2_playing11 = squad_playing11(predictor, team2)[:11]
+    expected = scores(predictor, venue, team1_playing11, team2_playing11, vectorized=False)
+    actual = scores(predictor, venue, team1_playing11, team2_playing11, vectorized=True)
+    # Same players in the same order, with bit-identical scores
+    assert list(actual.items()) == list(expected.items())
+    assert any(score for score in expected.values())
+
+
+def test_players_without_stats(predictor):
+    team1_playing11 = squad_playing11(predictor, 'Mumbai Indians')[:9] + ['Unknown Batter(Batter)', 'Unknown Bowler(Bowler)']
+    team2_playing11 = squad_playing11(predictor, 'Chennai Super Kings')[:11]
+    expected = scores(predictor, 'Wankhede Stadium', team1_playing11, team2_playing11, vectorized=False)
+    actual = scores(predictor, 'Wankhede Stadium', team1_playing11, team2_playing11, vectorized=True)
+    assert list(actual.items()) == list(expected.items())
+    assert actual['Unknown Batter'] == 0
+
+
+def test_venue_tables_are_bounded(predictor, monkeypatch):
+    monkeypatch.setattr(scoring, 'MAX_VENUE_TABLES', 2)
+    engine = scoring.ScoringEngine(predictor.stats)
+    wankhede = engine.venue_table('batter', 'Wankhede')
+    for venue in ('Eden Gardens', 'Wankhede', 'Chepauk', 'Some Client String'):
+        engine.venue_table('batter', venue)
+    assert list(engine._venue_tables) == [('batter', 'Chepauk'), ('batter', 'Some Client String')]
+    # An evicted venue is rebuilt identically
+    table, found = engine.venue_table('batter', 'Wankhede')
+    assert (table == wankhede[0]).all() and (found == wankhede[1]).all()
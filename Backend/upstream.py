@@ -0,0 +1,224 @@
+"""Background-refreshed snapshots of the upstream JSON feeds behind /api/live-matches and /points_table.
+
+Requests never wait on the upstream: they get the last good snapshot from memory (or the
+bundled JSON file before the first successful fetch), and a stale snapshot only wakes the
+refresher thread, which polls every feed through one pooled HTTP session.
+"""
+import json
+import os
+import threading
+import time
+import metrics
+
+# Browser-like headers; sportskeeda rejects the default requests user agent
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'application/json',
+}
+
+FETCH_SECONDS = metrics.histogram('upstream_fetch_seconds', 'Latency of each upstream fetch attempt, by feed and outcome',
+                                  ['feed', 'outcome'])
+
+
+def make_session(pool_size=4):
+    """A requests session whose keep-alive connections are reused across refreshes"""
+    # Imported here: only the refresher thread talks to the upstream, never the import path
+    import requests
+    from requests.adapters import HTTPAdapter
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=1)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+class UpstreamFeed:
+    """Last good snapshot of one upstream JSON feed
+
+    urls are tried in order on every refresh; transform turns the parsed JSON (from the
+    upstream or the fallback file) into what the route serves.
+    """
+
+    def __init__(self, name, urls, fallback_path, interval=60, timeout=5, headers=None, transform=None):
+        self.name = name
+        self.urls = list(urls)
+        self.fallback_path = fallback_path
+        self.interval = interval
+        self.timeout = timeout
+        self.headers = dict(headers or {})
+        self.transform = transform or (lambda data: data)
+        self.refresher = None
+        self.listeners = []
+
+        self.data = None
+        self.source = None
+        self.fetched_at = 0.0
+        self.next_refresh = 0.0
+        self.last_error = None
+        self.refreshes = 0
+        self.failures = 0
+        self._validators = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback):
+        """Call callback(data) whenever a new snapshot is loaded or fetched"""
+        self.listeners.append(callback)
+
+    def _notify(self):
+        for callback in self.listeners:
+            try:
+                callback(self.data)
+            except Exception as e:
+                print(f"Error notifying {self.name} listener: {e}")
+
+    @property
+    def age(self):
+        return time.time() - self.fetched_at if self.fetched_at else None
+
+    def load(self):
+        """Load the fallback file if there is no snapshot yet, without starting the refresher"""
+        if self.data is None:
+            with self._lock:
+                if self.data is None:
+                    self._load_fallback()
+        return self.data
+
+    def get(self):
+        """The current snapshot; never blocks on the network"""
+        self.load()
+        if self.refresher is not None:
+            self.refresher.ensure_running()
+            stale = self.age is None or self.age > self.interval
+            # A stale snapshot is still served; it counts as a miss of the in-memory copy
+            metrics.cache_lookup(f"upstream_{self.name.replace(' ', '_')}", not stale)
+            if stale:
+                self.refresher.wake()
+        return self.data
+
+    def restore(self, data, source, validators):
+        """Start from a snapshot fetched earlier (e.g. by a previous run) so refreshing source can get a 304"""
+        with self._lock:
+            self.data = data
+            self.source = source
+            self._validators = {source: dict(validators)} if source and validators else {}
+
+    def validators(self):
+        """ETag and Last-Modified of the response the current snapshot came from, if it had them"""
+        return dict(self._validators.get(self.source, {}))
+
+    def _load_fallback(self):
+        try:
+            with open(self.fallback_path, 'r', encoding='utf-8') as f:
+                self.data = self.transform(json.load(f))
+            self.source = 'fallback'
+            self._notify()
+        except Exception as e:
+            print(f"Error loading fallback for {self.name}: {e}")
+
+    def refresh(self, session):
+        """Fetch the feed once, keeping the last good snapshot if every URL fails"""
+        self.refreshes += 1
+        errors = []
+        for url in self.urls:
+            headers = dict(self.headers)
+            # A 304 is only useful if the snapshot held came from this URL
+            validators = self._validators.get(url, {}) if self.source == url else {}
+            if 'etag' in validators:
+                headers['If-None-Match'] = validators['etag']
+            if 'last_modified' in validators:
+                headers['If-Modified-Since'] = validators['last_modified']
+            start = time.perf_counter()
+            try:
+                response = session.get(url, headers=headers, timeout=self.timeout)
+                if response.status_code == 304 and self.source == url:
+                    FETCH_SECONDS.observe(time.perf_counter() - start, self.name, 'not_modified')
+                    self.fetched_at = time.time()
+                    self.last_error = None
+                    return True
+                response.raise_for_status()
+                data = self.transform(response.json())
+            except Exception as e:
+                FETCH_SECONDS.observe(time.perf_counter() - start, self.name, 'error')
+                errors.append(f"{url}: {e}")
+                continue
+            FETCH_SECONDS.observe(time.perf_counter() - start, self.name, 'ok')
+
+            self._validators[url] = {key: value for key, value in (
+                ('etag', response.headers.get('ETag')),
+                ('last_modified', response.headers.get('Last-Modified')),
+            ) if value}
+            self.data = data
+            self.source = url
+            self.fetched_at = time.time()
+            self.last_error = None
+            self._notify()
+            return True
+
+        self.failures += 1
+        self.last_error = '; '.join(errors) or 'no upstream configured'
+        print(f"Error refreshing {self.name}: {self.last_error}")
+        return False
+
+    def status(self):
+        return {
+            'source': self.source,
+            'age': round(self.age, 1) if self.age is not None else None,
+            'interval': self.interval,
+            'refreshes': self.refreshes,
+            'failures': self.failures,
+            'last_error': self.last_error,
+        }
+
+
+class UpstreamRefresher:
+    """One daemon thread per process polling every registered feed on its interval"""
+
+    def __init__(self, session=None):
+        self._session = session
+        self.session = None
+        self.feeds = []
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._thread = None
+
+    def add(self, feed):
+        feed.refresher = self
+        self.feeds.append(feed)
+        return feed
+
+    def ensure_running(self):
+        """Start the thread in this process; a forked worker does not inherit its parent's"""
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            # Each process gets its own pool; a forked worker must not reuse its parent's sockets
+            self.session = self._session or make_session()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='upstream-refresher', daemon=True)
+            self._thread.start()
+
+    def wake(self):
+        self._wake.set()
+
+    def refresh_due(self, now=None):
+        """Refresh every feed whose interval has passed; returns seconds until the next one is due"""
+        now = time.time() if now is None else now
+        for feed in self.feeds:
+            # A failed refresh also waits a full interval, so a down upstream is not hammered
+            if now >= feed.next_refresh:
+                feed.refresh(self.session)
+                feed.next_refresh = time.time() + feed.interval
+        return max(min((feed.next_refresh for feed in self.feeds), default=now + 60) - time.time(), 0.5)
+
+    def _run(self):
+        while True:
+            self._wake.clear()
+            try:
+                delay = self.refresh_due()
+            except Exception as e:
+                print(f"Upstream refresher error: {e}")
+                delay = 5
+            self._wake.wait(delay)
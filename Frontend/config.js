@@ -3,13 +3,16 @@ const config = {
     // Development environment (local)
     development: {
         apiBaseUrl: 'http://localhost:5000',
-        staticBaseUrl: '../Backend/Static/public'
+        staticBaseUrl: '../Backend/Static/public',
+        // Public URL of Backend/live_stream.py; without one, live matches are polled
+        liveStreamUrl: null
     },
     
     // Production environment (deployed)
     production: {
         apiBaseUrl: 'https://jaanu11-backend.onrender.com', // Use local Flask backend for production as well
-        staticBaseUrl: 'https://jaanu11-backend.onrender.com/Static/public'
+        staticBaseUrl: 'https://jaanu11-backend.onrender.com/Static/public',
+        liveStreamUrl: null
     }
 };
 
@@ -25,4 +28,23 @@ console.log(`Running in ${isProduction ? 'production' : 'development'} mode`);
 console.log(`API Base URL: ${currentConfig.apiBaseUrl}`);
 console.log(`Static Base URL: ${currentConfig.staticBaseUrl}`);
 
+// Content-hashed copies of the static files (built by Backend/assets.py), served from /assets/
+// with immutable caching; keyed by source path, e.g. 'Static/public/squads.json'
+let builtAssets = {};
+
+// Settles once the manifest has loaded, or failed to; never rejects
+currentConfig.ready = fetch(`${currentConfig.apiBaseUrl}/assets/manifest.json`)
+    .then(response => response.ok ? response.json() : {})
+    .then(manifest => { builtAssets = manifest.assets || {}; })
+    .catch(() => console.log('No asset manifest; using the original static URLs'));
+
+// URL of a file under Static/public: its hashed copy when the build has a current one, else the file itself
+currentConfig.asset = (path) => {
+    const entry = builtAssets[`Static/public/${path}`];
+    return entry ? `${currentConfig.apiBaseUrl}/assets/${entry.file}` : `${currentConfig.staticBaseUrl}/${path}`;
+};
+
+// fetch() of a file under Static/public, once the manifest is known
+currentConfig.fetchAsset = (path, options) => currentConfig.ready.then(() => fetch(currentConfig.asset(path), options));
+
 export default currentConfig;
\ No newline at end of file